@@ -0,0 +1,20 @@
+""" Titan, a Python to SystemVerilog compiler.
+
+    Importing the package gives access to the in-memory compile API, see ``titan.compiler.api``.
+"""
+import os, sys
+
+# the compiler's modules import each other as top-level packages (i.e. ``compiler.spirv``)
+_TITAN_DIR = os.path.dirname(os.path.abspath(__file__))
+if _TITAN_DIR not in sys.path:
+    sys.path.append(_TITAN_DIR)
+
+# the compiler's backends are slow to import, so the API is only imported on first use
+_API_NAMES = {"compile", "CompileOptions", "CompileResult"}
+
+def __getattr__(name: str):
+    if name in _API_NAMES:
+        import compiler.api
+        return getattr(compiler.api, name)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
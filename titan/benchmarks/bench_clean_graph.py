@@ -0,0 +1,89 @@
+""" Measures how ``titan.compiler.node.NodeAssembler.clean_graph`` scales with the size of the graph.
+
+    Usage: ``python benchmarks/bench_clean_graph.py [--nodes 10000 100000 1000000]``, run from the ``titan`` folder.
+"""
+import argparse, logging, os, sys, time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compiler.spirv # imported first to avoid a circular import
+from compiler.verilog import VerilogAssember
+
+HEADER = [
+    "OpCapability Shader",
+    "OpMemoryModel Logical GLSL450",
+    "OpEntryPoint Fragment %bench \"bench\" %a %x",
+    "OpExecutionMode %bench OriginUpperLeft",
+    "OpName %bench \"bench\"",
+    "OpName %a \"a\"",
+    "OpName %x \"x\"",
+    "OpDecorate %a Location 0",
+    "OpDecorate %a Flat",
+    "%type_void = OpTypeVoid",
+    "%type_function_void = OpTypeFunction %type_void",
+    "%type_integer = OpTypeInt 32 1",
+    "%pointer_input_integer = OpTypePointer Input %type_integer",
+    "%pointer_output_integer = OpTypePointer Output %type_integer",
+    "%a = OpVariable %pointer_input_integer Input",
+    "%x = OpVariable %pointer_output_integer Output",
+    "%bench = OpFunction %type_void None %type_function_void",
+    "%label_bench = OpLabel",
+    "%temp_a = OpLoad %type_integer %a",
+    "%titan_id_start = OpIAdd %type_integer %temp_a %temp_a",
+    "OpStore %x %titan_id_start",
+]
+
+def generate_spirv(total_nodes: int) -> str:
+    """ Generate a synthetic SPIR-V assembly file for ``x = x + a`` repeated, so every addition
+        depends on the one before it through a load and a store of ``x``.
+
+        Args:
+            total_nodes: Roughly the number of nodes in the graph, each addition creates four.
+
+        Returns:
+            SPIR-V assembly code as one large string.
+    """
+    lines = list(HEADER)
+
+    for i in range(total_nodes // 4):
+        lines.append(f"%temp_x = OpLoad %type_integer %x")
+        lines.append(f"%temp_a = OpLoad %type_integer %a")
+        lines.append(f"%titan_id_{i} = OpIAdd %type_integer %temp_x %temp_a")
+        lines.append(f"OpStore %x %titan_id_{i}")
+
+    lines += ["OpReturn", "OpFunctionEnd"]
+    return "\n".join(lines) + "\n"
+
+def time_clean_graph(total_nodes: int) -> tuple[int, float]:
+    """ Time cleaning the graph of a synthetic chain.
+
+        Args:
+            total_nodes: Roughly the number of nodes in the graph.
+
+        Returns:
+            Number of nodes before cleaning and the seconds taken to clean the graph.
+    """
+    verilog = VerilogAssember(generate_spirv(total_nodes))
+    node_assembler = verilog.compile_nodes()
+    nodes = sum(len(versions) for versions in node_assembler.content["bench"].body_nodes.values())
+
+    start = time.perf_counter()
+    node_assembler.clean_graph()
+    return nodes, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cleaning the dataflow graph.")
+    parser.add_argument("--nodes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000], help="graph sizes to benchmark")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10 * max(args.nodes)))
+
+    print(f"{'nodes':>10} {'clean (s)':>10} {'us/node':>8}")
+
+    for total_nodes in args.nodes:
+        nodes, seconds = time_clean_graph(total_nodes)
+        print(f"{nodes:>10} {seconds:>10.3f} {seconds / nodes * 1e6:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+""" Compares the memory used by dataflow nodes with ``__slots__`` against the same class with a ``__dict__``.
+
+    Usage: ``python benchmarks/bench_node_memory.py [--nodes 10000 100000 1000000]``, run from the ``titan`` folder.
+"""
+import argparse, gc, os, sys, time, tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compiler.spirv # imported first to avoid a circular import
+from compiler.node import Node, NodeContext
+from common.symbols import Operation
+
+# the same class without __slots__, the way nodes were stored before
+DictNode = type("DictNode", (), {
+    name: value for name, value in Node.__dict__.items() if name not in Node.__slots__ + ("__slots__",)
+})
+
+def build_graph(node_class: type, total_nodes: int) -> list:
+    """ Build a synthetic graph, where every node adds the two nodes before it.
+
+        Args:
+            node_class: Class to create the nodes with.
+            total_nodes: Number of nodes to create.
+
+        Returns:
+            Every node of the graph.
+    """
+    nodes = [
+        node_class(NodeContext(id=0, type_id=0, operation=Operation.GLOBAL_VAR_DECLARATION)),
+        node_class(NodeContext(id=1, type_id=0, operation=Operation.GLOBAL_VAR_DECLARATION)),
+    ]
+
+    for i in range(2, total_nodes):
+        nodes.append(node_class(NodeContext(id=i, type_id=0, input_left=nodes[i-2], input_right=nodes[i-1], operation=Operation.ADD)))
+
+    return nodes
+
+def measure(node_class: type, total_nodes: int) -> tuple[float, float, float]:
+    """ Measure the memory and time taken by a graph.
+
+        Args:
+            node_class: Class to create the nodes with.
+            total_nodes: Number of nodes to create.
+
+        Returns:
+            Bytes per node, seconds taken to build the graph and seconds taken by a full garbage collection.
+    """
+    gc.collect()
+    tracemalloc.start()
+
+    start = time.perf_counter()
+    nodes = build_graph(node_class, total_nodes)
+    build_time = time.perf_counter() - start
+
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    gc.collect()
+    gc_time = time.perf_counter() - start
+
+    del nodes
+    return memory / total_nodes, build_time, gc_time
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the memory used by dataflow nodes.")
+    parser.add_argument("--nodes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000], help="graph sizes to benchmark")
+    args = parser.parse_args()
+
+    print(f"{'nodes':>10} {'class':>8} {'bytes/node':>11} {'build (s)':>10} {'gc (s)':>8}")
+
+    for total_nodes in args.nodes:
+        for node_class in [DictNode, Node]:
+            per_node, build_time, gc_time = measure(node_class, total_nodes)
+            print(f"{total_nodes:>10} {node_class.__name__:>8} {per_node:>11.1f} {build_time:>10.3f} {gc_time:>8.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+""" Compares the hand-written SPIR-V tokenizer against the pyparsing grammar.
+
+    Usage: ``python benchmarks/bench_spirv_parser.py [--lines 10000 100000 1000000]``, run from the ``titan`` folder.
+"""
+import argparse, os, sys, time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.grammar import parse_spirv
+
+HEADER = [
+    "OpCapability Shader",
+    "OpMemoryModel Logical GLSL450",
+    "OpEntryPoint Fragment %bench \"bench\" %a %b %c",
+    "OpExecutionMode %bench OriginUpperLeft",
+    "OpName %bench \"bench\"",
+    "%type_void = OpTypeVoid",
+    "%type_function_void = OpTypeFunction %type_void",
+    "%type_integer = OpTypeInt 32 1",
+    "%pointer_input_integer = OpTypePointer Input %type_integer",
+    "%const_integer_n1 = OpConstant %type_integer -1",
+    "%a = OpVariable %pointer_input_integer Input",
+    "%bench = OpFunction %type_void None %type_function_void",
+    "%label_bench = OpLabel",
+]
+
+def generate_spirv(total_lines: int) -> str:
+    """ Generate a synthetic SPIR-V assembly file with roughly ``total_lines`` lines.
+
+        Args:
+            total_lines: Number of lines to generate.
+
+        Returns:
+            SPIR-V assembly code as one large string.
+    """
+    lines = list(HEADER)
+
+    i = 0
+    while len(lines) < total_lines - 2:
+        lines.append(f"%temp_a_{i} = OpLoad %type_integer %a")
+        lines.append(f"%titan_id_{i} = OpIAdd %type_integer %temp_a_{i} %const_integer_n1")
+        i += 1
+
+    lines += ["OpReturn", "OpFunctionEnd"]
+    return "\n".join(lines) + "\n"
+
+def time_parser(spirv: str, use_pyparsing: bool) -> float:
+    start = time.perf_counter()
+    parse_spirv(spirv, use_pyparsing)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SPIR-V parsers.")
+    parser.add_argument("--lines", nargs="+", type=int, default=[10_000, 100_000, 1_000_000], help="input sizes to benchmark")
+    parser.add_argument("--pyparsing-limit", type=int, default=100_000, help="skip the pyparsing grammar above this many lines")
+    args = parser.parse_args()
+
+    print(f"{'lines':>10} {'tokenizer (s)':>14} {'pyparsing (s)':>14} {'speedup':>8}")
+
+    for total_lines in args.lines:
+        spirv = generate_spirv(total_lines)
+        tokenizer_time = time_parser(spirv, use_pyparsing=False)
+
+        if total_lines <= args.pyparsing_limit:
+            pyparsing_time = time_parser(spirv, use_pyparsing=True)
+            print(f"{total_lines:>10} {tokenizer_time:>14.3f} {pyparsing_time:>14.3f} {pyparsing_time/tokenizer_time:>7.1f}x")
+        else:
+            print(f"{total_lines:>10} {tokenizer_time:>14.3f} {'skipped':>14} {'-':>8}")
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,7 @@ class TitanErrors(Enum):
     UNKNOWN_SPIRV_OPCODE = "unknown SPIR-V opcode"
     UNEXPECTED = "unexpected exception"
     BAD_TYPES = "bad/unsupported type(s) for operation"
+    PARSE_SPIRV_FAILURE = "unable to parse SPIR-V assembly"
 
 class LoggedException(Exception):
     """ An exception that also logs the message to the given logger. """
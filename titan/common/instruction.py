@@ -0,0 +1,38 @@
+from typing import NamedTuple
+
+class SPIRVInstruction(NamedTuple):
+    """ A single SPIR-V instruction, stored as plain Python objects.
+
+        Exposes the same ``id``, ``opcode`` and ``opcode_args`` attributes as a line parsed with
+        ``titan.common.grammar.TitanSPIRVGrammar``, so either can be handed to the Verilog stage.
+
+        Attributes:
+            opcode (str): Opcode without the "Op" prefix, i.e. "IAdd".
+            id (str): Result ID (with "%"), empty if the instruction does not produce a result.
+            opcode_args (tuple): Operands, in the same order and form as they appear in the assembly text.
+    """
+    opcode: str
+    id: str = ""
+    opcode_args: tuple = ()
+
+    @property
+    def type_id(self) -> str:
+        """ Result type ID of the instruction, empty if the instruction does not have one.
+
+            Type declarations and labels produce a result, but don't have a result type.
+        """
+        if self.id == "" or self.opcode.startswith("Type") or self.opcode == "Label":
+            return ""
+
+        return self.opcode_args[0]
+
+    def __str__(self):
+        text = f"Op{self.opcode}"
+
+        if len(self.opcode_args) > 0:
+            text += " " + " ".join(str(arg) for arg in self.opcode_args)
+
+        if self.id != "":
+            text = f"{self.id} = {text}"
+
+        return text
@@ -42,6 +42,10 @@ class Operation(Enum):
     # logical
     SHIFT_LEFT = "<<"
     SHIFT_RIGHT = ">>"
+    SHIFT_RIGHT_ARITHMETIC = ">>>"
+    BITWISE_AND = "&"
+    BITWISE_OR = "|"
+    BITWISE_XOR = "^"
 
     # misc
     NOP = auto()
@@ -70,14 +74,15 @@ class Operation_Type(set, Enum):
     COMPARISON = {Operation.LESS_THAN, Operation.LESS_OR_EQ, 
                   Operation.GREATER_THAN, Operation.GREATER_OR_EQ, 
                   Operation.EQUAL_TO, Operation.NOT_EQUAL_TO}
-    BITWISE = {Operation.SHIFT_LEFT, Operation.SHIFT_RIGHT}
+    BITWISE = {Operation.SHIFT_LEFT, Operation.SHIFT_RIGHT, Operation.SHIFT_RIGHT_ARITHMETIC,
+               Operation.BITWISE_AND, Operation.BITWISE_OR, Operation.BITWISE_XOR}
     ARRAY_OPERATIONS = {Operation.ARRAY_INDEX, Operation.ARRAY_LOAD, Operation.ARRAY_STORE}
 
 class LiteralSymbolGroup(set, Enum):
     """ Enum containing symbols corresponding to operations."""
     ARITHMETIC = {"+", "-", "*", "/"}
     COMPARISON = {">=", ">", "<", "<=", "==", "!="}
-    BITWISE = {"<<" , ">>"}
+    BITWISE = {"<<" , ">>", ">>>", "&", "|", "^"}
 
 class Information(NamedTuple):
     """ Tuple to store information about the datatype and what operation is being performed."""
@@ -96,10 +101,10 @@ class SymbolTable():
     # TODO: come up with a better solution -- using a dict for unique
     # variable names will not work when the scope changes
     # OR ---- new symbol table every scope change?
-    content = {}
+    content: dict
 
     def __init__(self):
-        pass
+        self.content = {}
 
     # add entry
     def add(self, expression, information: Information):
@@ -0,0 +1,89 @@
+from typing import Dict, List, NamedTuple
+
+from compiler.spirv import SPIRVAssembler
+from compiler.verilog import VerilogAssember
+from compiler.node import NodeAssembler
+from compiler.dots import DotGraphOutput
+from common.instruction import SPIRVInstruction
+
+class CompileOptions(NamedTuple):
+    """ Options for ``compile``, matching the equivalent command line options.
+
+        Attributes:
+            spirv_only: Only generate SPIR-V, skipping the Verilog and comms files.
+            gen_comms: Generate the comms files.
+            dots: Generate the Graphviz dot graph sources of the dataflow.
+            dark_dots: Use the dark theme for the clean dot graph.
+            optimise: Optimise the generated code, i.e. fold constants, reuse common subexpressions and remove dead code.
+            max_units: Maximum number of hardware units of each arithmetic operation, by the name of the operation
+                (i.e. ``{"mult": 4, "div": 1}``). ``None`` gives every operation its own unit.
+    """
+    spirv_only: bool = False
+    gen_comms: bool = True
+    dots: bool = False
+    dark_dots: bool = False
+    optimise: bool = True
+    max_units: Dict[str, int] = None
+
+
+class CompileResult(NamedTuple):
+    """ Everything generated by ``compile``, held in memory.
+
+        Attributes:
+            entry_point: Name of the function used as the top module.
+            spirv: Generated SPIR-V assembly.
+            instructions: Generated SPIR-V instructions.
+            verilog: Generated Verilog, ``None`` if only SPIR-V was asked for.
+            comms_files: Content of each comms file, indexed by file name.
+            node_assembler: Node graph the Verilog was generated from, ``None`` if only SPIR-V was asked for.
+            dot_sources: Source of each dot graph, indexed by file name.
+            lagging_info: Content of each lagging information JSON file, indexed by file name.
+    """
+    entry_point: str
+    spirv: str
+    instructions: List[SPIRVInstruction]
+    verilog: str | None
+    comms_files: Dict[str, str]
+    node_assembler: NodeAssembler | None
+    dot_sources: Dict[str, str]
+    lagging_info: Dict[str, str]
+
+
+def compile(source: str, top: str = None, options: CompileOptions = CompileOptions()) -> CompileResult:
+    """ Compile Python source code, without touching the filesystem.
+
+        Nothing is written to disk and logging isn't configured, so it's left to the caller.
+        Failures raise an exception, the same as the command line compiler.
+
+        Args:
+            source: Python source code to compile.
+            top: Name of the function to use as the top module, see the ``-t`` option.
+            options: Compile options.
+
+        Returns:
+            The generated SPIR-V, Verilog, comms files and node graph.
+    """
+    spirv_assembler = SPIRVAssembler(source=source, top=top, optimise=options.optimise)
+    spirv_assembler.compile()
+
+    instructions = spirv_assembler.get_instructions()
+    verilog, comms_files, node_assembler, dot_sources = None, {}, None, {}
+
+    if not options.spirv_only:
+        verilog_assembler = VerilogAssember(instructions=instructions)
+        verilog_assembler.compile(spirv_assembler.entry_point,
+                                  dark_dots=options.dark_dots,
+                                  create_comms=options.gen_comms,
+                                  output_dir=None,
+                                  dots=DotGraphOutput.SOURCE if options.dots else DotGraphOutput.NONE,
+                                  optimise=options.optimise,
+                                  max_units=options.max_units
+                                  )
+
+        verilog = verilog_assembler.get_verilog_text()
+        comms_files = verilog_assembler.comms_files or {}
+        node_assembler = verilog_assembler.node_assembler
+        dot_sources = node_assembler.dot_sources
+
+    return CompileResult(spirv_assembler.entry_point, spirv_assembler.create_file_as_string(), instructions,
+                         verilog, comms_files, node_assembler, dot_sources, dict(spirv_assembler.lagging_info_files))
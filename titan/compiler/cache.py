@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import hashlib, json, logging, os, pathlib, shutil, uuid
+from functools import lru_cache
+from typing import NamedTuple, List
+
+CACHE_FORMAT_VERSION = 1
+
+class CacheStats(NamedTuple):
+    """ Tuple describing how useful the cache has been.
+
+        Attributes:
+            hits: Number of compiles that were restored from the cache.
+            misses: Number of compiles that had to run.
+            entries: Number of entries currently stored.
+            size_bytes: Total size of the stored entries.
+    """
+    hits: int
+    misses: int
+    entries: int
+    size_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        """ Fraction of lookups that were hits, ``0.0`` if nothing has been looked up yet. """
+        total = self.hits + self.misses
+        return 0.0 if total == 0 else self.hits / total
+
+
+@lru_cache(maxsize=None)
+def get_compiler_version() -> str:
+    """ Fingerprint of the compiler itself.
+
+        There is no version number that changes with every edit, so the compiler and common
+        sources and the Verilog templates are hashed instead. Any change to them invalidates the cache.
+
+        Returns:
+            Hex digest identifying this version of the compiler.
+    """
+    titan_path = pathlib.Path(__file__).parent.parent
+    digest = hashlib.sha256(str(CACHE_FORMAT_VERSION).encode())
+
+    for folder, pattern in [("common", "*.py"), ("compiler", "*.py"), ("templates", "**/*.sv")]:
+        for file in sorted((titan_path / folder).glob(pattern)):
+            digest.update(str(file.relative_to(titan_path)).encode())
+            digest.update(file.read_bytes())
+
+    return digest.hexdigest()
+
+
+class CompileCache():
+    """ Content-addressed cache of the files generated by a compile.
+
+        Entries are keyed on the source AST (so comments and formatting don't matter), the options
+        that change the output and the compiler version. Each entry is a folder holding the generated
+        files and a ``manifest.json``, and the least recently used entries are evicted once the cache
+        grows past ``max_size_bytes``.
+
+        Generated files are either stored relative to the output folder of the compile, or relative
+        to the working directory (i.e. the lagging information JSON), and restored the same way.
+
+        Attributes:
+            cache_dir: Folder the cache lives in.
+            max_size_bytes: Size the cache is trimmed down to after storing entries.
+    """
+
+    # where a generated file is restored relative to
+    OUTPUT_DIR = "output_dir"
+    WORKING_DIR = "cwd"
+
+    def __init__(self, cache_dir: str = ".titan_cache", max_size_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_size_bytes = max_size_bytes
+
+    @property
+    def _entries_dir(self) -> pathlib.Path:
+        return self.cache_dir / "entries"
+
+    @property
+    def _stats_file(self) -> pathlib.Path:
+        return self.cache_dir / "stats.json"
+
+    @staticmethod
+    def make_key(tree_dump: str, file_name: str, options: dict) -> str:
+        """ Create the cache key for a compile.
+
+            Args:
+                tree_dump: ``ast.dump`` of the source, see ``titan.compiler.spirv.SPIRVAssembler.get_tree_dump``.
+                file_name: Name of the source file without the extension, used to name the generated files.
+                options: Options that change the generated files.
+
+            Returns:
+                Hex digest to use as the key.
+        """
+        digest = hashlib.sha256()
+        digest.update(get_compiler_version().encode())
+        digest.update(json.dumps({"file_name": file_name, "options": options}, sort_keys=True).encode())
+        digest.update(tree_dump.encode())
+
+        return digest.hexdigest()
+
+    def restore(self, key: str, output_dir: str) -> List[str] | None:
+        """ Copy the files of a cached compile into place.
+
+            Args:
+                key: Key of the compile.
+                output_dir: Output folder of the compile.
+
+            Returns:
+                Paths of the restored files, or ``None`` if there is no entry for the key.
+        """
+        entry_dir = self._entries_dir / key
+        manifest_path = entry_dir / "manifest.json"
+        restored_files = []
+
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+
+            for base, relative_path in manifest["files"]:
+                destination = pathlib.Path(output_dir if base == self.OUTPUT_DIR else ".") / relative_path
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(entry_dir / base / relative_path, destination)
+                restored_files.append(str(destination))
+
+        except (OSError, ValueError, KeyError):
+            # missing entry, or one that was evicted while being read
+            return None
+
+        # mark as recently used
+        os.utime(manifest_path)
+        logging.debug(f"restored {len(restored_files)} files from cache entry {key}")
+        return restored_files
+
+    def store(self, key: str, output_dir: str, files: List[str]):
+        """ Store the files generated by a compile.
+
+            The entry is assembled in a temporary folder and then moved into place, so concurrent
+            compiles never see a half written entry.
+
+            Args:
+                key: Key of the compile.
+                output_dir: Output folder of the compile.
+                files: Paths of the generated files.
+        """
+        temp_dir = self.cache_dir / f"tmp-{uuid.uuid4().hex}"
+        output_path = pathlib.Path(output_dir).resolve()
+        manifest = {"files": []}
+
+        try:
+            for file in dict.fromkeys(files):
+                file_path = pathlib.Path(file).resolve()
+
+                if file_path.is_relative_to(output_path):
+                    base, relative_path = self.OUTPUT_DIR, file_path.relative_to(output_path)
+                else:
+                    base, relative_path = self.WORKING_DIR, file_path.relative_to(pathlib.Path.cwd())
+
+                (temp_dir / base / relative_path).parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(file_path, temp_dir / base / relative_path)
+                manifest["files"].append([base, relative_path.as_posix()])
+
+            with open(temp_dir / "manifest.json", "w") as f:
+                json.dump(manifest, f, indent=4)
+
+            self._entries_dir.mkdir(parents=True, exist_ok=True)
+            os.replace(temp_dir, self._entries_dir / key)
+
+        except (OSError, ValueError) as e:
+            # already stored by another process, or a file outside of the working directory
+            logging.debug(f"did not store cache entry {key}: {e}")
+
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def evict(self):
+        """ Remove the least recently used entries until the cache fits in ``max_size_bytes``. """
+        entries = []
+
+        for entry_dir in self._entries_dir.glob("*"):
+            try:
+                last_used = (entry_dir / "manifest.json").stat().st_mtime
+            except OSError:
+                continue
+
+            entries.append((last_used, self._get_size(entry_dir), entry_dir))
+
+        total_size = sum(size for _, size, _ in entries)
+
+        for _, size, entry_dir in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+
+            logging.debug(f"evicting cache entry {entry_dir.name} ({size} bytes)")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
+
+    def clear(self):
+        """ Remove every entry and reset the statistics. """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def record(self, hits: int, misses: int):
+        """ Add the hits and misses of a run to the stored statistics.
+
+            Args:
+                hits: Number of hits in this run.
+                misses: Number of misses in this run.
+        """
+        stats = self.get_stats()
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(self._stats_file, "w") as f:
+            json.dump({"hits": stats.hits + hits, "misses": stats.misses + misses}, f)
+
+    def get_stats(self) -> CacheStats:
+        """ Get the statistics of the cache over every run since it was last cleared.
+
+            Returns:
+                Hits, misses and the current size of the cache.
+        """
+        try:
+            with open(self._stats_file) as f:
+                counters = json.load(f)
+        except (OSError, ValueError):
+            counters = {}
+
+        entries = [entry_dir for entry_dir in self._entries_dir.glob("*") if entry_dir.is_dir()]
+
+        return CacheStats(
+            hits=counters.get("hits", 0),
+            misses=counters.get("misses", 0),
+            entries=len(entries),
+            size_bytes=sum(self._get_size(entry_dir) for entry_dir in entries)
+        )
+
+    @staticmethod
+    def _get_size(path: pathlib.Path) -> int:
+        return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
@@ -0,0 +1,245 @@
+import ast, json, logging, os, socket, socketserver, threading, time
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+from compiler.helper import expand_source_files, get_output_dirs
+
+def get_function_dumps(source: str) -> Dict[str, str]:
+    """ Split a source file into its functions, and dump each one with ``ast.dump``.
+
+        Anything that isn't a function (imports, globals) is dumped together under ``"<module>"``.
+        Line numbers aren't included, so comments and formatting don't change the result.
+
+        Args:
+            source: Python source code.
+
+        Returns:
+            Dictionary of function name and its dump.
+    """
+    tree = ast.parse(source)
+    dumps = {}
+    module_level = []
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            dumps[node.name] = ast.dump(node)
+        else:
+            module_level.append(ast.dump(node))
+
+    dumps["<module>"] = "\n".join(module_level)
+    return dumps
+
+
+class SourceState(NamedTuple):
+    """ Last known state of a watched source file.
+
+        Attributes:
+            mtime_ns: Modification time of the file.
+            function_dumps: Output of ``get_function_dumps`` for the file, ``None`` if it could not be parsed.
+    """
+    mtime_ns: int
+    function_dumps: Dict[str, str] = None
+
+
+class WatchDaemon():
+    """ Keeps the compiler loaded and rebuilds source files when they change.
+
+        Files are polled for changes, and a file is only rebuilt if one of its functions (or its
+        module level code) changed, so saving a file with only comment or formatting changes is free.
+        A SPIR-V module is generated per file, so the file is the smallest unit that can be rebuilt.
+
+        Builds can also be requested through a Unix socket, see ``serve``.
+
+        Attributes:
+            sources: Files, directories or glob patterns to watch, as given on the command line.
+            build: Callable that compiles a list of (source file, output folder) pairs and returns the results.
+            poll_interval: Seconds to wait between checking the files.
+            files: Expanded list of files being watched.
+            output_dirs: Output folder of each watched file.
+            states: Last known state of each watched file.
+            pending: Files that changed and haven't been rebuilt yet.
+    """
+
+    def __init__(self, sources: List[str], build: Callable[[List[Tuple[str, str]]], list], poll_interval: float = 0.5):
+        self.sources = sources
+        self.build = build
+        self.poll_interval = poll_interval
+
+        self.files = []
+        self.output_dirs = {}
+        self.states = {}
+        self.pending = set()
+
+        # socket requests and the watch loop can both trigger builds
+        self._lock = threading.RLock()
+        self._update_files()
+
+    def _update_files(self):
+        """ Expand the sources again, to pick up files that were added or removed. """
+        files = expand_source_files(self.sources)
+
+        if files != self.files:
+            self.files = files
+            self.output_dirs = dict(zip(files, get_output_dirs(files)))
+
+    def _read_state(self, file: str) -> SourceState:
+        mtime_ns = os.stat(file).st_mtime_ns
+
+        try:
+            with open(file) as f:
+                function_dumps = get_function_dumps(f.read())
+        except (SyntaxError, ValueError):
+            # still worth building, so that the error is reported
+            function_dumps = None
+
+        return SourceState(mtime_ns, function_dumps)
+
+    def poll(self) -> List[str]:
+        """ Check the watched files for changes, adding any that need rebuilding to ``pending``.
+
+            Returns:
+                Files that need to be rebuilt, i.e. new files, or ones with changed functions.
+        """
+        with self._lock:
+            return self._poll()
+
+    def _poll(self) -> List[str]:
+        self._update_files()
+        changed = []
+
+        for file in self.files:
+            old_state = self.states.get(file)
+
+            try:
+                if old_state is not None and os.stat(file).st_mtime_ns == old_state.mtime_ns:
+                    continue
+
+                new_state = self._read_state(file)
+            except OSError:
+                # removed, or in the middle of being saved
+                continue
+
+            self.states[file] = new_state
+
+            if old_state is None or new_state.function_dumps is None or old_state.function_dumps is None:
+                changed.append(file)
+                continue
+
+            changed_functions = [
+                name for name in new_state.function_dumps.keys() | old_state.function_dumps.keys()
+                if new_state.function_dumps.get(name) != old_state.function_dumps.get(name)
+            ]
+
+            if len(changed_functions) > 0:
+                logging.info(f"{file} changed: {', '.join(sorted(changed_functions))}")
+                changed.append(file)
+            else:
+                logging.info(f"{file} saved without any changes to the code, skipping")
+
+        # forget about removed files
+        for file in self.states.keys() - set(self.files):
+            del self.states[file]
+
+        self.pending = (self.pending | set(changed)) & set(self.files)
+        return changed
+
+    def rebuild(self, files: List[str]) -> list:
+        """ Build the given files.
+
+            Args:
+                files: Files to build, each one must be one of the watched files.
+
+            Returns:
+                Results returned by ``build``.
+        """
+        with self._lock:
+            self.pending -= set(files)
+            return self.build([(file, self.output_dirs[file]) for file in files])
+
+    def rebuild_pending(self) -> list:
+        """ Build every file that changed since it was last built.
+
+            Returns:
+                Results returned by ``build``.
+        """
+        with self._lock:
+            self._poll()
+
+            if len(self.pending) == 0:
+                return []
+
+            return self.rebuild([file for file in self.files if file in self.pending])
+
+    def watch(self):
+        """ Build every file, then keep rebuilding files as they change. Runs until interrupted. """
+        self.rebuild_pending()
+
+        logging.info(f"Watching {len(self.files)} files for changes, press Ctrl+C to stop")
+        while True:
+            time.sleep(self.poll_interval)
+            self.rebuild_pending()
+
+    def serve(self, socket_path: str) -> socketserver.BaseServer:
+        """ Start accepting build requests on a Unix socket, in a background thread.
+
+            Each request is a single line of JSON, ``{"files": [...]}``. The given files are built if
+            they changed, or unconditionally with ``"force": true``. Leaving out ``"files"`` builds every
+            watched file. The reply is a single line of JSON, ``{"results": [...]}``, with one object
+            per built file.
+
+            Args:
+                socket_path: Path of the socket to create.
+
+            Returns:
+                The running server, call ``shutdown`` on it to stop.
+        """
+        if not hasattr(socket, "AF_UNIX"):
+            raise Exception(f"Unix sockets are not supported on this platform")
+
+        daemon = self
+
+        class _RequestHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    request = json.loads(self.rfile.readline() or "{}")
+                    reply = {"results": [result._asdict() for result in daemon.handle_request(request)]}
+                except Exception as e:
+                    reply = {"error": str(e)}
+
+                self.wfile.write((json.dumps(reply) + "\n").encode())
+
+        # left behind by a daemon that didn't shut down cleanly
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+        server = socketserver.ThreadingUnixStreamServer(socket_path, _RequestHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        logging.info(f"Accepting build requests on {socket_path}")
+        return server
+
+    def handle_request(self, request: dict) -> list:
+        """ Build the files asked for by a socket request, see ``serve``.
+
+            Args:
+                request: Decoded request.
+
+            Returns:
+                Results returned by ``build``.
+        """
+        with self._lock:
+            self._poll()
+
+            if "files" in request:
+                requested = [os.path.normpath(file) for file in request["files"]]
+                files = [file for file in self.files if os.path.normpath(file) in requested]
+
+                unknown = set(requested) - {os.path.normpath(file) for file in files}
+                if len(unknown) > 0:
+                    raise Exception(f"not watching {', '.join(sorted(unknown))}")
+            else:
+                files = self.files
+
+            if not request.get("force", False):
+                files = [file for file in files if file in self.pending]
+
+            return self.rebuild(files)
@@ -0,0 +1,76 @@
+import logging, os, threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from enum import Enum
+from typing import List
+
+class DotGraphOutput(Enum):
+    """ Enum describing what to do with the Graphviz dot graphs of the dataflow.
+
+        Attributes:
+            NONE: Don't create any dot graphs.
+            SOURCE: Only write the ``.dot`` source files.
+            RENDER: Write the source files and render them in the background with the ``dot`` binary.
+    """
+    NONE = "none"
+    SOURCE = "source"
+    RENDER = "render"
+
+
+# renders are spread across a single pool per process, shared by every compile
+_render_executor: ThreadPoolExecutor = None
+_render_executor_lock = threading.Lock()
+
+
+def _get_render_executor() -> ThreadPoolExecutor:
+    global _render_executor
+
+    with _render_executor_lock:
+        if _render_executor is None:
+            _render_executor = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="dot_render")
+
+        return _render_executor
+
+
+def _log_render_failure(future: Future):
+    if future.exception() is not None:
+        logging.warning(f"Failed to render dot graph: {future.exception()}")
+
+
+def render_dot_file(filepath: str, engine: str = "dot", format: str = "pdf") -> Future:
+    """ Render a dot source file in the background.
+
+        The rendered file is placed next to the source, i.e. ``graph.dot`` becomes ``graph.dot.pdf``.
+        Failures (such as the ``dot`` binary not being installed) are logged as warnings.
+
+        Note:
+            Threads in the pool aren't daemon threads, so the interpreter waits for any
+            outstanding renders before exiting.
+
+        Args:
+            filepath: Path of the ``.dot`` file.
+            engine: Graphviz layout engine to use.
+            format: Output format.
+
+        Returns:
+            Future that resolves to the path of the rendered file.
+    """
+    # slow to import, and only needed here
+    import graphviz
+
+    future = _get_render_executor().submit(graphviz.render, engine, format, filepath)
+    future.add_done_callback(_log_render_failure)
+
+    return future
+
+
+def wait_for_renders(futures: List[Future]) -> List[str]:
+    """ Wait for background renders to finish.
+
+        Args:
+            futures: Futures returned by ``render_dot_file``.
+
+        Returns:
+            Paths of the files that were rendered successfully.
+    """
+    wait(futures)
+    return [future.result() for future in futures if future.exception() is None]
@@ -1,16 +1,98 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Dict, List
 
 if TYPE_CHECKING:
     from argparse import Namespace
 
+import glob, os
+
 from common.options import Options
+from compiler.dots import DotGraphOutput
 
-class CompilerContext():
 
-    compiler_args, name_of_top_module = None, None
-    options, output_options, files, parsed_modules, functions = [], [], [], [], []
+def expand_source_files(sources: List[str]) -> List[str]:
+    """ Expand the source files given on the command line into a list of Python files.
+
+        Directories are replaced with the ``.py`` files directly inside them, and glob patterns
+        (i.e. ``kernels/**/*.py``) with the files they match. Plain paths are kept as they are,
+        so that a missing file is reported when it is compiled.
+
+        Args:
+            sources: Files, directories or glob patterns.
+
+        Returns:
+            List of files, in the order they were given and without duplicates.
+    """
+    files = []
+
+    for source in sources:
+        if os.path.isdir(source):
+            files.extend(sorted(glob.glob(os.path.join(glob.escape(source), "*.py"))))
+        elif glob.has_magic(source):
+            files.extend(sorted(glob.glob(source, recursive=True)))
+        else:
+            files.append(source)
+
+    return list(dict.fromkeys(files))
+
+
+def get_output_dirs(files: List[str], output_root: str = "output") -> List[str]:
+    """ Pick an output folder for each source file.
+
+        A single file writes straight into ``output_root``. When compiling several files, each one
+        gets its own subfolder named after the file, so the generated files don't overwrite each other.
+
+        Args:
+            files: Source files that will be compiled.
+            output_root: Folder to place the outputs in.
+
+        Returns:
+            List of output folders, in the same order as ``files``.
+    """
+    if len(files) == 1:
+        return [output_root]
+
+    output_dirs = []
+    used_names = set()
+
+    for file in files:
+        name = os.path.splitext(os.path.basename(file))[0]
+
+        # files with the same name from different folders
+        unique_name, counter = name, 1
+        while unique_name in used_names:
+            counter += 1
+            unique_name = f"{name}_{counter}"
+
+        used_names.add(unique_name)
+        output_dirs.append(os.path.join(output_root, unique_name))
 
+    return output_dirs
+
+
+def parse_max_units(limits: List[str]) -> Dict[str, int]:
+    """ Parse the unit limits given on the command line, i.e. ``mult=4 div=1``.
+
+        Args:
+            limits: Limits, each an operation name and the maximum number of units separated by ``=``.
+
+        Returns:
+            Maximum number of units, indexed by the name of the operation.
+    """
+    max_units = {}
+
+    for limit in limits:
+        operation, separator, count = limit.partition("=")
+
+        if not separator or not count.isdigit():
+            raise Exception(f"expected a unit limit as OPERATION=COUNT (i.e. mult=4), got '{limit}'")
+
+        max_units[operation.lower()] = int(count)
+
+    return max_units
+
+
+class CompilerContext():
 
     def __init__(self, args: Namespace = None):
         """ Init function for the CompilerContext class.
@@ -29,6 +111,8 @@ class CompilerContext():
         """
 
         self.compiler_args = args
+        self.name_of_top_module = None
+        self.options, self.output_options, self.files, self.parsed_modules, self.functions = [], [], [], [], []
         self._legacy_arg_setter()
 
         self.user_wants_spirv_asm = self.compiler_args.asm
@@ -38,6 +122,19 @@ class CompilerContext():
         self.use_dark_theme_for_dots = self.compiler_args.dark_dots
         self.gen_yosys_script = self.compiler_args.gen_yosys
         self.gen_comms = not self.compiler_args.no_comms # invert so it make sense
+        self.optimise = not self.compiler_args.no_opt
+        self.max_units = parse_max_units(self.compiler_args.max_units or [])
+        self.jobs = self.compiler_args.jobs
+        self.user_wants_profile = self.compiler_args.profile or self.compiler_args.profile_cprofile or self.compiler_args.profile_baseline is not None
+        self.user_wants_cprofile = self.compiler_args.profile_cprofile
+
+        # cached files would skip the stages being measured
+        self.use_cache = not self.compiler_args.no_cache and not self.user_wants_profile
+        self.cache_dir = self.compiler_args.cache_dir
+        self.cache_size_mb = self.compiler_args.cache_size
+        self.is_daemon = self.compiler_args.watch or self.compiler_args.socket is not None
+        self.dots = DotGraphOutput(self.compiler_args.dots)
+        self.wait_for_dots = self.compiler_args.wait_for_dots
 
     def _legacy_arg_setter(self):
         """ Method to set the arguments due to legacy issues.
@@ -55,7 +152,7 @@ class CompilerContext():
         if self.compiler_args.asm:
             self.output_options.append(Options.OUTPUT_SPIRV_ASM)
 
-        self.files.append(self.compiler_args.source_file)
+        self.files.extend(expand_source_files(self.compiler_args.source_file))
 
     
     def get_top_module_name(self) -> str:
@@ -64,4 +161,23 @@ class CompilerContext():
             Returns:
                 Name of the top module as defined by the user.
         """
-        return self.compiler_args.top
\ No newline at end of file
+        return self.compiler_args.top
+
+    def get_output_affecting_options(self) -> dict:
+        """ Get the options that change which files are generated, or what they contain.
+
+            Returns:
+                Dictionary of option names and values, used as part of the compile cache key.
+        """
+        return {
+            "top": self.compiler_args.top,
+            "asm": self.user_wants_spirv_asm,
+            "spirv_only": self.user_only_wants_spirv,
+            "dark_dots": self.use_dark_theme_for_dots,
+            "gen_yosys": self.gen_yosys_script,
+            "gen_comms": self.gen_comms,
+            "optimise": self.optimise,
+            "max_units": self.max_units,
+            # renders aren't cached, they're redone from the restored sources
+            "dots": DotGraphOutput.NONE.value if self.dots is DotGraphOutput.NONE else DotGraphOutput.SOURCE.value,
+        }
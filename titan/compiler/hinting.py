@@ -7,11 +7,11 @@ from compiler.node import NodeTypeContext, NodeModuleData, Node
 from common.type import DataType, StorageType
 
 class spirv_id_and_type_context(TypedDict):
-    spirv_id: str
+    spirv_id: int
     type_context: NodeTypeContext
 
 class spirv_id_and_node(TypedDict):
-    id: str
+    id: int
     node: List[Node]
 
 class module_name_and_data(TypedDict):
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-import graphviz, logging
-from typing import NamedTuple, List, Tuple, Union
+import bisect, heapq, itertools, logging
+from typing import NamedTuple, Dict, List, Set, Tuple, Union
 from enum import Enum, auto
 
 # import dataflow
 import compiler.hinting as hinting
+from compiler.dots import render_dot_file
 from common.type import DataType
 from common.symbols import Operation, Operation_Type
 from common.errors import TitanErrors
@@ -15,8 +16,8 @@ class NodeContext(NamedTuple):
     
         Attributes:
             line_no (int): Line of the SPIR-V assembly this node referring to.
-            id (str): Associated SPIR-V ID.
-            type_id (str): Associated type ID.
+            id (int): Associated SPIR-V ID, see ``IdTable``.
+            type_id (int): Associated type ID.
             input_left (titan.Node): Left parent node.
             input_right (titan.Node): Right parent node.
             operation (titan.common.symbols.Operation): Operation being performed by the node.
@@ -24,31 +25,88 @@ class NodeContext(NamedTuple):
             is_comparison (bool): Set if this node doing a comparison.
     """
     line_no: int = 0
-    id: str = ""
-    type_id: str = ""
+    id: int = None
+    type_id: int = None
     input_left: Node = None
     input_right: Node = None
     operation: Operation = None
     data: list = []
     is_comparison: bool = False # OpSelect -- why not use the operation to determine this?
-    array_id: str = ""
-    array_index_id: str = ""
+    array_id: int = None
+    array_index_id: int = None
+
+class IdTable():
+    """ Allocates small integer IDs for SPIR-V IDs.
+
+        The graph is keyed by these integers rather than the SPIR-V ID text, which is kept in a
+        side table and only used when generating Verilog or dot graphs.
+
+        Attributes:
+            names: Name of every allocated ID (without '%'), indexed by the ID.
+    """
+
+    names: List[str]
+
+    def __init__(self):
+        self.names = []
+        self._ids = {}
+
+    def get_id(self, spirv_id: str) -> int:
+        """ Get the integer ID for a SPIR-V ID, allocating one if it hasn't been seen before.
+
+            Args:
+                spirv_id: SPIR-V ID, i.e. "%a".
+
+            Returns:
+                Integer ID.
+        """
+        id = self._ids.get(spirv_id)
+
+        if id is None:
+            id = len(self.names)
+            self._ids[spirv_id] = id
+            self.names.append(spirv_id[1:] if spirv_id.startswith("%") else spirv_id)
+
+        return id
+
+    def get_name(self, id: int) -> str:
+        """ Get the name of an integer ID.
+
+            Args:
+                id: Integer ID.
+
+            Returns:
+                Name of the SPIR-V ID, without '%'.
+        """
+        return self.names[id]
+
 
 class Node:
     """ Node class. 
     
         Attributes:
             spirv_line_no (int): SPIR-V assembly line number.
-            spirv_id (str): Assigned SPIR-V ID.
-            type_id (str): Stores the type ID of the nodes type.
+            spirv_id (int): Assigned SPIR-V ID, see ``IdTable``.
+            type_id (int): Stores the type ID of the nodes type.
             input_left (titan.compiler.node.Node): Left parent node.
             input_right (titan.compiler.node.Node): Right parent node.
             operation (titan.common.symbols.Operation): Operation that the node is performing.
             data (None): TODO
             is_comparison (bool): TODO
             tick (int): Integer representing at what stage in the pipeline this should be executed.
+            array_id (int): ID of the array being accessed, for array operations.
+            array_index_id (int): ID of the index being accessed, for array operations.
+
+        Note:
+            Nodes use ``__slots__`` rather than a ``__dict__``, since large graphs hold a lot of them.
+            Attributes can't be added to a node beyond the ones listed here.
     """
 
+    __slots__ = (
+        "spirv_line_no", "spirv_id", "type_id", "input_left", "input_right", "operation",
+        "data", "is_comparison", "tick", "array_id", "array_index_id"
+    )
+
     @staticmethod
     def _calculate_tick(left_node: int, right_node: int, comparison_node: int = None) -> int:
         """ Calculate the correct tick for the node.
@@ -74,11 +132,11 @@ class Node:
             return 0
 
     @staticmethod
-    def _set_tick_during_init(context: NodeContext):
+    def _set_tick_during_init(context: NodeContext | Node):
         """ Calculate the tick for the node during initialisation. 
         
             Args:
-                context: Context about the node to create.
+                context: Context about the node to create, or the node itself.
         """
 
         l_node_val = None if context.input_left == None else context.input_left.tick
@@ -112,22 +170,39 @@ class Node:
         self.array_index_id = context.array_index_id
 
 
+    def replace(self, **changes) -> Node:
+        """ Create a copy of the node with some of its attributes changed, the same way as ``NamedTuple._replace``.
+
+            Avoids building a ``NodeContext`` from every attribute of the node. The tick of the copy is calculated
+            the same way as a new node.
+
+            Args:
+                changes: New value of each attribute to change, i.e. ``input_left=node``.
+
+            Returns:
+                New node.
+        """
+        assert "tick" not in changes, f"the tick of a node is calculated from its parents"
+
+        node = Node.__new__(Node)
+
+        for attribute in Node.__slots__:
+            setattr(node, attribute, changes.pop(attribute) if attribute in changes else getattr(self, attribute))
+
+        assert not changes, f"unexpected node attributes: {list(changes.keys())}"
+
+        node.tick = Node._set_tick_during_init(node)
+        return node
+
     def _update_tick(self) -> int:
         """ Helper function to update the tick when one of the parent nodes are changed.
+
+            Calculated the same way as a new node, so a node keeps the same tick if its parents haven't changed.
         
             Returns:
                 Recalculated tick value.
         """
-        left_node_is_none = self.input_left == None
-        right_node_is_none = self.input_right == None
-
-        l_node_val = None if left_node_is_none else self.input_left.tick
-        r_node_val = None if right_node_is_none else self.input_right.tick
-
-        if self.is_comparison:
-            return Node._calculate_tick(l_node_val, r_node_val, self.data[0].tick)
-        else:
-            return Node._calculate_tick(l_node_val, r_node_val)
+        return Node._set_tick_during_init(self)
 
 
     def update_input(self, pos: int, new_node: Node):
@@ -135,6 +210,9 @@ class Node:
         
             Automatically recalculates the tick for the current node.
 
+            Note:
+                Doesn't update the consumers or tick groups recorded by ``NodeAssembler``, use ``NodeAssembler.modify_node`` for nodes in a module.
+
             Args:
                 pos: 0 = left node, 1 = right node
                 new_node: New node to update the input with.
@@ -184,31 +262,99 @@ class NodeTypeContext(NamedTuple):
     type: DataType = None
     data: list = []
     is_pointer: bool = False
-    alias: str = "" # alias is used to store the original type id when is_pointer is set to True
+    alias: int = None # alias is used to store the original type id when is_pointer is set to True
     is_array: bool = False
-    array_dimension_id: str = ""
+    array_dimension_id: int = None
+
+class DeadNodeReport(NamedTuple):
+    """ Tuple describing what was removed by ``NodeAssembler.remove_dead_nodes``.
+
+        Attributes:
+            nodes: Number of nodes removed.
+            registers: Number of removed nodes that would have been a register in the generated Verilog.
+    """
+    nodes: int = 0
+    registers: int = 0
+
+class SharedUnit(NamedTuple):
+    """ Tuple describing a hardware unit shared between ticks, see ``NodeAssembler.schedule``.
+
+        Attributes:
+            operation: Operation performed by the unit.
+            index: Index of the unit, among the units performing the same operation.
+            nodes: Nodes using the unit, at most one per tick, in tick order.
+    """
+    operation: Operation
+    index: int
+    nodes: List[Node]
 
 class NodeModuleData():
     """ Class encapsulating information required for a module.
     
         Attributes:
             types: All types contained within the function.
-            inputs: A list of all inputs.
-            outputs: A list of all outputs.
+            inputs: IDs of all inputs.
+            outputs: IDs of all outputs.
             body_nodes: A dictionary containing all body nodes, with the SPIR-V ID as its key and a list of associated nodes as its value.
+                The last node of each list is the latest version of the ID.
+            consumers: Nodes using each ID as an input (left, right or in their data, i.e. the comparison of a decision),
+                with the SPIR-V ID being used as the key. Kept up to date by ``NodeAssembler``.
+            ticks: Every body node, grouped by tick. Each group is in the same order as ``body_nodes``. Kept up to date
+                by ``NodeAssembler``, see ``NodeAssembler.get_nodes_by_tick``.
+            symbol_order: Position of each SPIR-V ID in ``body_nodes``, used to keep ``ticks`` in order.
+            shared_units: Hardware units shared between ticks, see ``NodeAssembler.schedule``. Empty if every node has its own.
     """
-    types: hinting.spirv_id_and_type_context = {}
-    inputs: List[str] = []
-    outputs: List[str] = []
-    body_nodes: hinting.spirv_id_and_node = {}
+    types: hinting.spirv_id_and_type_context
+    inputs: List[int]
+    outputs: List[int]
+    body_nodes: hinting.spirv_id_and_node
+    consumers: hinting.spirv_id_and_node
+    ticks: Dict[int, List[Node]]
+    symbol_order: Dict[int, int]
+    shared_units: List[SharedUnit]
+
+    def __init__(self):
+        self.types = {}
+        self.inputs = []
+        self.outputs = []
+        self.body_nodes = {}
+        self.consumers = {}
+        self.ticks = {}
+        self.symbol_order = {}
+        self.shared_units = []
 
 
 class NodeAssembler():
-    """ Node assembler. """
+    """ Node assembler.
 
-    content: hinting.module_name_and_data = {}
-    declared_symbols = []
-    
+        Attributes:
+            content: Module data for each module, indexed by the module name.
+            ids: Integer IDs used for every SPIR-V ID in the graph.
+            declared_symbols: Symbols that have been declared so far.
+            written_files: Paths of every dot graph source written.
+            render_futures: Futures of the dot graphs being rendered in the background.
+            dot_sources: Source of every dot graph generated, indexed by file name.
+    """
+
+    content: hinting.module_name_and_data
+    ids: IdTable
+    declared_symbols: Set[int]
+
+    def __init__(self):
+        self.content = {}
+        self.ids = IdTable()
+        self.declared_symbols = set()
+        self.written_files = []
+        self.render_futures = []
+        self.dot_sources = {}
+
+    def get_id(self, spirv_id: str) -> int:
+        """ Get the integer ID used in the graph for a SPIR-V ID, see ``IdTable.get_id``. """
+        return self.ids.get_id(spirv_id)
+
+    def get_id_name(self, id: int) -> str:
+        """ Get the name of an integer ID (without '%'), see ``IdTable.get_name``. """
+        return self.ids.get_name(id)
 
     def _overwrite_body_nodes(self, module_name: str, nodes: List[Node]):
         """ Overwrite an existing set of nodes for a given module/function.
@@ -223,7 +369,29 @@ class NodeAssembler():
         """
 
         # self.content[module_name].nodes = nodes
-        self.content[module_name].body_nodes = nodes
+        module_data = self.content[module_name]
+        module_data.body_nodes = nodes
+        module_data.consumers = {}
+        module_data.ticks = {}
+        module_data.symbol_order = {node_id: position for position, node_id in enumerate(nodes)}
+
+        for versions in nodes.values():
+            for node in versions:
+                self._add_consumer(module_name, node)
+                module_data.ticks.setdefault(node.tick, []).append(node)
+
+    def _add_consumer(self, module_name: str, node: Node):
+        """ Record a node as a consumer of each node it uses as an input.
+
+            Args:
+                module_name: Module the node is in.
+                node: Node to record.
+        """
+        consumers = self.content[module_name].consumers
+
+        for parent in [node.input_left, node.input_right, *node.data]:
+            if isinstance(parent, Node):
+                consumers.setdefault(parent.spirv_id, []).append(node)
 
     # NOTE: equiv. to create_function
     def create_module(self, module_name: str):
@@ -245,12 +413,49 @@ class NodeAssembler():
                 module_name: Module to ad to.
                 node: Node to add.
         """
+        module_data = self.content[module_name]
+
         if not self.node_exists(module_name, node.spirv_id):
-            self.content[module_name].body_nodes[node.spirv_id] = []
+            module_data.body_nodes[node.spirv_id] = []
+            module_data.symbol_order[node.spirv_id] = len(module_data.symbol_order)
+
+        module_data.body_nodes[node.spirv_id].append(node)
+        self._add_consumer(module_name, node)
+        self._add_to_tick(module_name, node)
 
-        self.content[module_name].body_nodes[node.spirv_id].append(node)
+    def _add_to_tick(self, module_name: str, node: Node):
+        """ Add a node to the group of its tick, after the nodes of every ID before it in ``body_nodes``.
 
-    def add_type_context_to_module(self, module_name: str, type_id: str, type_context: NodeTypeContext):
+            Args:
+                module_name: Module the node is in.
+                node: Node to add.
+        """
+        symbol_order = self.content[module_name].symbol_order
+        nodes = self.content[module_name].ticks.setdefault(node.tick, [])
+
+        # nodes are usually added in order, so only search when they aren't
+        if not nodes or symbol_order[nodes[-1].spirv_id] <= symbol_order[node.spirv_id]:
+            nodes.append(node)
+        else:
+            bisect.insort_right(nodes, node, key=lambda node: symbol_order[node.spirv_id])
+
+    def _move_to_tick(self, module_name: str, node: Node, old_tick: int):
+        """ Move a node whose tick has changed to the group of its new tick.
+
+            Args:
+                module_name: Module the node is in.
+                node: Node to move.
+                old_tick: Tick the node was grouped under.
+        """
+        ticks = self.content[module_name].ticks
+        ticks[old_tick].remove(node)
+
+        if not ticks[old_tick]:
+            del ticks[old_tick]
+
+        self._add_to_tick(module_name, node)
+
+    def add_type_context_to_module(self, module_name: str, type_id: int, type_context: NodeTypeContext):
         """ Add a type context to a function.
         
             Args:
@@ -260,7 +465,7 @@ class NodeAssembler():
         """
         self.content[module_name].types[type_id] = type_context
 
-    def get_type_context_from_module(self, module_name: str, type_id: str) -> NodeTypeContext:
+    def get_type_context_from_module(self, module_name: str, type_id: int) -> NodeTypeContext:
         """ Get type context from a module using a type ID.
         
             Args:
@@ -272,7 +477,7 @@ class NodeAssembler():
         """
         return self.content[module_name].types[type_id]
     
-    def type_exists_in_module(self, module_name: str, type_id: str) -> bool:
+    def type_exists_in_module(self, module_name: str, type_id: int) -> bool:
         """ Check if a type exists for a given module.
         
             Args:
@@ -284,31 +489,31 @@ class NodeAssembler():
         """
         return True if type_id in self.content[module_name].types else False
     
-    def add_output_to_module(self, module_name: str, symbol: str):
+    def add_output_to_module(self, module_name: str, symbol: int):
         """ Add an output to a module.
         
             Args:
                 module_name: Module to add to.
-                symbol: Symbol to add as an output.
+                symbol: ID of the symbol to add as an output.
         """
         self.content[module_name].outputs.append(symbol)
 
-    def add_input_to_module(self, module_name: str, symbol: str):
+    def add_input_to_module(self, module_name: str, symbol: int):
         """ Add an input to a module.
         
             Args:
                 module_name: Module to add to.
-                symbol: Symbol to add as an input.
+                symbol: ID of the symbol to add as an input.
         """
         self.content[module_name].inputs.append(symbol)
 
-    def is_symbol_an_input(self, module_name: str, symbol: str) -> bool:
+    def is_symbol_an_input(self, module_name: str, symbol: int) -> bool:
         return symbol in self.content[module_name].inputs
     
-    def is_symbol_an_output(self, module_name: str, symbol: str) -> bool:
+    def is_symbol_an_output(self, module_name: str, symbol: int) -> bool:
         return symbol in self.content[module_name].outputs
 
-    def get_datatype_from_id(self, module_name: str, id: str) -> DataType:
+    def get_datatype_from_id(self, module_name: str, id: int) -> DataType:
         """ Return primative type from ID.
         
             Args:
@@ -320,7 +525,7 @@ class NodeAssembler():
         """
         return self.content[module_name].types[id].type
 
-    def get_primative_type_id_from_id(self, module_name: str, id: str) -> str:
+    def get_primative_type_id_from_id(self, module_name: str, id: int) -> int:
         """ Returns the associated primative type ID given an ID of a symbol.
         
             Can handle pointers too.
@@ -345,7 +550,7 @@ class NodeAssembler():
         assert best_type != None, f"unable to find primative type from datatype"
         return best_type
 
-    def get_array_node_dimensions(self, module_name: str, node_id: str) -> int | tuple[int]:
+    def get_array_node_dimensions(self, module_name: str, node_id: int) -> int | tuple[int]:
         """ Get the array dimensions using the ID of the array.
         
             Args:
@@ -363,7 +568,7 @@ class NodeAssembler():
         return array_max_size
 
     # renamed from does_node_exist
-    def node_exists(self, module_name: str, node_id: str) -> bool:
+    def node_exists(self, module_name: str, node_id: int) -> bool:
         """ Checks if a node exists in a given module.
         
             Args:
@@ -375,7 +580,7 @@ class NodeAssembler():
         """
         return True if node_id in self.content[module_name].body_nodes else False
     
-    def does_node_exist_in_dict(self, node_dict: dict[Node], node_id: str) -> bool:
+    def does_node_exist_in_dict(self, node_dict: dict[Node], node_id: int) -> bool:
         """ Checks if a node exists in the node dictionary.
         
             Args:
@@ -387,7 +592,7 @@ class NodeAssembler():
         """
         return True if node_id in node_dict else False
     
-    def get_node(self, module_name: str, node_id: str) -> Node:
+    def get_node(self, module_name: str, node_id: int) -> Node:
         """ Gets the latest node given a node ID in a given function.
         
             Args:
@@ -399,27 +604,71 @@ class NodeAssembler():
         """
         # -1 for the very latest node
         return self.content[module_name].body_nodes[node_id][-1]
+
+    def get_node_versions(self, module_name: str, node_id: int) -> List[Node]:
+        """ Get every version of a node ID, i.e. the declaration of a symbol followed by each store to it.
+
+            Args:
+                module_name: Module to fetch from.
+                node_id: Node ID to fetch.
+
+            Returns:
+                Nodes for the given node ID, oldest first. Empty if the ID has no nodes.
+        """
+        return self.content[module_name].body_nodes.get(node_id, [])
+
+    def get_consumers(self, module_name: str, node_id: int) -> List[Node]:
+        """ Get the nodes using any version of a node ID as an input, without searching the graph.
+
+            Args:
+                module_name: Module to fetch from.
+                node_id: Node ID being used.
+
+            Returns:
+                Nodes using the ID, in the order they were added. Empty if nothing uses the ID.
+        """
+        return self.content[module_name].consumers.get(node_id, [])
     
     def get_number_of_inputs(self, module_name: str) -> int:
         return len(self.content[module_name].inputs)
 
-    def get_list_of_inputs(self, module_name: str) -> list:
-        return self.content[module_name].inputs
+    def get_list_of_inputs(self, module_name: str) -> List[str]:
+        return [self.get_id_name(symbol) for symbol in self.content[module_name].inputs]
 
     def get_number_of_outputs(self, module_name: str):
         return len(self.content[module_name].outputs)
 
-    def get_list_of_outputs(self, module_name: str) -> list:
-        return self.content[module_name].outputs
+    def get_list_of_outputs(self, module_name: str) -> List[str]:
+        return [self.get_id_name(symbol) for symbol in self.content[module_name].outputs]
+
+    def get_pipeline_depth(self, module_name: str) -> int:
+        """ Get the number of ticks between the inputs of a module and its last output.
+
+            Outputs are assigned on the tick after the value they're assigned is ready, so this is one less than
+            the tick of the last output store.
+
+            Args:
+                module_name: Name of the module.
+
+            Returns:
+                Pipeline depth of the module, zero if the outputs are assigned straight from the inputs.
+        """
+        module_data = self.content[module_name]
+        output_ticks = [
+            node.tick for output in module_data.outputs for node in module_data.body_nodes.get(output, [])
+            if node.operation is Operation.STORE
+        ]
+
+        return max(max(output_ticks, default=0) - 1, 0)
 
     # default arg_pos is [1, 2] since its commonly used
     # however different values needed for other nodes
     def get_left_and_right_nodes(self, module_name: str, line, arg_pos: list[int] = [1, 2]) -> Tuple[Node, Node]:
-        left = self.get_node(module_name, line.opcode_args[arg_pos[0]])
-        right = self.get_node(module_name, line.opcode_args[arg_pos[1]])
+        left = self.get_node(module_name, self.get_id(line.opcode_args[arg_pos[0]]))
+        right = self.get_node(module_name, self.get_id(line.opcode_args[arg_pos[1]]))
         return (left, right)
     
-    def modify_node(self, module_name: str, target_node_id: str, pos: int, value_node: Node, operation: Operation = Operation.NOP):
+    def modify_node(self, module_name: str, target_node_id: int, pos: int, value_node: Node, operation: Operation = Operation.NOP):
         """ Modify the parents and/or the operation of a node within a module.
         
             Args:
@@ -436,41 +685,28 @@ class NodeAssembler():
         logging.debug(f"\toperation {x.operation} should update to {operation}")
 
         if pos == 0:
-            new_ctx = NodeContext(
-                x.spirv_line_no, x.spirv_id, x.type_id, value_node, x.input_right, operation, x.data
-            )
+            new_node = x.replace(input_left=value_node, operation=operation)
 
         elif pos == 1:
-            new_ctx = NodeContext(
-                x.spirv_line_no, x.spirv_id, x.type_id, x.input_left, value_node, operation, x.data
-            )
+            new_node = x.replace(input_right=value_node, operation=operation)
+
+        logging.debug(f"new node: {new_node}")
 
-        logging.debug(f"new node context: {new_ctx}")
+        self.add_body_node_to_module(module_name, new_node)
 
-        self.content[module_name].body_nodes[target_node_id].append(Node(new_ctx))
+    def get_nodes_by_tick(self, module_name: str) -> Dict[int, List[Node]]:
+        """ Get the nodes of a module grouped by tick.
 
-    def _sort_body_nodes_by_tick(self, module_name: str) -> dict:
-        """ Sorts the nodes in ascending order (0 -> max tick).
+            The groups are kept up to date as nodes are added, so nothing is sorted here.
         
             Args:
-                module_name: Name of module to sort nodes of.
+                module_name: Name of module to get the nodes of.
 
             Returns:
-                New dictionary containing sorted nodes, with the tick as the key.
+                Nodes of each tick, with the tick as the key. Each group is in the same order as ``body_nodes``.
+                This is the module's own dictionary, so it shouldn't be modified.
         """
-        tick_dict = {}
-
-        # logging.debug(f"nodes before {len(self.content[module_name].body_nodes)}: {self.content[module_name].body_nodes}")
-        # TODO: can we just use list comprehension on this?
-        for symbols in self.content[module_name].body_nodes:
-            for node in self.content[module_name].body_nodes[symbols]:
-
-                if node.tick not in tick_dict.keys():
-                    tick_dict[node.tick] = []
-
-                tick_dict[node.tick].append(node)
-        # logging.debug(f"nodes after {len(tick_dict)}: {tick_dict}")
-        return tick_dict
+        return self.content[module_name].ticks
     
     @staticmethod
     def _parent_exists(node: Node) -> bool:
@@ -508,15 +744,27 @@ class NodeAssembler():
 
         return count
     
-    def generate_dot_graph(self, file_name_suffix: str = "", clean_nodes = None, dark_mode: bool = False):
+    def generate_dot_graph(self, file_name_suffix: str = "", clean_nodes = None, dark_mode: bool = False, output_dir: str = "output", render: bool = True):
         """ Generates Graphviz dot graphs of the dataflow of a function. Requires the ``graphviz`` package.
+
+            The ``.dot`` source is kept in ``dot_sources`` and written straight away, while rendering it happens in the background
+            (see ``titan.compiler.dots.render_dot_file``), with the pending renders kept in ``render_futures``.
         
             Args:
                 file_name_suffix: String to append to the filename.
                 clean_nodes: List of clean/optimised nodes.
+                dark_mode: Use dark theme for the graph.
+                output_dir: Folder to place the ``dots`` folder in, ``None`` to not write anything.
+                render: Render the graph with the ``dot`` binary, as well as writing the source.
         """
+        # slow to import, and only needed here
+        import graphviz
+
+        def _label(node: Node) -> str:
+            return f"%{self.get_id_name(node.spirv_id)}"
+
         for module in self.content.keys():
-            dot = graphviz.Digraph(comment=f"digraph for {module}", filename=f"digraph_{module}{file_name_suffix}.dot", directory="output/dots") 
+            dot = graphviz.Digraph(comment=f"digraph for {module}", filename=f"digraph_{module}{file_name_suffix}.dot", directory=f"{output_dir}/dots" if output_dir is not None else "") 
             
             # dark mode
             if dark_mode:
@@ -528,7 +776,7 @@ class NodeAssembler():
                 colour = "black"
 
             if clean_nodes is None:
-                x = self._sort_body_nodes_by_tick(module)
+                x = self.get_nodes_by_tick(module)
             else:
                 x = clean_nodes
 
@@ -539,8 +787,8 @@ class NodeAssembler():
                     
                     try:
                         for v in x[k]:
-                            current_node_label = f"{v.spirv_id}_{k}"
-                            ds.node(current_node_label, f"{v.spirv_id} at tick {k} \n({v.operation})", color=colour, fontcolor=colour)
+                            current_node_label = f"{_label(v)}_{k}"
+                            ds.node(current_node_label, f"{_label(v)} at tick {k} \n({v.operation})", color=colour, fontcolor=colour)
 
                             if self._parent_exists(v):
                                 # check which parents exist
@@ -549,11 +797,11 @@ class NodeAssembler():
                                     case 1:
                                         # ds.edge()
                                         # get parent name/spirv id
-                                        parent_id_label = f"{v.input_left.spirv_id}_{v.input_left.tick}"
+                                        parent_id_label = f"{_label(v.input_left)}_{v.input_left.tick}"
                                         ds.edge(parent_id_label, current_node_label, color=colour)
 
                                     case 2:
-                                        parent_id_label = f"{v.input_right.spirv_id}_{v.input_right.tick}"
+                                        parent_id_label = f"{_label(v.input_right)}_{v.input_right.tick}"
                                         ds.edge(parent_id_label, current_node_label, color=colour)
                                     case 3:
 
@@ -562,19 +810,19 @@ class NodeAssembler():
                                         # two nodes.
                                         if v.is_comparison:
                                             if v.input_left.operation is Operation.STORE:
-                                                parent_l_id_label = f"{v.input_left.input_left.spirv_id}_{self.get_node(module, v.input_left.input_left.spirv_id).tick}"
+                                                parent_l_id_label = f"{_label(v.input_left.input_left)}_{self.get_node(module, v.input_left.input_left.spirv_id).tick}"
 
                                             if v.input_right.operation is Operation.STORE:
-                                                parent_r_id_label = f"{v.input_right.input_right.spirv_id}_{self.get_node(module, v.input_right.input_right.spirv_id).tick}"
+                                                parent_r_id_label = f"{_label(v.input_right.input_right)}_{self.get_node(module, v.input_right.input_right.spirv_id).tick}"
                                         else:
-                                            parent_l_id_label = f"{v.input_left.spirv_id}_{v.input_left.tick}"
-                                            parent_r_id_label = f"{v.input_right.spirv_id}_{v.input_right.tick}"
+                                            parent_l_id_label = f"{_label(v.input_left)}_{v.input_left.tick}"
+                                            parent_r_id_label = f"{_label(v.input_right)}_{v.input_right.tick}"
 
                                         ds.edge(parent_l_id_label, current_node_label, color=colour if not v.is_comparison else "green")
                                         ds.edge(parent_r_id_label, current_node_label, color=colour if not v.is_comparison else "red")
 
                                         if v.is_comparison:
-                                            parent_compare_id_label = f"{v.data[0].spirv_id}_{v.data[0].tick}"
+                                            parent_compare_id_label = f"{_label(v.data[0])}_{v.data[0].tick}"
                                             ds.edge(parent_compare_id_label, current_node_label, color=colour)
 
                                     case _:
@@ -583,99 +831,128 @@ class NodeAssembler():
                     except KeyError:
                         continue
 
-            dot.render(view=False, overwrite_source=True)
+            self.dot_sources[dot.filename] = dot.source
 
-    def _find_best_parents(self, subject_node: Node) -> Node | tuple[Node, Node]:
+            if output_dir is None:
+                continue
+
+            dot.save()
+            self.written_files.append(dot.filepath)
+
+            if render:
+                self.render_futures.append(render_dot_file(dot.filepath, dot.engine, dot.format))
+
+    def _find_best_parents(self, subject_node: Node, resolved: dict) -> tuple[Node, ...]:
         """ Attempt to find the best parents.
 
+            Each node is only resolved once, the result is kept in ``resolved`` so chains of loads
+            and stores aren't walked again for every node that uses them.
+
             Args:
                 subject_node: Node to determine best parents for.
+                resolved: Best parents of the nodes resolved so far, updated in place.
 
             Returns:
-                best_node: Best parent (single).
-                best_nodes: Best parents (tuple).
+                Best parents, either one or two nodes.
 
             TODO:
                 What's actually defined as being the best parent? AFAIK it was any non-temporary 
                 node but will need to double check.
-            
-            FIXME:
-                Avoid mixing different returns. This method can either return a single Node or 
-                a tuple of Nodes.
+        """
+        best_nodes = resolved.get(subject_node)
+
+        if best_nodes is None:
+            best_nodes = self._resolve_best_parents(subject_node, resolved)
+            resolved[subject_node] = best_nodes
+
+        return best_nodes
+
+    def _find_best_parent(self, subject_node: Node, resolved: dict) -> Node:
+        """ Find the best parent of a node that is used as a single operand.
+
+            Args:
+                subject_node: Node to determine the best parent for.
+                resolved: Best parents of the nodes resolved so far, updated in place.
+
+            Returns:
+                Best parent.
+        """
+        best_nodes = self._find_best_parents(subject_node, resolved)
+        assert len(best_nodes) == 1, f"expected a single best parent for node: {subject_node}, got {len(best_nodes)}"
+
+        return best_nodes[0]
+
+    def _resolve_best_parents(self, subject_node: Node, resolved: dict) -> tuple[Node, ...]:
+        """ Determine the best parents of a node, see ``_find_best_parents``.
+
+            Args:
+                subject_node: Node to determine best parents for.
+                resolved: Best parents of the nodes resolved so far, updated in place.
+
+            Returns:
+                Best parents, either one or two nodes.
         """
         # if the node is a constant declaration, return itself
         if subject_node.operation in Operation_Type.GENERIC_CONSTANT_DECLARATION:
-          return subject_node
+          return (subject_node,)
 
         # if node is a GLOBAL variable and is declared, return itself as being the best (this assumes that it is either an input or output of the function)
         if subject_node.operation in Operation_Type.GENERIC_VARIABLE_DECLARATION and subject_node.spirv_id in self.declared_symbols:
-            return subject_node
+            return (subject_node,)
 
-        # if variable is just storing a constant
-        if subject_node.operation is Operation.STORE and subject_node.input_left.operation in Operation_Type.GENERIC_CONSTANT_DECLARATION:
-            return subject_node.input_left
-        
+        # a stored variable is best represented by the value being stored (including constants)
         if subject_node.operation is Operation.STORE:
-            return subject_node.input_left
-        
-        if subject_node.operation is Operation.ARRAY_INDEX:
-            return subject_node
-        
-        if subject_node.operation is Operation.ARRAY_LOAD:
-            return subject_node
+            stored_node = subject_node.input_left
+
+            # storing a temporary load copies the value that was loaded, i.e. "w = v" once the optimiser removes "* 1"
+            if stored_node.operation is Operation.LOAD and stored_node.spirv_id not in self.declared_symbols:
+                return self._find_best_parents(stored_node, resolved)
+
+            return (stored_node,)
         
-        if subject_node.operation is Operation.ARRAY_STORE:
-            return subject_node
+        if subject_node.operation in (Operation.ARRAY_INDEX, Operation.ARRAY_LOAD, Operation.ARRAY_STORE):
+            return (subject_node,)
 
         # a non existant id means that it was created for either loading or arithmetic
         if subject_node.spirv_id not in self.declared_symbols:
 
             # if a temp id was only created for loading an existing value
             if subject_node.operation is Operation.LOAD:
-                return self._find_best_parents(subject_node.input_left)
+                return self._find_best_parents(subject_node.input_left, resolved)
             
-            elif subject_node.operation in Operation_Type.ARITHMETIC:
-                # tandem arithmetic means that this node references a previous node that is also an arithmetic node
+            elif subject_node.operation in Operation_Type.ARITHMETIC | Operation_Type.BITWISE:
+                # tandem arithmetic means that this node references a previous node that is also an arithmetic (or shift) node
                 # for example:
                 # %titan_id_0 = OpIAdd %int %const_3 %const_5
                 # %titan_id_1 = OpIMul %int %titan_id_0 %const_2
                 # 
                 # we want to retain the refereced arithmetic node id (%titan_id_0) in this case, because it is the best parent for the left side
-                # so tandem_arith_left will be True
-                tandem_arith_left = True if subject_node.input_left.operation in Operation_Type.ARITHMETIC else False
-                tandem_arith_right = True if subject_node.input_right.operation in Operation_Type.ARITHMETIC else False
-                # print(f"tal: {tandem_arith_left} - tar: {tandem_arith_right}")
-
-                if tandem_arith_left and tandem_arith_right:
-                    return (subject_node.input_left, subject_node.input_right)
-                elif tandem_arith_left:
-                    return (subject_node.input_left, self._find_best_parents(subject_node.input_right))
-                elif tandem_arith_right:
-                    return (self._find_best_parents(subject_node.input_left), subject_node.input_right)
-                else:
-                    return (self._find_best_parents(subject_node.input_left), self._find_best_parents(subject_node.input_right))
+                tandem_arith_left = subject_node.input_left.operation in Operation_Type.ARITHMETIC | Operation_Type.BITWISE
+                tandem_arith_right = subject_node.input_right.operation in Operation_Type.ARITHMETIC | Operation_Type.BITWISE
+
+                return (
+                    subject_node.input_left if tandem_arith_left else self._find_best_parent(subject_node.input_left, resolved),
+                    subject_node.input_right if tandem_arith_right else self._find_best_parent(subject_node.input_right, resolved),
+                )
                 
             # if its an actual comparison (and not a decision node), find the best parent nodes
             elif subject_node.operation in Operation_Type.COMPARISON and subject_node.operation is not Operation.DECISION:
-                return (self._find_best_parents(subject_node.input_left), self._find_best_parents(subject_node.input_right))
+                return (self._find_best_parent(subject_node.input_left, resolved), self._find_best_parent(subject_node.input_right, resolved))
             
             # if its a decision node, the best node will be the comparison node that just came before it, so return it
             elif subject_node.operation is Operation.DECISION:
-                return subject_node.data[0] 
-            
-            elif subject_node.operation in Operation_Type.BITWISE:
-                return (self._find_best_parents(subject_node.input_left), self._find_best_parents(subject_node.input_right))
+                return (subject_node.data[0],)
             
         raise Exception(f"was unable to determine anything for node: {subject_node} -- missing case?")
        
-    def _evaluate_parents_for_non_temp_id(self, current_node: Node) -> list:
+    def _evaluate_parents_for_non_temp_id(self, current_node: Node, resolved: dict) -> list:
         """ Method to evaluate the parents of a node for non-temporary IDs.
         
-            Calls ``titan.machine._find_best_parents`` internally, kinda acts like a wrapper function
-            to handle the scuffed returns.
+            Calls ``_find_best_parents`` internally.
 
             Args:
                 current_node: Node to determine best parents for.
+                resolved: Best parents of the nodes resolved so far, updated in place.
             
             Returns:
                 The ID(s) of the best parent(s). Can either be a one or two-element list.
@@ -684,19 +961,13 @@ class NodeAssembler():
         # in spirv, this looks something like:
         #   %1 = OpLoad %type_int %a
         # where %1 is a temporary id containing the value of %a
-        
-        best = self._find_best_parents(current_node)
-        node_names = []
-
-        try:
-            node_names = [best[0].spirv_id, best[1].spirv_id]
-        except:
-            node_names = [best.spirv_id]
-
-        return node_names
+        return [node.spirv_id for node in self._find_best_parents(current_node, resolved)]
     
     def clean_graph(self):
         """ Method to remove temporary nodes generated by SPIR-V. 
+
+            The nodes are visited once, in order of their tick. Every parent has an earlier tick than
+            its children, so the cleaned version of each best parent already exists when it's needed.
         
             Does not return anything, overwrites the existing node list.
         """
@@ -708,115 +979,284 @@ class NodeAssembler():
             else:
                 raise Exception(TitanErrors.UNEXPECTED.value, TitanErrors.UNEXPECTED.name)
 
-        def _update_node_dict(node_dict, node_name: str, node_ctx: NodeContext):
+        def _update_node_dict(node_dict, node_name: str, new_node: Node):
             if node_name in node_dict:
-                node_dict[node_name].append(Node(node_ctx))
+                node_dict[node_name].append(new_node)
             else:
-                node_dict[node_name] = [Node(node_ctx)]
-
-
+                node_dict[node_name] = [new_node]
 
         for function in self.content.keys():
             clean_nodes: hinting.spirv_id_and_node = {}
-            tick_ordered_nodes = self._sort_body_nodes_by_tick(function)
-
-            logging.debug(f"tick: 0")
-            for node in tick_ordered_nodes[0]:
-                if node.spirv_id not in clean_nodes:
-                    logging.debug(f"{node.spirv_id} did not exist in clean nodes and was added: {node}")
-                    clean_nodes[node.spirv_id] = [node]
-                else:
-                    logging.debug(f"{node.spirv_id} was appended to clean nodes list: {node}")
-                    clean_nodes[node.spirv_id].append(node)
-
-            for tick in range(1, len(tick_ordered_nodes.keys())): #TODO: remove .keys() call
-                logging.debug(f"tick: {tick}")
-                _debug_str = f"node: {node}"
+            resolved = {}
+            tick_ordered_nodes = self.get_nodes_by_tick(function)
+
+            for tick in sorted(tick_ordered_nodes):
                 for node in tick_ordered_nodes[tick]:
 
-                    if node.spirv_id not in self.declared_symbols and node.operation is Operation.LOAD:
-                        _debug_str = _debug_str + f"....ignored ({node.spirv_id})"
+                    # nodes without parents are kept as they are
+                    if tick == 0:
+                        _update_node_dict(clean_nodes, node.spirv_id, node)
                         continue
 
-                    # logging.debug(_debug_str)
+                    # temporary loads are replaced by whatever they load
+                    if node.spirv_id not in self.declared_symbols and node.operation is Operation.LOAD:
+                        continue
 
                     # if _eval_parents_for_non_temp_id(node) returns a spirv id
                     # we should just try and reference the latest one in the clean
                     # nodes dict
-                    logging.debug(f"{node}")
-                    best_node_names = self._evaluate_parents_for_non_temp_id(node)
-                    logging.debug(f"returned with {best_node_names}")
+                    best_node_names = self._evaluate_parents_for_non_temp_id(node, resolved)
 
                     if len(best_node_names) == 1:
-                        # print(f"returned with one node: {best_node_names[0]}")
-                        # logging.debug(f"returned with one node: {best_node_names[0]}")
 
-                        if self.does_node_exist_in_dict(clean_nodes, node.spirv_id):
+                        if node.spirv_id in clean_nodes:
                             n = _fetch_last_node(clean_nodes, best_node_names[0])
+                            new_node = node.replace(input_left=n, input_right=None)
+
+                        elif node.is_comparison:
+                            # accessing the node data should fetch the related comparison line & its info
+                            # we assume that it is in the 0th index
+                            n = _fetch_last_node(clean_nodes, node.data[0].spirv_id)
+                            new_node = node.replace(data=[n])
+                                
+                        else:
+                            new_node = node.replace()
 
-                            new_ctx = NodeContext(
-                                line_no=node.spirv_line_no, id=node.spirv_id, type_id=node.type_id,
-                                input_left=n, input_right=None, operation=node.operation, data=node.data,
-                                is_comparison=node.is_comparison, array_id=node.array_id, array_index_id=node.array_index_id
-                            )
+                    else:
+                        n1 = _fetch_last_node(clean_nodes, best_node_names[0])
+                        n2 = _fetch_last_node(clean_nodes, best_node_names[1])
+                        new_node = node.replace(input_left=n1, input_right=n2)
 
-                            logging.debug(f"updating with the following context: {new_ctx}")
-                            _update_node_dict(clean_nodes, node.spirv_id, new_ctx)
+                    _update_node_dict(clean_nodes, node.spirv_id, new_node)
 
-                        else:
+            # formatting every node is slow on large graphs, so only do it when it will be shown
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug(f"---- symbol dump ----")
+                for symbol in clean_nodes:
+                    logging.debug(symbol)
+                    for node in clean_nodes[symbol]:
+                        logging.debug(f"\t{node}")
 
-                            # print(f"-[Verilog_ASM.clean_graph] node {node} does not exist in clean dict")
+                logging.debug(f"---- end symbol dump ----")
 
-                            if node.is_comparison:
-                                # accessing the node data should fetch the related comparison line & its info
-                                # we assume that it is in the 0th index
-                                n = _fetch_last_node(clean_nodes, node.data[0].spirv_id)
+            self._overwrite_body_nodes(function, clean_nodes)
 
-                                new_ctx = NodeContext(
-                                    line_no=node.spirv_line_no, id=node.spirv_id, type_id=node.type_id,
-                                    input_left=node.input_left, input_right=node.input_right,
-                                    operation=node.operation, data=[n], is_comparison=node.is_comparison,
-                                    array_id=node.array_id, array_index_id=node.array_index_id
-                                )
-                                
-                            else:
-                                # TODO: is there a way to get the current context of the node without recreating it?
-                                new_ctx = NodeContext(
-                                    line_no=node.spirv_line_no, id=node.spirv_id, type_id=node.type_id,
-                                    input_left=node.input_left, input_right=node.input_right, 
-                                    operation=node.operation, data=node.data, is_comparison=node.is_comparison,
-                                    array_id=node.array_id, array_index_id=node.array_index_id
-                                )
+    def _is_register(self, node: Node, decided_comparisons: Set[Node]) -> bool:
+        """ Check whether a node is given a register by ``titan.compiler.verilog.VerilogAssember.compile_text``.
 
-                            logging.debug(f"updating with the following context: {new_ctx}")
-                            _update_node_dict(clean_nodes, node.spirv_id, new_ctx)
+            Args:
+                node: Node to check.
+                decided_comparisons: Comparison nodes used by a decision node, these are merged into the decision.
 
+            Returns:
+                True if a ``logic`` value is declared for the node, else false.
+        """
+        if node.operation in Operation_Type.ARITHMETIC:
+            return node.spirv_id not in self.declared_symbols
 
+        if node.operation in Operation_Type.COMPARISON:
+            return node not in decided_comparisons
 
-                    elif len(best_node_names) == 2:
-                        # print(f"returned with two nodes: {best_node_names}")
-                        logging.debug(f"returned with two nodes: {best_node_names}")
-                        n1 = _fetch_last_node(clean_nodes, best_node_names[0])
-                        n2 = _fetch_last_node(clean_nodes, best_node_names[1])
+        return node.operation in Operation_Type.BITWISE or node.operation is Operation.DECISION
+
+    @staticmethod
+    def _get_module_parents(body_nodes: Dict[str, List[Node]], module_nodes: Set[Node], node: Node) -> List[Node]:
+        """ Get the parents of a node (its inputs, and the comparison of a decision node) within its module.
+
+            Inputs that aren't in the module any more (i.e. the older version of a variable kept by a decision
+            node after ``clean_graph``) are found by the ID ``titan.compiler.verilog.VerilogAssember.compile_text``
+            names them by, so the nodes of the register it uses are returned instead.
+
+            Args:
+                body_nodes: Body nodes of the module.
+                module_nodes: Every node in the module.
+                node: Node to get the parents of.
+
+            Returns:
+                Parents of the node, there may be duplicates.
+        """
+        parents = []
+
+        for parent in [node.input_left, node.input_right, *node.data]:
+            if not isinstance(parent, Node):
+                continue
+
+            if parent in module_nodes:
+                parents.append(parent)
+            else:
+                # a stored value is named after the value being stored
+                named_id = parent.input_left.spirv_id if parent.operation is Operation.STORE else parent.spirv_id
+                parents.extend(body_nodes.get(named_id, []))
+
+        return parents
+
+    def remove_dead_nodes(self) -> DeadNodeReport:
+        """ Remove nodes that don't contribute to any output of their module.
+
+            Works backwards from the ports, marking every node reachable through the inputs of a node
+            (and the comparison of a decision node) as live. Array operations are always kept, since the
+            nodes that use them are found by ID rather than by reference. Constant declarations are kept
+            as they don't generate anything.
+
+            Inputs that aren't in the module any more are followed to the register they are named after, see
+            ``_get_module_parents``.
+
+            Should be called after ``clean_graph``, overwrites the existing node list.
+
+            Returns:
+                Number of nodes and registers removed across every module.
+        """
+        removed_nodes = removed_registers = 0
+
+        for module_name, module_data in self.content.items():
+            body_nodes = module_data.body_nodes
+            ports = set(module_data.inputs) | set(module_data.outputs)
+
+            to_visit = [
+                node for node_id, nodes in body_nodes.items()
+                if node_id in ports or any(node.operation in Operation_Type.ARRAY_OPERATIONS for node in nodes)
+                for node in nodes
+            ]
+            live = set()
+            module_nodes = {node for nodes in body_nodes.values() for node in nodes}
+
+            while to_visit:
+                node = to_visit.pop()
+
+                if node is None or node in live:
+                    continue
+
+                live.add(node)
+
+                to_visit.extend(self._get_module_parents(body_nodes, module_nodes, node))
+
+                for referenced_id in [node.array_id, node.array_index_id]:
+                    to_visit.extend(body_nodes.get(referenced_id, []))
+
+            dead = [
+                node for nodes in body_nodes.values() for node in nodes
+                if node not in live and node.operation not in Operation_Type.GENERIC_CONSTANT_DECLARATION
+            ]
+
+            if not dead:
+                continue
+
+            decided_comparisons = {
+                node.data[0] for nodes in body_nodes.values() for node in nodes if node.operation is Operation.DECISION
+            }
+
+            removed_nodes += len(dead)
+            removed_registers += sum(1 for node in dead if self._is_register(node, decided_comparisons))
+
+            dead = set(dead)
+            live_nodes = {node_id: [node for node in nodes if node not in dead] for node_id, nodes in body_nodes.items()}
+            self._overwrite_body_nodes(module_name, {node_id: nodes for node_id, nodes in live_nodes.items() if nodes})
+
+            logging.debug(f"removed dead nodes from {module_name}: {[str(node) for node in dead]}")
+
+        logging.info(f"removed {removed_nodes} dead node(s), {removed_registers} of which would have been registers")
+        return DeadNodeReport(removed_nodes, removed_registers)
+
+    def schedule(self, max_units: Dict[Operation, int]):
+        """ Limit the number of hardware units of each operation, sharing them between ticks.
+
+            Every node is normally placed on the tick after its parents (as soon as possible), which gives each node
+            its own unit, i.e. a multiplier for every multiplication. Operations with more nodes than their limit are
+            list scheduled instead. The nodes are placed tick by tick, those on the longest path to an output first, and
+            a node that doesn't fit is moved to a later tick along with the nodes that use it. The nodes placed on each
+            tick are then bound to units, see ``titan.compiler.node.NodeModuleData.shared_units``.
+
+            A module with shared units takes one tick per clock cycle, so a new result is only ready every
+            ``max tick + 1`` clock cycles rather than on every clock cycle.
+
+            Should be called after ``clean_graph``, updates the ticks of the existing nodes.
+
+            Args:
+                max_units: Maximum number of units of each arithmetic operation.
+        """
+        for operation, limit in max_units.items():
+            assert operation in Operation_Type.ARITHMETIC, f"only arithmetic operations can be limited, got {operation}"
+            assert limit >= 1, f"at least one unit is needed for {operation}, got {limit}"
+
+        for module_name, module_data in self.content.items():
+            ticks = self.get_nodes_by_tick(module_name)
+            nodes = [node for tick in sorted(ticks) for node in ticks[tick]]
+
+            limits = {
+                operation: limit for operation, limit in max_units.items()
+                if sum(1 for node in nodes if node.operation is operation) > limit
+            }
+            module_data.shared_units = []
+
+            if not limits:
+                continue
+
+            # parents include the values picked by a decision, even though its tick normally only depends on the comparison
+            graph = set(nodes)
+            parents = {node: list(dict.fromkeys(self._get_module_parents(module_data.body_nodes, graph, node))) for node in nodes}
+            children = {node: [] for node in nodes}
+            waiting = {node: len(parents[node]) for node in nodes}
+
+            for node in nodes:
+                for parent in parents[node]:
+                    children[parent].append(node)
+
+            # number of ticks from each node to the end of the graph, the longest paths are the most urgent
+            topological_order = [node for node in nodes if waiting[node] == 0]
+            remaining = dict(waiting)
+
+            for node in topological_order:
+                for child in children[node]:
+                    remaining[child] -= 1
+
+                    if remaining[child] == 0:
+                        topological_order.append(child)
+
+            height = {}
+            for node in reversed(topological_order):
+                height[node] = max((height[child] + 1 for child in children[node]), default=0)
+
+            def earliest_tick(node: Node) -> int:
+                # a decision waits for the values it selects as well, they may have been moved past its comparison
+                if node.operation is Operation.DECISION:
+                    return max(parent.tick for parent in parents[node]) + 1
+
+                return node._update_tick()
+
+            order = itertools.count()
+            ready = [(earliest_tick(node), -height[node], next(order), node) for node in nodes if waiting[node] == 0]
+            heapq.heapify(ready)
+            units_used = {}
+            placed = {operation: {} for operation in limits}
+            old_ticks = {}
+
+            while ready:
+                tick, _, _, node = heapq.heappop(ready)
+
+                if node.operation in limits:
+                    while units_used.get((node.operation, tick), 0) >= limits[node.operation]:
+                        tick += 1
+
+                    units_used[(node.operation, tick)] = units_used.get((node.operation, tick), 0) + 1
+                    placed[node.operation].setdefault(tick, []).append(node)
 
-                        # print(f"\t{n1}\n\t{n2}")
-                        logging.debug(f"\tnode 1:{n1}")
-                        logging.debug(f"\tnode 2: {n2}")
+                if tick != node.tick:
+                    old_ticks[node] = node.tick
+                    node.tick = tick
 
-                        new_ctx = NodeContext(
-                            line_no=node.spirv_line_no, id=node.spirv_id, type_id=node.type_id,
-                            input_left=n1, input_right=n2, operation=node.operation, data=node.data,
-                            is_comparison=node.is_comparison, array_id=node.array_id, array_index_id=node.array_index_id
-                        )
+                for child in children[node]:
+                    waiting[child] -= 1
 
-                        _update_node_dict(clean_nodes, node.spirv_id, new_ctx)
+                    if waiting[child] == 0:
+                        heapq.heappush(ready, (earliest_tick(child), -height[child], next(order), child))
 
-            logging.debug(f"---- symbol dump ----")
-            for symbol in clean_nodes:
-                logging.debug(symbol)
-                for node in clean_nodes[symbol]:
-                    logging.debug(f"\t{node}")
+            for node, old_tick in old_ticks.items():
+                self._move_to_tick(module_name, node, old_tick)
 
-            logging.debug(f"---- end symbol dump ----")
+            for operation, nodes_by_tick in placed.items():
+                for index in range(max(len(tick_nodes) for tick_nodes in nodes_by_tick.values())):
+                    module_data.shared_units.append(SharedUnit(
+                        operation, index, [nodes_by_tick[tick][index] for tick in sorted(nodes_by_tick) if index < len(nodes_by_tick[tick])]
+                    ))
 
-            self._overwrite_body_nodes(function, clean_nodes)
\ No newline at end of file
+            logging.info(f"{module_name} shares {len(module_data.shared_units)} unit(s) after moving {len(old_ticks)} node(s) to later ticks, a new result is ready every {max(self.get_nodes_by_tick(module_name)) + 1} clock cycles")
@@ -0,0 +1,149 @@
+import ast
+from typing import List, Tuple
+
+INT32_BITS = 32
+
+# multiplying by a constant that needs more shifts than this is left to a multiplier
+MAX_SHIFT_ADD_TERMS = 3
+
+# loops with more iterations than this are rejected rather than unrolled
+MAX_UNROLL_ITERATIONS = 1024
+
+# operations where swapping the operands gives the same result
+COMMUTATIVE_OPCODES = {"OpIAdd", "OpIMul", "OpFAdd", "OpFMult", "OpBitwiseAnd", "OpBitwiseOr", "OpBitwiseXor"}
+
+# operators where chains can be evaluated in any order, i.e. (a + b) + c is a + (b + c), for integers
+ASSOCIATIVE_OPERATORS = (ast.Add, ast.Mult, ast.BitAnd, ast.BitOr, ast.BitXor)
+
+def wrap_int32(value: int) -> int:
+    """ Wrap an integer to a signed 32-bit integer, the same way ``OpTypeInt 32 1`` overflows.
+
+        Args:
+            value: Integer to wrap.
+
+        Returns:
+            Two's complement value of the lowest 32 bits.
+    """
+    value &= (1 << INT32_BITS) - 1
+    return value - (1 << INT32_BITS) if value >> (INT32_BITS - 1) else value
+
+
+def fold_integer_binop(operation: ast.operator, left: int, right: int) -> int | None:
+    """ Evaluate an integer operation at compile time.
+
+        Matches the SPIR-V opcode used for the operation (i.e. ``OpSDiv`` rounds towards zero and
+        ``OpShiftRightLogical`` shifts in zeros), rather than Python's own behaviour.
+
+        Args:
+            operation: Operator of the ``ast.BinOp``.
+            left: Left operand.
+            right: Right operand.
+
+        Returns:
+            Result of the operation, or ``None`` if it can't be folded (i.e. division by zero,
+            shifting by 32 bits or more, or an unsupported operator).
+    """
+    match operation:
+        case ast.Add():
+            result = left + right
+
+        case ast.Sub():
+            result = left - right
+
+        case ast.Mult():
+            result = left * right
+
+        case ast.Div():
+            if right == 0:
+                return None
+
+            result = abs(left) // abs(right)
+            if (left < 0) != (right < 0):
+                result = -result
+
+        case ast.LShift():
+            if not 0 <= right < INT32_BITS:
+                return None
+
+            result = left << right
+
+        case ast.RShift():
+            if not 0 <= right < INT32_BITS:
+                return None
+
+            result = (left & ((1 << INT32_BITS) - 1)) >> right
+
+        case ast.BitAnd():
+            result = left & right
+
+        case ast.BitOr():
+            result = left | right
+
+        case ast.BitXor():
+            result = left ^ right
+
+        case _:
+            return None
+
+    return wrap_int32(result)
+
+
+def get_shift_add_terms(value: int) -> List[Tuple[int, int]]:
+    """ Split a constant into a sum of signed powers of two, using the fewest terms (canonical signed digit form).
+
+        I.e. ``7`` is ``8 - 1``, so ``x * 7`` can be done with ``(x << 3) - x``.
+
+        Args:
+            value: Constant to split.
+
+        Returns:
+            Shift and sign (1 or -1) of each term, from the lowest power of two to the highest.
+    """
+    terms = []
+    shift = 0
+
+    while value != 0:
+        if value & 1:
+            # pick whichever of +1/-1 leaves a multiple of 4, so the next digit is zero
+            digit = 2 - (value & 3)
+            terms.append((shift, digit))
+            value -= digit
+
+        value >>= 1
+        shift += 1
+
+    return terms
+
+
+def get_power_of_two(value: int) -> int | None:
+    """ Get the exponent of a power of two.
+
+        Args:
+            value: Value to check.
+
+        Returns:
+            ``n`` if ``value`` is ``2 ** n``, otherwise ``None``.
+    """
+    if value <= 0 or value & (value - 1):
+        return None
+
+    return value.bit_length() - 1
+
+
+def build_balanced_tree(operation: ast.operator, operands: List[ast.expr]) -> ast.expr:
+    """ Combine operands with an operation as a balanced tree, i.e. ``(a + b) + (c + d)`` rather than ``((a + b) + c) + d``.
+
+        Args:
+            operation: Operator to combine the operands with.
+            operands: Operands to combine, at least one.
+
+        Returns:
+            Expression combining every operand, in the same order.
+    """
+    assert len(operands) > 0, "cannot combine an empty list of operands"
+
+    if len(operands) == 1:
+        return operands[0]
+
+    middle = len(operands) // 2
+    return ast.BinOp(build_balanced_tree(operation, operands[:middle]), operation, build_balanced_tree(operation, operands[middle:]))
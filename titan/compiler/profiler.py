@@ -0,0 +1,190 @@
+import cProfile, json, logging, os, time, tracemalloc
+from contextlib import contextmanager
+from typing import Dict, NamedTuple
+
+PROFILE_REPORT_VERSION = 1
+
+class StageProfile(NamedTuple):
+    """ Measurements taken for a single stage of the compiler.
+
+        Attributes:
+            wall_seconds: Wall clock time.
+            cpu_seconds: CPU time of the process.
+            peak_memory_bytes: Highest memory use during the stage, above what was in use when it started.
+                Only measured when memory tracing is enabled, ``0`` otherwise.
+    """
+    wall_seconds: float
+    cpu_seconds: float = 0.0
+    peak_memory_bytes: int = 0
+
+
+class StageProfiler():
+    """ Measures each stage of a compile.
+
+        Wall time is always recorded, since it's cheap. CPU time, peak memory (using ``tracemalloc``)
+        and ``cProfile`` stats are only collected when asked for, as they slow the compiler down.
+
+        Stages are expected to run one after another, not nested inside each other.
+
+        Attributes:
+            detailed: Measure CPU time and peak memory as well as wall time.
+            use_cprofile: Run ``cProfile`` for every stage.
+            stages: Measurements of each stage, in the order they ran.
+            cprofile_stats: ``cProfile.Profile`` of each stage, if ``use_cprofile`` is set.
+    """
+
+    def __init__(self, detailed: bool = False, use_cprofile: bool = False):
+        self.detailed = detailed
+        self.use_cprofile = use_cprofile
+        self.stages: Dict[str, StageProfile] = {}
+        self.cprofile_stats: Dict[str, cProfile.Profile] = {}
+
+        # only stop tracing if it was started here
+        self._started_tracemalloc = False
+
+        if self.detailed and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def stop(self):
+        """ Stop memory tracing, if it was started by this profiler. """
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    @contextmanager
+    def stage(self, name: str):
+        """ Context manager that measures everything run inside it as one stage.
+
+            A stage that runs more than once has its measurements added together,
+            with the peak memory being the highest of the runs.
+
+            Args:
+                name: Name of the stage.
+        """
+        profile = None
+
+        if self.detailed:
+            memory_at_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            cpu_start_time = time.process_time()
+
+        if self.use_cprofile:
+            profile = self.cprofile_stats.setdefault(name, cProfile.Profile())
+            profile.enable()
+
+        wall_start_time = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            wall_seconds = time.perf_counter() - wall_start_time
+
+            if profile is not None:
+                profile.disable()
+
+            if self.detailed:
+                cpu_seconds = time.process_time() - cpu_start_time
+                peak_memory_bytes = max(tracemalloc.get_traced_memory()[1] - memory_at_start, 0)
+            else:
+                cpu_seconds, peak_memory_bytes = 0.0, 0
+
+            previous = self.stages.get(name, StageProfile(0.0))
+            self.stages[name] = StageProfile(
+                wall_seconds=previous.wall_seconds + wall_seconds,
+                cpu_seconds=previous.cpu_seconds + cpu_seconds,
+                peak_memory_bytes=max(previous.peak_memory_bytes, peak_memory_bytes)
+            )
+
+    def get_stage_seconds(self) -> Dict[str, float]:
+        """ Returns the wall time of each stage. """
+        return {name: stage.wall_seconds for name, stage in self.stages.items()}
+
+    def get_report(self) -> Dict[str, dict]:
+        """ Returns every measurement of each stage, as plain dictionaries that can be turned into JSON. """
+        return {name: stage._asdict() for name, stage in self.stages.items()}
+
+    def dump_cprofile_stats(self, folder: str):
+        """ Write the ``cProfile`` stats of each stage to ``<folder>/<stage>.prof``.
+
+            The files can be inspected with ``pstats`` or tools such as ``snakeviz``.
+
+            Args:
+                folder: Folder to write into, created if it doesn't exist.
+        """
+        os.makedirs(folder, exist_ok=True)
+
+        for name, profile in self.cprofile_stats.items():
+            profile.dump_stats(os.path.join(folder, f"{name.replace(' ', '_')}.prof"))
+
+
+def write_profile_report(path: str, file_reports: Dict[str, Dict[str, dict]]):
+    """ Write the measurements of every compiled file into a JSON report.
+
+        Along with the stages of each file, the report contains the total of each stage across all
+        files, so that runs over the same set of files can be compared.
+
+        Args:
+            path: File to write to.
+            file_reports: Output of ``StageProfiler.get_report`` for each source file.
+    """
+    totals = {}
+
+    for stages in file_reports.values():
+        for name, stage in stages.items():
+            total = totals.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "peak_memory_bytes": 0})
+            total["wall_seconds"] += stage["wall_seconds"]
+            total["cpu_seconds"] += stage["cpu_seconds"]
+            total["peak_memory_bytes"] = max(total["peak_memory_bytes"], stage["peak_memory_bytes"])
+
+    report = {
+        "version": PROFILE_REPORT_VERSION,
+        "totals": totals,
+        "files": file_reports,
+    }
+
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4)
+
+    logging.info(f"Wrote profile report to {path}")
+
+
+def compare_profile_reports(baseline_path: str, report_path: str, threshold: float = 0.1) -> Dict[str, float]:
+    """ Compare the stage totals of a profile report against a baseline report, logging any regressions.
+
+        Args:
+            baseline_path: Previously written report to compare against.
+            report_path: Report of the current run.
+            threshold: Relative increase in wall time above which a stage is reported as slower, i.e. ``0.1`` for 10%.
+
+        Returns:
+            Relative change in wall time of each stage that's in both reports.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    with open(report_path) as f:
+        report = json.load(f)
+
+    changes = {}
+
+    for name, stage in report["totals"].items():
+        baseline_stage = baseline["totals"].get(name)
+
+        if baseline_stage is None:
+            logging.info(f"  {name}: new stage, {stage['wall_seconds']:.4f}s")
+            continue
+
+        if baseline_stage["wall_seconds"] == 0:
+            continue
+
+        change = stage["wall_seconds"] / baseline_stage["wall_seconds"] - 1
+        changes[name] = change
+
+        message = f"  {name}: {baseline_stage['wall_seconds']:.4f}s -> {stage['wall_seconds']:.4f}s ({change:+.1%})"
+        if change > threshold:
+            logging.warning(message)
+        else:
+            logging.info(message)
+
+    return changes
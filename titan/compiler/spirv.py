@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-import ast, logging, json
+import ast, copy, logging, json, heapq
 from enum import Enum, auto
-from typing import NamedTuple, Union, TypedDict
+from typing import NamedTuple, Tuple, Union, TypedDict
 from bidict import bidict
 
 import compiler.hinting as hinting
+from compiler.optimiser import build_balanced_tree, fold_integer_binop, get_shift_add_terms, get_power_of_two, ASSOCIATIVE_OPERATORS, COMMUTATIVE_OPCODES, INT32_BITS, MAX_SHIFT_ADD_TERMS, MAX_UNROLL_ITERATIONS
 from common.type import DataType, StorageType
+from common.instruction import SPIRVInstruction
 import common.errors as errors
 
 class SPIRVAssembler(ast.NodeVisitor):
@@ -85,71 +87,118 @@ class SPIRVAssembler(ast.NodeVisitor):
         type: DataType
         is_accessing_array: bool = False
 
+    class ValueKey(NamedTuple):
+        """ Tuple that identifies the value computed by an operation, used to reuse common subexpressions.
+
+            Attributes:
+                opcode: Opcode of the operation.
+                type_id: SPIR-V ID of the result type.
+                operands: IDs of the operands (without '%'), sorted if the operation is commutative.
+        """
+        opcode: str
+        type_id: str
+        operands: tuple
+
+    class LoopVariableSubstitution(ast.NodeTransformer):
+        """ Replaces every read of a loop variable with its value in one iteration, used to unroll loops.
+
+            Attributes:
+                variable: Name of the loop variable.
+                value: Value of the loop variable in the iteration.
+        """
+        def __init__(self, variable: str, value: int):
+            self.variable = variable
+            self.value = value
+
+        def visit_Name(self, node):
+            if node.id != self.variable:
+                return node
+
+            assert isinstance(node.ctx, ast.Load), f"loop variable '{self.variable}' cannot be assigned to inside the loop"
+
+            # negative literals are parsed as a negated constant, so they're written the same way here
+            if self.value < 0:
+                return ast.copy_location(ast.UnaryOp(ast.USub(), ast.Constant(-self.value)), node)
+
+            return ast.copy_location(ast.Constant(self.value), node)
+
+    class SymbolRenamer(ast.NodeTransformer):
+        """ Renames the local symbols of a function, and replaces its parameters with expressions, used to inline calls.
+
+            Attributes:
+                renames: New name of each renamed symbol.
+                substitutions: Expression to use instead of each substituted symbol, only read and never assigned to.
+        """
+        def __init__(self, renames: dict, substitutions: dict):
+            self.renames = renames
+            self.substitutions = substitutions
+
+        def visit_Name(self, node):
+            if node.id in self.substitutions:
+                return ast.copy_location(copy.deepcopy(self.substitutions[node.id]), node)
+
+            if node.id in self.renames:
+                return ast.copy_location(ast.Name(self.renames[node.id], node.ctx), node)
+
+            return node
+
+    class CallInliner(ast.NodeTransformer):
+        """ Replaces calls to functions of the module with the value they return, used to inline calls.
+
+            The statements of each inlined function are collected, so they can be placed before the statement the call was in.
+
+            Attributes:
+                assembler: Assembler holding the functions of the module.
+                statements: Statements of the inlined functions, in the order they need to be evaluated.
+                call_stack: Names of the functions currently being inlined, used to detect recursion.
+        """
+        def __init__(self, assembler: SPIRVAssembler, statements: list, call_stack: tuple):
+            self.assembler = assembler
+            self.statements = statements
+            self.call_stack = call_stack
+
+        def visit_Call(self, node):
+            # arguments are inlined first, since their statements need to come before the call's
+            self.generic_visit(node)
+
+            if not isinstance(node.func, ast.Name) or node.func.id not in self.assembler._functions:
+                return node
+
+            statements, return_value = self.assembler._inline_function(node, self.call_stack)
+            self.statements.extend(statements)
+
+            return return_value
+
     class symbol_info_hint(TypedDict):
         symbol_id: str
         info: SPIRVAssembler.SymbolInfo
 
-    class constant_context_and_id(TypedDict):
-        type: SPIRVAssembler.ConstContext
-        spirv_id: str
-
     class intermediate_id_and_ctx(TypedDict):
         intermediate_id: str
         id_ctx: SPIRVAssembler.IntermediateIDContext
 
     # attributes
-    entry_point = ""
-    _disable_debug = True
-    _latest_ifexp_selector_id = None
-    _latest_compare_id = None
-    _latest_function_name = None
-    _decorator_dict = {}
-    _import_mapping = bidict()
-
-
-    input_port_list: symbol_info_hint = {}
-    output_port_list: hinting.symbol_and_type = {}
-    symbol_info: symbol_info_hint = {}
-    declared_constants: constant_context_and_id = {}
-    declared_types: hinting.declared_types = {}
-    body = []
-
-    # attempts to align the output type list with the output port/symbol list
-    # this is so that the correct id (assuming that it is handled in order) will be assigned the correct type
-    # perhaps slightly over-engineered?
-    _internal_output_port_list_counter = 0 
-    output_type_list = []
-
-    location_id = 0
-    intermediate_id = 0
-    return_id = 0
-    intermediate_ids: intermediate_id_and_ctx = {}
-
-    _target_file = None
-    _tree = None
-
-    # TODO: remove the .name operators
-    generated_spirv = {
-        Sections.CAPABILITY_AND_EXTENSION.name: [],
-        Sections.ENTRY_AND_EXEC_MODES.name: [],
-        Sections.DEBUG_STATEMENTS.name: [],
-        Sections.ANNOTATIONS.name: [],
-        Sections.TYPES.name: [],
-        Sections.VAR_CONST_DECLARATIONS.name: [],
-        Sections.ARRAY_TYPES.name: [],
-        Sections.ARRAY_DECLARATIONS.name: [],
-        Sections.FUNCTIONS.name: []
-    }
-
-
-    def __init__(self, target_file: str, disable_debug=True):
+    # NOTE: every mutable attribute is created per instance in __init__, so that multiple
+    #       compilations in the same process don't share any state
+    input_port_list: symbol_info_hint
+    output_port_list: hinting.symbol_and_type
+    symbol_info: symbol_info_hint
+    declared_constants: bidict[ConstContext, str]
+    declared_types: bidict[TypeContext, str]
+    intermediate_ids: intermediate_id_and_ctx
+
+
+    def __init__(self, target_file: str = None, disable_debug=True, source: str = None, top: str = None, optimise: bool = True):
         """ Init function for _SPIRVHelperGenerator.
 
             Creates various attributes and allows for helper function access.
         
             Args:
                 disable_debug (bool): Disable debug output.
-                target_file: File to read.
+                target_file: File to read. Not needed if ``source`` is given.
+                source: Python source code to compile instead of reading ``target_file``.
+                top: Name of the function to use as the entry point, overrides the automatic detection.
+                optimise: Fold and propagate constants while generating SPIR-V.
 
             Attributes:
                 entry_point (string): TODO
@@ -167,16 +216,67 @@ class SPIRVAssembler(ast.NodeVisitor):
                 intermediate_id (int): Keep track of latest intermediate ID (used by unrolled expressions).
                 return_id (int): TODO
                 intermediate_ids: List of used intermediate IDs. Stores ID as string and primative type.
-                declared_constants: List of declared constants. Stores ConstContext and string ID of constant.
-                declared_types: List of declared types. Stores primative type and string ID.
+                declared_constants (bidict): Interning table of declared constants. Maps ConstContext to the string ID of the constant, and back.
+                declared_types (bidict): Interning table of declared types. Maps TypeContext to the string ID of the type, and back.
                 body: TODO
                 generated_spirv (dict): Dictionary indexed with Sections enum, and stores generated lines in a list.
                 _import_mapping (bidict): Bi-directional dictionary to store import names & aliases
+                written_files (list): Paths of every file written while compiling.
+                lagging_info_files (dict): Contents of the lagging information JSON files, indexed by file name.
+                _optimise (bool): Fold and propagate constants, and reuse common subexpressions. Set to value of parameter.
+                _known_constants (dict): Constant currently held by each symbol of the function being visited, if known.
+                _value_numbers (dict): ID of each operation already generated in the function being visited, indexed by ``ValueKey``.
+                _depths (dict): Number of operations between the inputs and each intermediate ID or symbol of the function being visited.
+                _functions (dict): Definition of each function in the module that is called by another function, indexed by name.
+                _inline_counter (int): Number of calls inlined so far, used to give the symbols of each inlined call unique names.
         """
 
+        self.entry_point = ""
         self._disable_debug = disable_debug
-        self._target_file = target_file
-        self._tree = ast.parse(open(self._target_file, "r").read())
+        self._latest_ifexp_selector_id = None
+        self._latest_compare_id = None
+        self._latest_function_name = None
+        self._decorator_dict = {}
+        self._import_mapping = bidict()
+
+        self.input_port_list = {}
+        self.output_port_list = {}
+        self.symbol_info = {}
+        self.declared_constants = bidict()
+        self.declared_types = bidict()
+        self.body = []
+
+        # attempts to align the output type list with the output port/symbol list
+        # this is so that the correct id (assuming that it is handled in order) will be assigned the correct type
+        # perhaps slightly over-engineered?
+        self._internal_output_port_list_counter = 0
+        self.output_type_list = []
+
+        self.location_id = 0
+        self.intermediate_id = 0
+        self.return_id = 0
+        self.intermediate_ids = {}
+
+        # TODO: remove the .name operators
+        self.generated_spirv = {section.name: [] for section in self.Sections}
+        self.written_files = []
+        self.lagging_info_files = {}
+        self._top = top
+        self._optimise = optimise
+        self._known_constants = {}
+        self._value_numbers = {}
+        self._depths = {}
+        self._functions = {}
+        self._inline_counter = 0
+
+        if source is None:
+            assert target_file is not None, "either a target file or source code is required"
+
+            with open(target_file, "r") as f:
+                source = f.read()
+
+        self._target_file = target_file if target_file is not None else "<string>"
+        self._tree = ast.parse(source, self._target_file)
 
     def dump(self):
         """ Output debug info if debug flag has been set. Uses the logging library."""
@@ -211,14 +311,21 @@ class SPIRVAssembler(ast.NodeVisitor):
                 for value in self.generated_spirv[section]:
                     logging.debug(f"\t{value}")
 
-    def add_line(self, section: Sections, line: str):
-        """ Add a generated line of SPIR-V to a given section.
+    def add_line(self, section: Sections, opcode: str, *opcode_args, result_id: str = ""):
+        """ Add a generated instruction of SPIR-V to a given section.
+
+            The instruction is stored as a ``titan.common.instruction.SPIRVInstruction``, text is only
+            created when the assembly is written out.
         
             Args:
-                section (titan.compiler.spirv.SPIRVAssembler.Sections): The section to append the line to.
-                line (str): The line to add.
+                section (titan.compiler.spirv.SPIRVAssembler.Sections): The section to append the instruction to.
+                opcode (str): SPIR-V opcode, i.e. "OpIAdd".
+                opcode_args: Operands of the instruction, in the order they appear in the assembly.
+                result_id (str): Result ID (with "%") of the instruction, if it produces one.
         """
-        self.generated_spirv[section.name].append(line)
+        self.generated_spirv[section.name].append(
+            SPIRVInstruction(opcode.removeprefix("Op"), result_id, tuple(str(arg) for arg in opcode_args))
+        )
 
 
     def add_output_type(self, type):
@@ -324,16 +431,16 @@ class SPIRVAssembler(ast.NodeVisitor):
             # keeping track of which id is used to create the symbol
             final_type_id = None
             
-            self.add_line(self.Sections.DEBUG_STATEMENTS, f"OpName %{symbol} \"{symbol}\"")
+            self.add_line(self.Sections.DEBUG_STATEMENTS, "OpName", f"%{symbol}", f"\"{symbol}\"")
 
             # if i/o
             if location is (StorageType.IN or StorageType.OUT):
                 # add location (glsl specific i think)
-                self.add_line(self.Sections.ANNOTATIONS, f"OpDecorate %{symbol} Location {self.location_id}")
+                self.add_line(self.Sections.ANNOTATIONS, "OpDecorate", f"%{symbol}", "Location", self.location_id)
 
                 if location is StorageType.IN:
                     # more glsl specific stuff
-                    self.add_line(self.Sections.ANNOTATIONS, f"OpDecorate %{symbol} Flat")
+                    self.add_line(self.Sections.ANNOTATIONS, "OpDecorate", f"%{symbol}", "Flat")
 
                     # input variable pointer type
                     ptr_id = self.add_type_if_nonexistant(
@@ -343,11 +450,11 @@ class SPIRVAssembler(ast.NodeVisitor):
 
 
                     if symbol_is_array:
-                        self.add_line(self.Sections.VAR_CONST_DECLARATIONS, f"%{symbol} = OpVariable {array_type_id} Input")
+                        self.add_line(self.Sections.ARRAY_DECLARATIONS, "OpVariable", array_type_id, "Input", result_id=f"%{symbol}")
                         final_type_id = array_type_id
 
                     else:
-                        self.add_line(self.Sections.VAR_CONST_DECLARATIONS, f"%{symbol} = OpVariable {ptr_id} Input")
+                        self.add_line(self.Sections.VAR_CONST_DECLARATIONS, "OpVariable", ptr_id, "Input", result_id=f"%{symbol}")
                         final_type_id = ptr_id
 
 
@@ -359,10 +466,10 @@ class SPIRVAssembler(ast.NodeVisitor):
                     )
 
                     if symbol_is_array:
-                        self.add_line(self.Sections.VAR_CONST_DECLARATIONS, f"%{symbol} = OpVariable {array_type_id} Output")
+                        self.add_line(self.Sections.VAR_CONST_DECLARATIONS, "OpVariable", array_type_id, "Output", result_id=f"%{symbol}")
                         final_type_id = array_type_id
                     else:
-                        self.add_line(self.Sections.VAR_CONST_DECLARATIONS, f"%{symbol} = OpVariable {ptr_id} Output")
+                        self.add_line(self.Sections.VAR_CONST_DECLARATIONS, "OpVariable", ptr_id, "Output", result_id=f"%{symbol}")
                         final_type_id = ptr_id
                         
 
@@ -376,10 +483,10 @@ class SPIRVAssembler(ast.NodeVisitor):
                 )
                 
                 if symbol_is_array:
-                    self.add_line(self.Sections.FUNCTIONS, f"%{symbol} = OpVariable {array_type_id} Function")
+                    self.add_line(self.Sections.FUNCTIONS, "OpVariable", array_type_id, "Function", result_id=f"%{symbol}")
                     final_type_id = array_type_id
                 else:
-                    self.add_line(self.Sections.FUNCTIONS, f"%{symbol} = OpVariable {ptr_id} Function")
+                    self.add_line(self.Sections.FUNCTIONS, "OpVariable", ptr_id, "Function", result_id=f"%{symbol}")
                     final_type_id = ptr_id
 
             # increment by 1 for regular variables, or by element count for arrays
@@ -502,9 +609,6 @@ class SPIRVAssembler(ast.NodeVisitor):
             Return:
                 ID of the type.
         """
-
-        # TODO: convoluted? may be a better way to do this
-        # can this just be replaced with indexing with the primative type instead of going through TypeContext?
         return self.declared_types[
             self.TypeContext(DataType(type))
         ]
@@ -533,11 +637,11 @@ class SPIRVAssembler(ast.NodeVisitor):
             # TODO: remove
             self.add_type(type_ctx, id)
 
-            spirv_txt = f"{id} = "
+            opcode, opcode_args = None, []
 
             if type_ctx.is_function_typedef:
                 prim_tid = self.get_primative_type_id(type_ctx.primative_type)
-                spirv_txt += f"OpTypeFunction {prim_tid}"
+                opcode, opcode_args = "OpTypeFunction", [prim_tid]
 
             elif type_ctx.is_pointer and not type_ctx.is_array:
                 prim_tid = self.get_primative_type_id(type_ctx.primative_type)
@@ -545,7 +649,7 @@ class SPIRVAssembler(ast.NodeVisitor):
 
                 assert type(storage_type_str) is str, f"did not get text for the storage type: {type_ctx.storage_type}"
 
-                spirv_txt += f"OpTypePointer {storage_type_str} {prim_tid}"
+                opcode, opcode_args = "OpTypePointer", [storage_type_str, prim_tid]
 
             elif type_ctx.is_array and not type_ctx.is_pointer:
                 prim_tid = self.get_primative_type_id(type_ctx.primative_type)
@@ -558,7 +662,7 @@ class SPIRVAssembler(ast.NodeVisitor):
                     )
                 )
 
-                spirv_txt += f"OpTypeArray {prim_tid} %{const_size_id}"
+                opcode, opcode_args = "OpTypeArray", [prim_tid, f"%{const_size_id}"]
 
             elif type_ctx.is_array and type_ctx.is_pointer:
                 
@@ -573,20 +677,20 @@ class SPIRVAssembler(ast.NodeVisitor):
                     )
                 )
 
-                spirv_txt += f"OpTypePointer {type_ctx.storage_type.value} {array_type_id}"
+                opcode, opcode_args = "OpTypePointer", [type_ctx.storage_type.value, array_type_id]
 
             # this should mean we're working with the primative types
             elif (not type_ctx.is_constant) and (not type_ctx.is_pointer) and (not type_ctx.is_function_typedef):
 
                 match type_ctx.primative_type:
                     case DataType.VOID:
-                        spirv_txt += f"OpTypeVoid"
+                        opcode = "OpTypeVoid"
                     case DataType.INTEGER:
-                        spirv_txt += f"OpTypeInt 32 1"
+                        opcode, opcode_args = "OpTypeInt", [32, 1]
                     case DataType.BOOLEAN:
-                        spirv_txt += f"OpTypeBool"
+                        opcode = "OpTypeBool"
                     case DataType.FLOAT:
-                        spirv_txt += f"OpTypeFloat 32"
+                        opcode, opcode_args = "OpTypeFloat", [32]
                     case _:
                         logging.exception(f"type text for {type_ctx} not implemented yet (did you wrap the type in a DataType() call to enum?)", exc_info=False)
                         raise Exception(f"type text for {type_ctx} not implemented yet (did you wrap the type in a DataType() call to enum?)")
@@ -598,12 +702,12 @@ class SPIRVAssembler(ast.NodeVisitor):
             if not type_ctx.is_array:
                 self.add_line(
                     self.Sections.TYPES,
-                    spirv_txt
+                    opcode, *opcode_args, result_id=id
             )
             else:
                 self.add_line(
                     self.Sections.ARRAY_TYPES,
-                    spirv_txt
+                    opcode, *opcode_args, result_id=id
                 )
 
             return id
@@ -611,6 +715,20 @@ class SPIRVAssembler(ast.NodeVisitor):
             return self.get_type_id(type_ctx)
         
     # const helpers
+    def _get_const_key(self, const: ConstContext) -> ConstContext:
+        """ Get the key used to intern a constant.
+
+            Constants are created with either a Python type or a ``DataType`` as their primative type,
+            so the key always uses ``DataType``. Otherwise the same constant could be declared twice.
+
+            Args:
+                const: Constant to get the key for.
+
+            Returns:
+                Constant context with a ``DataType`` primative type.
+        """
+        return self.ConstContext(DataType(const.primative_type), const.value)
+
     def const_exists(self, const: ConstContext | str) -> bool:
         """ Check if a constant exists.
 
@@ -620,7 +738,10 @@ class SPIRVAssembler(ast.NodeVisitor):
             Returns:
                 True if constant exists, else False.
         """
-        return const in self.declared_constants.keys() or const in self.declared_constants.values()
+        if isinstance(const, self.ConstContext):
+            return self._get_const_key(const) in self.declared_constants
+
+        return const in self.declared_constants.inverse
 
     # NOTE: unused, no references    
     # def add_const(self, c_ctx: ConstContext, spirv_id: str):
@@ -645,15 +766,17 @@ class SPIRVAssembler(ast.NodeVisitor):
                 constant_id: Returns the ID of the constant.
         """
 
+        const = self._get_const_key(const)
+
         if const not in self.declared_constants:
             txt_val = str(const.value)
-            const_str = f"const_{DataType(const.primative_type).name.lower()}"
+            const_str = f"const_{const.primative_type.name.lower()}"
 
             # format the string properly
             if negative_val:
                 txt_val = txt_val.replace("-", "n")
 
-            if const.primative_type is float:
+            if const.primative_type is DataType.FLOAT:
                 txt_val = txt_val.replace(".", "_")
 
             const_str += f"_{txt_val}"
@@ -665,7 +788,7 @@ class SPIRVAssembler(ast.NodeVisitor):
 
             self.add_line(
                 self.Sections.VAR_CONST_DECLARATIONS,
-                f"%{const_str} = OpConstant {self.get_primative_type_id(DataType(const.primative_type))} {const.value}"
+                "OpConstant", self.get_primative_type_id(DataType(const.primative_type)), const.value, result_id=f"%{const_str}"
             )
 
             return const_str
@@ -682,8 +805,7 @@ class SPIRVAssembler(ast.NodeVisitor):
             Returns:
                 ID of the constant.
         """
-        temp_c_ctx = self.ConstContext(type, value)
-        return self.declared_constants[temp_c_ctx]
+        return self.declared_constants[self._get_const_key(self.ConstContext(type, value))]
     
     def get_const_id_with_ctx(self, context: ConstContext) -> str:
         """ Get the ID of a constant, using ``ConstContext``.
@@ -694,7 +816,7 @@ class SPIRVAssembler(ast.NodeVisitor):
             Returns:
                 ID of the constant.
         """
-        return self.declared_constants[context]
+        return self.declared_constants[self._get_const_key(context)]
 
     def get_new_intermediate_id(self) -> str:
         """ Gets intermediate ID string and increments the counter.
@@ -725,7 +847,7 @@ class SPIRVAssembler(ast.NodeVisitor):
 
             self.add_line(
                 self.Sections.FUNCTIONS,
-                f"%{temp_id} = OpLoad {type_id} %{id}"
+                "OpLoad", type_id, f"%{id}", result_id=f"%{temp_id}"
             )
 
             return temp_id
@@ -740,7 +862,7 @@ class SPIRVAssembler(ast.NodeVisitor):
             temp_id = self.get_new_intermediate_id()
             self.add_line(
                 self.Sections.FUNCTIONS,
-                f"%{temp_id} = OpLoad {type_id} %{id}"
+                "OpLoad", type_id, f"%{id}", result_id=f"%{temp_id}"
             )
 
             return temp_id
@@ -757,36 +879,66 @@ class SPIRVAssembler(ast.NodeVisitor):
         if not self._disable_debug:
             self.dump()
 
-    # TODO: probably inefficient
-    def create_file_as_string(self) -> str:
-        """ Transforms the generated SPIR-V assembly from lists into a very long string.
+    def get_tree_dump(self) -> str:
+        """ Returns the parsed source as text, using ``ast.dump``.
 
-            TODO:
-                Rework this function. Must be a better way to do this.
+            Line numbers aren't included, so comments and formatting changes don't affect it.
+            Used as the key for ``titan.compiler.cache.CompileCache``.
+        """
+        return ast.dump(self._tree)
+
+    def get_instructions(self) -> list[SPIRVInstruction]:
+        """ Returns the generated SPIR-V as a flat list of instructions, in section order.
+
+            This is the in-memory form that ``titan.compiler.verilog.VerilogAssember`` consumes directly,
+            no text is created or parsed. Constants that nothing refers to are left out.
 
             Returns:
-                String containing all of the generated SPIR-V assembly code.
+                List of ``titan.common.instruction.SPIRVInstruction``.
         """
-        fake_file = ""
+        instructions = []
+
+        # key=section, value=list of instructions
+        for section_instructions in self.generated_spirv.values():
+            instructions.extend(section_instructions)
+
+        # constants are declared as soon as they're used, even if the operation using them is folded away afterwards
+        referenced = {arg for instruction in instructions for arg in instruction.opcode_args}
+        return [instruction for instruction in instructions if instruction.opcode != "Constant" or instruction.id in referenced]
 
-        # key=section, value=list of lines
-        for lines in self.generated_spirv.values():
-            for line in lines:
-                fake_file += f"{line}\n"
+    def create_file_as_string(self) -> str:
+        """ Transforms the generated SPIR-V instructions into a very long string.
+
+            Only needed when the assembly is written out, the Verilog stage works on ``get_instructions()``.
 
-        return fake_file
+            Returns:
+                String containing all of the generated SPIR-V assembly code.
+        """
+        return "".join(f"{instruction}\n" for instruction in self.get_instructions())
     
-    def output_to_file(self, filename:str):
+    def output_to_file(self, filename:str, output_dir: str = "output"):
         """ Write generated SPIR-V assembly into a real file.
 
             Args:
                 filename: Name of the file to write to. ``.spvasm`` will be automatically appended.
+                output_dir: Folder to write the file into.
+        """
+        with open(f"{output_dir}/{filename}.spvasm", "w") as f:
+            f.write(self.create_file_as_string())
+
+        self.written_files.append(f"{output_dir}/{filename}.spvasm")
+
+    def write_lagging_info(self):
+        """ Write the lagging information JSON files produced by any ``lag`` decorators.
+
+            The files are written into the current working directory.
         """
-        ff = self.create_file_as_string()
+        for filename, content in self.lagging_info_files.items():
+            logging.info(f"Generating JSON (contains lagging information)...")
+            with open(filename, "w+") as f:
+                f.write(content)
 
-        with open(f"output/{filename}.spvasm", "w") as f:
-            for line in ff:
-                f.write(line)
+            self.written_files.append(filename)
 
     # dont look at this
     def _get_python_type_from_string(self, type: str):
@@ -811,8 +963,9 @@ class SPIRVAssembler(ast.NodeVisitor):
         """ Function called when visiting a module.
 
             Method first sets the entry point to the name of the function inside the module. If there are multiple,
-            the name can either be specified via a command line option, or if present, a function named "step" will
-            be the entry point. If there is only one function, then it will be used instead, regardless of the name.
+            the name can either be specified via the ``top`` option, or if present, a function named "step" will
+            be the entry point. If there is only one function that isn't called by another, then it will be used instead,
+            regardless of the name. Functions called by other functions are inlined, see ``_inline_calls``.
 
             Some initial boilerplate SPIR-V code is added at this stage.
 
@@ -830,42 +983,48 @@ class SPIRVAssembler(ast.NodeVisitor):
 
         logging.debug(f"found {len(node.body)} functions")
 
-        for i in range(len(node.body)):
-            # skip over imports in module definition
-            if node is ast.Import or ast.ImportFrom:
-                continue
+        function_defs = {operation.name: operation for operation in node.body if type(operation) is ast.FunctionDef}
+        assert len(function_defs) != 0, "no function defintions found"
 
-            if node.body[i].name == "step":
-                _module_contains_step_function = True
-                self.entry_point = "step"
+        # functions called by other functions are inlined into their callers, rather than becoming modules of their own
+        called_functions = {
+            child.func.id for function_def in function_defs.values() for child in ast.walk(function_def)
+            if isinstance(child, ast.Call) and isinstance(child.func, ast.Name) and child.func.id in function_defs
+        }
+        self._functions = {name: function_defs[name] for name in called_functions}
 
-        if not _module_contains_step_function:
-            total_func_defs = 0
-            func_def_pos = 0
+        if self._top is not None:
+            function_names = list(function_defs.keys())
+            assert self._top in function_names, f"top function '{self._top}' not found, expected one of {function_names}"
 
-            for i in range(len(node.body)):
-                operation = node.body[i]
+            # treat the requested top the same way as a step function
+            _module_contains_step_function = True
+            self.entry_point = self._top
+            logging.debug(f"setting entry point as '{self.entry_point}' (specified top)")
 
-                if type(operation) is ast.FunctionDef:
-                    total_func_defs += 1
-                    func_def_pos = i
-            
+        elif "step" in function_defs:
+            _module_contains_step_function = True
+            self.entry_point = "step"
+
+        if not _module_contains_step_function:
+            # only functions that aren't called by another function can be the entry point
+            top_level_functions = [name for name in function_defs if name not in self._functions]
 
-            assert total_func_defs != 0, "no function defintions found"
-            assert not total_func_defs > 1, "multiple function defintions found, please specify top"
+            assert len(top_level_functions) != 0, "every function is called by another function, please specify top"
+            assert not len(top_level_functions) > 1, "multiple function defintions found, please specify top"
             
-            self.entry_point = node.body[func_def_pos].name
+            self.entry_point = top_level_functions[0]
             logging.debug(f"setting entry point as '{self.entry_point}'")
 
         # spirv boilerplate
         self.add_line(
             self.Sections.CAPABILITY_AND_EXTENSION,
-            f"OpCapability Shader"
+            "OpCapability", "Shader"
         )
 
         self.add_line(
             self.Sections.CAPABILITY_AND_EXTENSION,
-            f"OpMemoryModel Logical GLSL450"
+            "OpMemoryModel", "Logical", "GLSL450"
         )
 
         # this makes the assumption that the module body only contains FunctionDef nodes
@@ -886,6 +1045,10 @@ class SPIRVAssembler(ast.NodeVisitor):
                 logging.debug(f"not processing {type(fn)}")
                 continue
 
+            elif fn.name in self._functions and fn.name != self.entry_point:
+                logging.debug(f"not processing {fn.name}, inlined into the functions calling it")
+                continue
+
             # evaluate function signature
             self.visit_FunctionDef(fn)
 
@@ -894,20 +1057,20 @@ class SPIRVAssembler(ast.NodeVisitor):
             #       since the lists/dicts will contain previous function entries, messing with the names
             if fn.name == self.entry_point:
                 # take contents of input/output ports and convert them into ids
-                ports_str = ""
+                port_ids = []
 
                 for symbol, symbol_ctx in self.symbol_info.items():
                     if (symbol_ctx.location is StorageType.IN) or (symbol_ctx.location is StorageType.OUT):
-                        ports_str += f"%{symbol} "
+                        port_ids.append(f"%{symbol}")
 
                 self.add_line(
                     self.Sections.ENTRY_AND_EXEC_MODES,
-                    f"OpEntryPoint Fragment %{fn.name} \"{fn.name}\" {ports_str}"
+                    "OpEntryPoint", "Fragment", f"%{fn.name}", f"\"{fn.name}\"", *port_ids
                 )
 
             self.add_line(
                 self.Sections.ENTRY_AND_EXEC_MODES,
-                f"OpExecutionMode %{fn.name} OriginUpperLeft"
+                "OpExecutionMode", f"%{fn.name}", "OriginUpperLeft"
             )
 
             logging.debug(f"exit function {fn.name}")
@@ -954,8 +1117,11 @@ class SPIRVAssembler(ast.NodeVisitor):
 
         logging.debug(f"function {node.name} {_debug_returns}")
         self._latest_function_name = node.name
+        self._known_constants = {}
+        self._value_numbers = {}
+        self._depths = {}
 
-        self.add_line(self.Sections.DEBUG_STATEMENTS, f"OpName %{node.name} \"{node.name}\"")
+        self.add_line(self.Sections.DEBUG_STATEMENTS, "OpName", f"%{node.name}", f"\"{node.name}\"")
 
         void_ctx = self.TypeContext(DataType.VOID, StorageType.NONE)
         t_void_id = self.add_type_if_nonexistant(void_ctx, f"%type_void")
@@ -965,8 +1131,8 @@ class SPIRVAssembler(ast.NodeVisitor):
         t_fn_void_id = self.add_type_if_nonexistant(fn_ctx, f"%type_function_{(DataType.VOID.name).lower()}")
 
         # mark start of function
-        self.add_line(self.Sections.FUNCTIONS, f"%{node.name} = OpFunction {t_void_id} None {t_fn_void_id}")
-        self.add_line(self.Sections.FUNCTIONS, f"%label_{node.name} = OpLabel")
+        self.add_line(self.Sections.FUNCTIONS, "OpFunction", t_void_id, "None", t_fn_void_id, result_id=f"%{node.name}")
+        self.add_line(self.Sections.FUNCTIONS, "OpLabel", result_id=f"%label_{node.name}")
 
         # process decorators - this should handle array defs etc
         # TODO: can this be replaced with a specialised function, as to free up the visit_Call function?
@@ -1022,6 +1188,9 @@ class SPIRVAssembler(ast.NodeVisitor):
 
             
     
+        # calls to other functions are replaced by the body of the function being called
+        node.body = self._inline_calls(node.body)
+
         logging.debug(f"body start {node.name}")
         super().generic_visit(node)
         logging.debug(f"body end {node.name}")
@@ -1029,12 +1198,12 @@ class SPIRVAssembler(ast.NodeVisitor):
         # spirv boilerplate for end of function
         self.add_line(
             self.Sections.FUNCTIONS,
-            f"OpReturn"
+            "OpReturn"
         )
 
         self.add_line(
             self.Sections.FUNCTIONS,
-            f"OpFunctionEnd"
+            "OpFunctionEnd"
         )
 
     def visit_Call(self, node):
@@ -1081,9 +1250,8 @@ class SPIRVAssembler(ast.NodeVisitor):
                     self._decorator_dict[self._latest_function_name] = temp_dict
                     logging.debug(f"lagging decorator produced: {self._decorator_dict}")
 
-                    logging.info(f"Generating JSON (contains lagging information)...")
-                    with open(f"{self._latest_function_name}_lagging_info.json", "w+") as f:
-                        f.write(json.dumps(self._decorator_dict, indent=4))
+                    # only written out when asked for, see write_lagging_info
+                    self.lagging_info_files[f"{self._latest_function_name}_lagging_info.json"] = json.dumps(self._decorator_dict, indent=4)
 
 
                 case "recursive":
@@ -1168,8 +1336,9 @@ class SPIRVAssembler(ast.NodeVisitor):
 
         # special case: array initialisation
         # will deal within _eval_line() instead
-        if isinstance(node.value, ast.Call):
+        if isinstance(node.value, ast.Call) and not self._is_reduction_call(node.value):
             eval_id, eval_ctx = self._eval_line_wrap(node)
+            self._update_symbol_values(node.targets[0], None)
             return
         
         # special case: array indexing, if the target is array then we are doing "x[1] = b"
@@ -1180,7 +1349,7 @@ class SPIRVAssembler(ast.NodeVisitor):
 
             self.add_line(
                 self.Sections.FUNCTIONS,
-                f"OpStore %{access_id.strip('%')} %{value_temp_load_id.strip('%')}"
+                "OpStore", f"%{access_id.strip('%')}", f"%{value_temp_load_id.strip('%')}"
             )
             return        
 
@@ -1192,6 +1361,7 @@ class SPIRVAssembler(ast.NodeVisitor):
 
             # make symbol if non-existant
             self.add_symbol_if_nonexistant(node.targets[0].id, access_ctx.primative_type.value, StorageType.FUNCTION_VAR)
+            self._update_symbol_values(node.targets[0], None)
 
             # add opload for array
             temp_load_id = self.add_temp_load_op_if_needed(access_id, self.get_primative_type_id(self.get_type_of_intermediate_id(access_id)))
@@ -1199,7 +1369,7 @@ class SPIRVAssembler(ast.NodeVisitor):
             # store
             self.add_line(
                 self.Sections.FUNCTIONS,
-                f"OpStore %{node.targets[0].id} %{temp_load_id}"
+                "OpStore", f"%{node.targets[0].id}", f"%{temp_load_id}"
             )
 
             return
@@ -1223,10 +1393,11 @@ class SPIRVAssembler(ast.NodeVisitor):
             )
 
             self.add_symbol_if_nonexistant(node.targets[0].id, type_class, StorageType.FUNCTION_VAR)
+            self._update_symbol_values(node.targets[0], eval_ctx, eval_id)
 
             self.add_line(
                 self.Sections.FUNCTIONS,
-                f"OpStore %{node.targets[0].id} %{eval_id.strip('%')}"
+                "OpStore", f"%{node.targets[0].id}", f"%{eval_id.strip('%')}"
             )
 
     def visit_AnnAssign(self, node):
@@ -1247,16 +1418,242 @@ class SPIRVAssembler(ast.NodeVisitor):
 
         eval_type = self._extract_type(eval_ctx)
 
-        if eval_type != type_class:
+        if eval_type is not DataType(type_class):
             logging.exception(f"mismatched types: eval_type {eval_type} - type_class {type_class}", exc_info=False)
             raise Exception(f"mismatched types: eval_type {eval_type} - type_class {type_class}")
 
         self.add_symbol_if_nonexistant(node.target.id, type_class, StorageType.FUNCTION_VAR)
+        self._update_symbol_values(node.target, eval_ctx, eval_id)
 
         self.add_line(
             self.Sections.FUNCTIONS,
-            f"OpStore %{node.target.id} {eval_id}"
-        )  
+            "OpStore", f"%{node.target.id}", f"%{eval_id.strip('%')}"
+        )
+
+    def visit_AugAssign(self, node):
+        """ Function called when performing an augmented assignment, i.e. ``a += b``.
+
+            Handled as the equivalent assignment, ``a = a + b``.
+
+            Args:
+                node: The current node.
+        """
+        target_load = copy.deepcopy(node.target)
+        target_load.ctx = ast.Load()
+
+        value = ast.copy_location(ast.BinOp(target_load, node.op, node.value), node)
+        self.visit_Assign(ast.copy_location(ast.Assign([node.target], value), node))
+
+    def visit_For(self, node):
+        """ Function called when visiting a for loop.
+
+            The generated hardware has no control flow, so loops are fully unrolled: the body is visited once per iteration,
+            with the loop variable replaced by its value, i.e. ``x[i]`` becomes ``x[0]``, ``x[1]``, and so on. Only loops over
+            a ``range`` with bounds known at compile time are supported.
+
+            If optimising, and the body only accumulates into variables it doesn't otherwise read (i.e. ``acc += x[i] * w[i]``),
+            each accumulation is done as one chain over every iteration, so it can be rebalanced (see ``_eval_chain``).
+
+            Args:
+                node: The current node.
+        """
+        assert not node.orelse, "for loops with an else block are not supported"
+        assert isinstance(node.target, ast.Name), f"expected a single loop variable, got {type(node.target)} instead"
+
+        variable = node.target.id
+        assert not self.symbol_exists(variable), f"loop variable '{variable}' is already used as a variable"
+
+        values = self._get_range_values(node.iter)
+        logging.debug(f"unrolling loop over '{variable}' with {len(values)} iterations")
+
+        iterations = [
+            [self.LoopVariableSubstitution(variable, value).visit(copy.deepcopy(statement)) for statement in node.body]
+            for value in values
+        ]
+
+        if self._optimise and values and self._is_loop_reduction(node.body):
+            for index, statement in enumerate(node.body):
+                chain = copy.deepcopy(statement.target)
+                chain.ctx = ast.Load()
+
+                for body in iterations:
+                    chain = ast.BinOp(chain, statement.op, body[index].value)
+
+                self.visit_Assign(ast.copy_location(ast.Assign([statement.target], chain), statement))
+
+            return
+
+        for body in iterations:
+            for statement in body:
+                self.visit(statement)
+
+    def _inline_calls(self, statements: list, call_stack: tuple = ()) -> list:
+        """ Inline the calls to other functions of the module made by a list of statements.
+
+            Each call is replaced by the value the function returns, and the statements of the function are placed before
+            the statement the call was in. Calls inside loops are inlined in the body of the loop.
+
+            Args:
+                statements: Statements to inline calls in.
+                call_stack: Names of the functions currently being inlined, used to detect recursion.
+
+            Returns:
+                Statements with every call inlined.
+        """
+        inlined = []
+
+        for statement in statements:
+            if isinstance(statement, ast.For):
+                statement.body = self._inline_calls(statement.body, call_stack)
+                inlined.append(statement)
+                continue
+
+            function_statements = []
+            statement = self.CallInliner(self, function_statements, call_stack).visit(statement)
+
+            inlined.extend(function_statements)
+            inlined.append(statement)
+
+        return inlined
+
+    def _inline_function(self, call, call_stack: tuple):
+        """ Inline a single call to a function of the module.
+
+            The local symbols of the function are renamed so each call has its own, i.e. ``d`` in the first call to ``mac``
+            becomes ``mac_0_d``. Parameters given a symbol or a constant are replaced by it, other arguments are assigned
+            to the renamed parameter first, so they're only evaluated once. A local assigned by the statement before the
+            return is forwarded, i.e. ``acc = acc + p * q; return acc`` returns ``mac_0_acc + p * q`` rather than a copy.
+
+            Args:
+                call: Call node.
+                call_stack: Names of the functions currently being inlined, used to detect recursion.
+
+            Returns:
+                Statements of the function, ready to be visited
+                Expression of the returned value
+        """
+        name = call.func.id
+        function_def = self._functions[name]
+        parameters = [arg.arg for arg in function_def.args.args]
+
+        assert name not in call_stack, f"recursive call to '{name}' cannot be inlined"
+        assert not call.keywords, f"keyword arguments are not supported when calling '{name}'"
+        assert len(call.args) == len(parameters), f"'{name}' expects {len(parameters)} argument(s), got {len(call.args)}"
+
+        returns = [child for child in ast.walk(function_def) if isinstance(child, ast.Return)]
+        assert isinstance(function_def.body[-1], ast.Return) and len(returns) == 1, f"'{name}' must end with its only return"
+        assert function_def.body[-1].value is not None, f"'{name}' must return a value to be called"
+
+        assigned = {
+            child.id for statement in function_def.body for child in ast.walk(statement)
+            if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store)
+        }
+
+        prefix = f"{name}_{self._inline_counter}_"
+        self._inline_counter += 1
+
+        renames = {symbol: f"{prefix}{symbol}" for symbol in assigned | set(parameters)}
+        substitutions = {}
+        statements = []
+
+        for parameter, arg in zip(parameters, call.args):
+            is_simple = isinstance(arg, (ast.Name, ast.Constant)) or (
+                isinstance(arg, ast.UnaryOp) and isinstance(arg.op, ast.USub) and isinstance(arg.operand, ast.Constant)
+            )
+
+            if is_simple and parameter not in assigned:
+                substitutions[parameter] = arg
+            else:
+                target = ast.Name(renames[parameter], ast.Store())
+                statements.append(ast.copy_location(ast.Assign([target], arg), call))
+
+        logging.debug(f"inlining call to '{name}' as '{prefix}'")
+
+        renamer = self.SymbolRenamer(renames, substitutions)
+        body = [renamer.visit(copy.deepcopy(statement)) for statement in function_def.body]
+        body = self._inline_calls(body, call_stack + (name,))
+
+        *body, returned = body
+        return_value = returned.value
+
+        # a local assigned just before being returned is forwarded, instead of being copied into the call site
+        if isinstance(return_value, ast.Name) and return_value.id in renames.values() and body:
+            last = body[-1]
+            is_forwardable = lambda value: not isinstance(value, ast.Call) or self._is_reduction_call(value)
+
+            if isinstance(last, ast.Assign) and len(last.targets) == 1 and isinstance(last.targets[0], ast.Name) \
+                    and last.targets[0].id == return_value.id and is_forwardable(last.value):
+                return_value = body.pop().value
+            elif isinstance(last, ast.AnnAssign) and isinstance(last.target, ast.Name) and last.target.id == return_value.id \
+                    and last.value is not None and is_forwardable(last.value):
+                return_value = body.pop().value
+            elif isinstance(last, ast.AugAssign) and isinstance(last.target, ast.Name) and last.target.id == return_value.id:
+                body.pop()
+                return_value = ast.copy_location(ast.BinOp(ast.Name(return_value.id, ast.Load()), last.op, last.value), last)
+
+        statements.extend(body)
+        return statements, return_value
+
+    def _get_range_values(self, node) -> range:
+        """ Get the values of the loop variable of a ``for`` loop.
+
+            Args:
+                node: Iterable of the loop, must be a call to ``range`` with bounds known at compile time.
+
+            Returns:
+                Values of the loop variable, in order.
+        """
+        is_range = isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "range"
+
+        if not is_range or node.keywords or not 1 <= len(node.args) <= 3:
+            logging.exception(f"only loops over range() can be unrolled, got {ast.dump(node)}", exc_info=False)
+            raise Exception(f"only loops over range() can be unrolled, got {ast.dump(node)}")
+
+        bounds = []
+        for arg in node.args:
+            const = self._fold_constant(arg)
+
+            if const is None or self._extract_type(const) is not DataType.INTEGER:
+                logging.exception(f"loop bounds must be integers known at compile time, got {ast.dump(arg)}", exc_info=False)
+                raise Exception(f"loop bounds must be integers known at compile time, got {ast.dump(arg)}")
+
+            bounds.append(const.value)
+
+        assert len(bounds) < 3 or bounds[2] != 0, "range() step cannot be zero"
+
+        values = range(*bounds)
+        assert len(values) <= MAX_UNROLL_ITERATIONS, f"loop has {len(values)} iterations, cannot unroll more than {MAX_UNROLL_ITERATIONS}"
+
+        return values
+
+    def _is_loop_reduction(self, body: list) -> bool:
+        """ Check if the body of a loop only accumulates into variables, using associative operations.
+
+            Each variable must only be accumulated into once, and not be read anywhere else in the body,
+            so the accumulations can be done in any order.
+
+            Args:
+                body: Statements of the loop body.
+
+            Returns:
+                ``True`` if every iteration's accumulations can be combined into one chain per variable.
+        """
+        targets = []
+
+        for statement in body:
+            if not isinstance(statement, ast.AugAssign) or not isinstance(statement.target, ast.Name):
+                return False
+
+            if not isinstance(statement.op, ASSOCIATIVE_OPERATORS):
+                return False
+
+            targets.append(statement.target.id)
+
+        if len(set(targets)) != len(targets):
+            return False
+
+        read = {child.id for statement in body for child in ast.walk(statement.value) if isinstance(child, ast.Name)}
+        return read.isdisjoint(targets)
 
     def visit_Return(self, node):
         """ Handle return nodes. """
@@ -1300,16 +1697,16 @@ class SPIRVAssembler(ast.NodeVisitor):
 
                     self.add_line(
                         self.Sections.VAR_CONST_DECLARATIONS,
-                        f"%{id} = OpVariable {ptr_t_out_id} Output"
+                        "OpVariable", ptr_t_out_id, "Output", result_id=f"%{id}"
                     )
 
-                    str_to_match = f"%{id} = OpVariable {ptr_t_id} Function"
+                    instruction_to_match = SPIRVInstruction("Variable", f"%{id}", (ptr_t_id, "Function"))
                     
                     # TODO: implement better method
                     # bruteforce remove reference of symbol declaration in FUNCTIONS section
                     i = 0
                     for line in self.generated_spirv[self.Sections.FUNCTIONS.name]:
-                        if line == str_to_match:
+                        if line == instruction_to_match:
                             self.generated_spirv[self.Sections.FUNCTIONS.name].pop(i)
                             break
                         i += 1
@@ -1341,7 +1738,7 @@ class SPIRVAssembler(ast.NodeVisitor):
             # store titan_id_x into the newly created return variable
             self.add_line(
                 self.Sections.FUNCTIONS,
-                f"OpStore %{out_str_id} %{self._latest_ifexp_selector_id}"
+                "OpStore", f"%{out_str_id}", f"%{self._latest_ifexp_selector_id}"
             )
 
             ptr_t_out_ctx = self.TypeContext(
@@ -1353,7 +1750,7 @@ class SPIRVAssembler(ast.NodeVisitor):
 
             self.add_line(
                 self.Sections.VAR_CONST_DECLARATIONS,
-                f"%{out_str_id} = OpVariable %{ptr_t_out_id.strip('%')} Output"
+                "OpVariable", f"%{ptr_t_out_id.strip('%')}", "Output", result_id=f"%{out_str_id}"
             )
             
 
@@ -1388,15 +1785,9 @@ class SPIRVAssembler(ast.NodeVisitor):
                 raise Exception(f"symbol referenced but does not exist: {node.id}")
         elif isinstance(node, ast.Constant):
 
+            # TODO: does not account for negative numbers, probably need an UnaryOp section 
             c_ctx = self.ConstContext(DataType(type(node.value)), node.value)
-            if self.const_exists(c_ctx):
-                return self.get_const_id_with_ctx(c_ctx)
-            else:
-                # TODO: does not account for negative numbers, probably need an UnaryOp section 
-                c_id = self.add_const_if_nonexistant(
-                    c_ctx, False
-                )
-                return c_id
+            return self.add_const_if_nonexistant(c_ctx, False)
             # return self.spirv_helper.get_const_id(node.value, titan_type.DataType(type(node.value)))
         else:
             logging.exception(f"unhandled node {node}", exc_info=False)
@@ -1421,7 +1812,7 @@ class SPIRVAssembler(ast.NodeVisitor):
         self.add_line(
             self.Sections.FUNCTIONS,
             #TODO:                                                              vvv should this just be always -1 of the current id?
-            f"%{intermediate_id} = OpSelect {t_id} {self._latest_compare_id} %{body_id} %{orelse_id}"
+            "OpSelect", t_id, self._latest_compare_id, f"%{body_id}", f"%{orelse_id}", result_id=f"%{intermediate_id}"
         )
 
         # add id and set it as latest
@@ -1474,7 +1865,7 @@ class SPIRVAssembler(ast.NodeVisitor):
             load_str = f"temp_{node.left.id}"
             self.add_line(
                 self.Sections.FUNCTIONS,
-                f"%{load_str} = OpLoad {target_type_id} %{node.left.id}"
+                "OpLoad", target_type_id, f"%{node.left.id}", result_id=f"%{load_str}"
             )
             eval_left_id = load_str # use updated id
 
@@ -1493,7 +1884,7 @@ class SPIRVAssembler(ast.NodeVisitor):
             load_str = f"temp_{node.comparators[0].id}"
             self.add_line(
                 self.Sections.FUNCTIONS,
-                f"%{load_str} = OpLoad {target_type_id} %{node.comparators[0].id}"
+                "OpLoad", target_type_id, f"%{node.comparators[0].id}", result_id=f"%{load_str}"
             )
             eval_right_id = load_str
 
@@ -1504,7 +1895,7 @@ class SPIRVAssembler(ast.NodeVisitor):
         self.add_intermediate_id(f"{intermediate_id}", target_type)
         self.add_line(
             self.Sections.FUNCTIONS,
-            f"%{intermediate_id} = {opcode} {t_id} %{eval_left_id.strip('%')} %{eval_right_id.strip('%')}"
+            opcode, t_id, f"%{eval_left_id.strip('%')}", f"%{eval_right_id.strip('%')}", result_id=f"%{intermediate_id}"
         )
 
         self._latest_compare_id = f"%{intermediate_id}"
@@ -1539,15 +1930,18 @@ class SPIRVAssembler(ast.NodeVisitor):
         """
         attempts to extract the primative type from a given context
 
-        - handles TypeContext, ConstContext, DataType, bool and int
+        - handles TypeContext, ConstContext, DataType, int, float and bool
+        - python types are converted to DataType, so types can be compared regardless of how they were declared
         """
         if isinstance(context, self.TypeContext):
-            return context.primative_type
+            return DataType(context.primative_type)
         elif isinstance(context, self.ConstContext):
-            return context.primative_type
+            return DataType(context.primative_type)
         elif isinstance(context, DataType):
             return DataType(context.value)
-        elif context is bool or int:
+        elif context in [int, float, bool]:
+            return DataType(context)
+        elif context is None:
             return context
         else:
             logging.exception(f"unable to extract type from context - {context} {type(context)}", exc_info=False)
@@ -1566,6 +1960,9 @@ class SPIRVAssembler(ast.NodeVisitor):
             (ast.Div, int) : "OpSDiv",
             (ast.LShift, int) : "OpShiftLeftLogical",
             (ast.RShift, int) : "OpShiftRightLogical",
+            (ast.BitAnd, int) : "OpBitwiseAnd",
+            (ast.BitOr, int) : "OpBitwiseOr",
+            (ast.BitXor, int) : "OpBitwiseXor",
             (ast.Eq, int) : "OpIEqual",
             (ast.NotEq, int) : "OpINotEqual",
             (ast.Lt, int) : "OpSLessThan",
@@ -1595,75 +1992,477 @@ class SPIRVAssembler(ast.NodeVisitor):
             logging.exception(f"{e}")
             raise
 
-    def _eval_line(self, node):
-        """ Recursively evaluates a line
+    def _update_symbol_values(self, target, eval_ctx, eval_id: str = None):
+        """ Keep track of what is known about a symbol after being assigned to.
+
+            Records whether the symbol holds a known constant and how deep in the pipeline its value is,
+            and forgets the operations that read the symbol's previous value so they aren't reused.
+
+            Args:
+                target: Target node of the assignment.
+                eval_ctx: Context of the assigned value, as returned by ``_eval_line``.
+                eval_id: ID of the assigned value, ``None`` if unknown.
+        """
+        if not isinstance(target, ast.Name):
+            return
+
+        self._depths[target.id] = 0 if eval_id is None else self._get_depth(eval_id)
+
+        self._value_numbers = {
+            key: value_id for key, value_id in self._value_numbers.items() if target.id not in key.operands
+        }
+
+        if isinstance(eval_ctx, self.ConstContext):
+            self._known_constants[target.id] = self._get_const_key(eval_ctx)
+        else:
+            self._known_constants.pop(target.id, None)
+
+    def _fold_constant(self, node) -> ConstContext | None:
+        """ Attempt to evaluate an expression at compile time.
+
+            Handles literals, negated literals, symbols holding a known constant and integer
+            operations on any of those. Integer results wrap around the same way as 32-bit SPIR-V integers.
+
+            Args:
+                node: Expression to evaluate.
+
+            Returns:
+                Context of the resulting constant, or ``None`` if the value isn't known at compile time.
+        """
+        if isinstance(node, ast.Constant) and type(node.value) in [int, float, bool]:
+            return self.ConstContext(DataType(type(node.value)), node.value)
+
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant):
+            if type(node.operand.value) in [int, float]:
+                return self.ConstContext(DataType(type(node.operand.value)), node.operand.value * -1)
+
+        elif isinstance(node, ast.Name):
+            return self._known_constants.get(node.id)
+
+        elif isinstance(node, ast.BinOp):
+            left_ctx = self._fold_constant(node.left)
+            right_ctx = self._fold_constant(node.right)
+
+            if left_ctx is None or right_ctx is None:
+                return None
+
+            # floats would need to be rounded to 32 bits to match the hardware, so only integers are folded
+            if left_ctx.primative_type is not DataType.INTEGER or right_ctx.primative_type is not DataType.INTEGER:
+                return None
+
+            value = fold_integer_binop(node.op, left_ctx.value, right_ctx.value)
+            if value is not None:
+                return self.ConstContext(DataType.INTEGER, value)
+
+        return None
+
+    def _get_const_operand(self, const: ConstContext) -> str:
+        """ Get the ID of a constant to use as an operand, declaring it if needed.
+
+            Args:
+                const: Constant to use.
+
+            Returns:
+                ID of the constant, with '%'.
+        """
+        return f"%{self.add_const_if_nonexistant(const, const.value < 0)}"
+
+    def _get_value_key(self, opcode: str, type_id: str, left_id: str, right_id: str) -> ValueKey | None:
+        """ Get the key used to find an identical operation that has already been generated.
+
+            Operands of commutative operations are sorted, so ``a * b`` and ``b * a`` share a key.
+            Array elements can be written through other IDs, so operations reading them are never reused.
+
+            Args:
+                opcode: Opcode of the operation.
+                type_id: ID of the result type.
+                left_id: ID of the left operand, before any temporary load.
+                right_id: ID of the right operand, before any temporary load.
+
+            Returns:
+                Key of the operation, or ``None`` if it shouldn't be reused.
+        """
+        if not self._optimise:
+            return None
+
+        operands = (left_id.strip("%"), right_id.strip("%"))
+
+        for operand in operands:
+            if self.intermediate_id_exists(operand) and self.get_is_intermediate_id_accessing_array(operand):
+                return None
+
+        if opcode in COMMUTATIVE_OPCODES:
+            operands = tuple(sorted(operands))
+
+        return self.ValueKey(opcode, type_id, operands)
+
+    def _eval_operand(self, node):
+        """ Evaluate an operand of an operation, using ``_eval_line``.
+
+            If optimising and the operand is a symbol holding a known constant, the constant is used
+            directly instead of loading the symbol.
+
+            Returns:
+                Operand id
+                Operand context
+        """
+        if self._optimise and isinstance(node, ast.Name) and node.id in self._known_constants:
+            const = self._known_constants[node.id]
+            return self._get_const_operand(const), const
+
+        return self._eval_line(node)
+
+    def _add_operation(self, opcode: str, chosen_type: DataType, left_id: str, left_type_id: str, right_id: str, right_type_id: str) -> str:
+        """ Add a binary operation, loading the operands if needed.
+
+            If the same operation has already been done on the same values, its result is reused instead.
+
+            Args:
+                opcode: Opcode of the operation.
+                chosen_type: Type of the result.
+                left_id: ID of the left operand.
+                left_type_id: ID of the type of the left operand.
+                right_id: ID of the right operand.
+                right_type_id: ID of the type of the right operand.
+
+            Returns:
+                Intermediate ID holding the result (without '%').
+        """
+        chosen_type_id = self.get_primative_type_id(DataType(chosen_type))
+
+        # reuse the result if the same operation has already been done on the same values
+        value_key = self._get_value_key(opcode, chosen_type_id, left_id, right_id)
+        if value_key in self._value_numbers:
+            return self._value_numbers[value_key]
+
+        depth = max(self._get_depth(left_id), self._get_depth(right_id)) + 1
+
+        left_id = self.add_temp_load_op_if_needed(left_id, left_type_id)
+        right_id = self.add_temp_load_op_if_needed(right_id, right_type_id)
+
+        spirv_line_str = self.get_new_intermediate_id()
+        self.add_line(
+            self.Sections.FUNCTIONS,
+            opcode, chosen_type_id, f"%{left_id.strip('%')}", f"%{right_id.strip('%')}", result_id=f"%{spirv_line_str}"
+        )
+        self.add_intermediate_id(f"{spirv_line_str}", chosen_type)
+        self._depths[spirv_line_str] = depth
+
+        if value_key is not None:
+            self._value_numbers[value_key] = spirv_line_str
+
+        return spirv_line_str
+
+    def _get_depth(self, id: str) -> int:
+        """ Get the number of operations between the inputs and an ID, i.e. the tick it will be ready at.
+
+            Args:
+                id: Intermediate ID, symbol or constant.
+
+            Returns:
+                Depth of the ID, zero for inputs, constants and anything else that isn't known.
+        """
+        return self._depths.get(id.strip("%"), 0)
+
+    def _reduce_strength(self, operation: ast.operator, left_id: str, left_ctx, right_id: str, right_ctx) -> Tuple[str, ConstContext | None] | None:
+        """ Replace an integer multiplication or division by a constant with shifts, additions and subtractions.
+
+            Adding or subtracting zero is removed altogether.
+            Multiplying uses a shift for each non-zero digit of the constant, see ``titan.compiler.optimiser.get_shift_add_terms``.
+            Dividing is only replaced when the divisor is a power of two (or one), since any other divisor needs the upper half
+            of a 64-bit product. The dividend is biased by the divisor minus one when negative, so the result still rounds towards
+            zero like ``OpSDiv``.
+
+            Args:
+                operation: Operator of the ``ast.BinOp``.
+                left_id: ID of the left operand, as returned by ``_eval_operand``.
+                left_ctx: Context of the left operand.
+                right_id: ID of the right operand, as returned by ``_eval_operand``.
+                right_ctx: Context of the right operand.
+
+            Returns:
+                ID of the result and its context if the result is a constant, or ``None`` if the operation wasn't replaced.
+        """
+        left_const = self._get_integer_const(left_ctx)
+        right_const = self._get_integer_const(right_ctx)
+
+        # nothing to do without exactly one constant, folding handles operations on two constants
+        if (left_const is None) == (right_const is None):
+            return None
+
+        type_id = self.get_primative_type_id(DataType.INTEGER)
+
+        def _add(opcode: str, left: str, right: str) -> str:
+            return self._add_operation(opcode, DataType.INTEGER, left, type_id, right, type_id)
+
+        def _const(value: int) -> str:
+            return self._get_const_operand(self.ConstContext(DataType.INTEGER, value))
+
+        # an operand passed through unchanged is loaded, so it isn't stored as a reference to a symbol that may change later
+        def _value(id: str) -> str:
+            return self.add_temp_load_op_if_needed(id, type_id)
+
+        # adding or subtracting zero doesn't need an adder
+        if isinstance(operation, ast.Add) and 0 in [left_const, right_const]:
+            return (_value(right_id), None) if left_const == 0 else (_value(left_id), None)
+
+        if isinstance(operation, ast.Sub) and right_const == 0:
+            return _value(left_id), None
+
+        if isinstance(operation, ast.Mult):
+            value_id, constant = (right_id, left_const) if right_const is None else (left_id, right_const)
+
+            if constant == 0:
+                return _const(0), self.ConstContext(DataType.INTEGER, 0)
+
+            terms = get_shift_add_terms(constant)
+            if len(terms) > MAX_SHIFT_ADD_TERMS or any(shift >= INT32_BITS for shift, _ in terms):
+                return None
+
+            # start from a positive term if there is one, so no extra subtraction from zero is needed
+            terms.sort(key=lambda term: term[1] < 0)
+
+            result_id = None
+            for shift, sign in terms:
+                term_id = value_id if shift == 0 else _add("OpShiftLeftLogical", value_id, _const(shift))
+
+                if result_id is None:
+                    result_id = term_id if sign > 0 else _add("OpISub", _const(0), term_id)
+                else:
+                    result_id = _add("OpIAdd" if sign > 0 else "OpISub", result_id, term_id)
+
+            # multiplying by one
+            return (_value(value_id) if result_id == value_id else result_id), None
+
+        if isinstance(operation, ast.Div) and right_const is not None:
+            shift = get_power_of_two(abs(right_const))
+            if shift is None:
+                return None
+
+            result_id = left_id
+            if shift > 0:
+                # add divisor - 1 to negative dividends, taken from the sign bits
+                sign_id = _add("OpShiftRightArithmetic", left_id, _const(INT32_BITS - 1))
+                bias_id = _add("OpShiftRightLogical", sign_id, _const(INT32_BITS - shift))
+                biased_id = _add("OpIAdd", left_id, bias_id)
+                result_id = _add("OpShiftRightArithmetic", biased_id, _const(shift))
+
+            if right_const < 0:
+                result_id = _add("OpISub", _const(0), result_id)
+
+            # dividing by one
+            return (_value(left_id) if result_id == left_id else result_id), None
+
+        return None
+
+    def _get_integer_const(self, ctx) -> int | None:
+        """ Get the value of an operand if it's an integer constant.
+
+            Args:
+                ctx: Context of the operand.
+
+            Returns:
+                Value of the constant, or ``None`` if the operand isn't an integer constant.
+        """
+        if not isinstance(ctx, self.ConstContext):
+            return None
+
+        const = self._get_const_key(ctx)
+        return const.value if const.primative_type is DataType.INTEGER else None
+
+    def _get_chain_operands(self, node, operation: ast.operator = None) -> list:
+        """ Get the operands of a chain of the same operation, i.e. ``a``, ``b``, ``c`` and ``d`` for ``(a + b) + (c + d)``.
+
+            The terms of a reduction in a chain of additions are part of the chain, so ``np.dot(x, w) + b`` is balanced as a whole.
+
+            Args:
+                node: Node at the top of the chain.
+                operation: Operator of the chain, defaults to the operator of ``node``.
+
+            Returns:
+                Nodes of the operands, in the order they were written.
+        """
+        if operation is None:
+            operation = node.op
+
+        if isinstance(operation, ast.Add) and self._is_reduction_call(node):
+            return self._get_reduction_terms(node)
+
+        if not isinstance(node, ast.BinOp) or type(node.op) is not type(operation):
+            return [node]
+
+        return self._get_chain_operands(node.left, operation) + self._get_chain_operands(node.right, operation)
+
+    def _eval_chain(self, node, operands: list):
+        """ Evaluate a chain of the same associative operation as a balanced tree.
+
+            Integer constants in the chain are folded together first. The two operands that are ready the earliest
+            (see ``_get_depth``) are then combined repeatedly, so ``a + b + c + d`` takes two ticks rather than three,
+            and operands that are only ready later are added last. Floating point operations are rounded after
+            every step, so changing their order would change the result; they're evaluated as written instead.
+
+            Args:
+                node: Node at the top of the chain.
+                operands: Operands of the chain, as returned by ``_get_chain_operands``.
 
             Returns:
                 Final line id
                 Line context
         """
-        logging.debug(f"evaluating node: {node.__class__}, {node}")
+        evaluated = []
+        constants = []
 
-        if isinstance(node, ast.BinOp):
+        # integer constants are folded together rather than evaluated, so they aren't declared needlessly
+        for operand in operands:
+            const = self._fold_constant(operand)
 
-            left_id, left_ctx = self._eval_line(node.left)
-            right_id, right_ctx = self._eval_line(node.right)
+            if const is not None and DataType(const.primative_type) is DataType.INTEGER:
+                constants.append(const.value)
+            else:
+                evaluated.append(self._eval_operand(operand))
 
-            return_ctx = None
-            chosen_type = None
+        if any(self._extract_type(ctx) is not DataType.INTEGER for _, ctx in evaluated):
+            remaining = iter(evaluated)
 
-            left_type = self._extract_type(left_ctx)
-            left_type_id = self.get_primative_type_id(left_type)
+            def _eval_as_written(chain_node):
+                if isinstance(chain_node, ast.BinOp) and type(chain_node.op) is type(node.op):
+                    left_id, left_ctx = _eval_as_written(chain_node.left)
+                    right_id, right_ctx = _eval_as_written(chain_node.right)
+                    return self._eval_binop(node.op, left_id, left_ctx, right_id, right_ctx)
 
-            right_type = self._extract_type(right_ctx)
-            right_type_id = self.get_primative_type_id(right_type)
+                # the terms of a reduction are in the chain, see _get_chain_operands
+                if isinstance(node.op, ast.Add) and self._is_reduction_call(chain_node):
+                    return _eval_as_written(build_balanced_tree(ast.Add(), self._get_reduction_terms(chain_node)))
 
+                return next(remaining)
 
-            assert left_type is right_type, f"type mismatch, left is {left_type}, right is {right_type}"
+            return _eval_as_written(node)
 
-            # if left_type is not right_type:
-                # logging.exception(f"mismatched types l: {left_type} r: {right_type}", exc_info=False)
-                # raise Exception(f"mismatched types l: {left_type}  r: {right_type}")
+        if constants:
+            folded = constants[0]
+            for constant in constants[1:]:
+                folded = fold_integer_binop(node.op, folded, constant)
 
-            if left_type is None:
-                return_ctx = right_ctx
-                chosen_type = right_type
-            elif right_type is None:
-                return_ctx = left_ctx
-                chosen_type = left_type
-            elif left_type is right_type:
-                return_ctx = left_ctx
-                chosen_type = left_type
-            else:
-                logging.exception(f"unable to determine return type (L: {left_type} , R: {right_type})", exc_info=False)
-                raise Exception(f"unable to determine return type (L: {left_type} , R: {right_type})")
+            folded_ctx = self.ConstContext(DataType.INTEGER, folded)
+            evaluated.append((self._get_const_operand(folded_ctx), folded_ctx))
 
-            left_id = self.add_temp_load_op_if_needed(left_id, left_type_id)
-            right_id = self.add_temp_load_op_if_needed(right_id, right_type_id)
+        # the position breaks ties, keeping the order stable and avoiding comparing the contexts
+        ready = [(self._get_depth(id), position, id, ctx) for position, (id, ctx) in enumerate(evaluated)]
+        heapq.heapify(ready)
+        position = len(ready)
 
-            chosen_type_id = self.get_primative_type_id(DataType(chosen_type))
+        while len(ready) > 1:
+            _, _, left_id, left_ctx = heapq.heappop(ready)
+            _, _, right_id, right_ctx = heapq.heappop(ready)
 
-            # set the appropriate opcode
-            opcode = None
-            opcode = self.__return_correct_opcode(chosen_type, node.op)
-            
-            assert not opcode is None, f"opcode is still none after attempting to determine it, why?"
+            result_id, result_ctx = self._eval_binop(node.op, left_id, left_ctx, right_id, right_ctx)
+            heapq.heappush(ready, (self._get_depth(result_id), position, result_id, result_ctx))
+            position += 1
 
-            # if opcode is None:
-                # logging.exception(f"opcode was not updated, why? {node.op} {chosen_type} {left_id} {right_id} {left_type} {right_type}", exc_info=False)
-                # raise Exception(f"opcode was not updated, why? {node.op} {chosen_type} {left_id} {right_id} {left_type} {right_type}")
+        _, _, result_id, result_ctx = ready[0]
+        return result_id, result_ctx
 
-            # spirv_line_str = f"titan_id_{self.get_and_increment_intermediate_id()}"
-            spirv_line_str = self.get_new_intermediate_id()
-            self.add_line(
-                self.Sections.FUNCTIONS,
-                f"%{spirv_line_str} = {opcode} {chosen_type_id} %{left_id.strip('%')} %{right_id.strip('%')}"
-            )
-            self.add_intermediate_id(f"{spirv_line_str}", chosen_type)
+    def _eval_binop(self, operation: ast.operator, left_id: str, left_ctx, right_id: str, right_ctx):
+        """ Evaluate a binary operation on operands that have already been evaluated.
+
+            Args:
+                operation: Operator of the ``ast.BinOp``.
+                left_id: ID of the left operand, as returned by ``_eval_operand``.
+                left_ctx: Context of the left operand.
+                right_id: ID of the right operand, as returned by ``_eval_operand``.
+                right_ctx: Context of the right operand.
+
+            Returns:
+                Final line id
+                Line context
+        """
+        # operands can still become constants once reduced, i.e. the 0 * a in 1 + 0 * a
+        if self._optimise and isinstance(left_ctx, self.ConstContext) and isinstance(right_ctx, self.ConstContext):
+            folded_ctx = self._fold_constant(ast.BinOp(ast.Constant(left_ctx.value), operation, ast.Constant(right_ctx.value)))
+
+            if folded_ctx is not None:
+                return self._get_const_operand(folded_ctx), folded_ctx
+
+        return_ctx = None
+        chosen_type = None
+
+        left_type = self._extract_type(left_ctx)
+        left_type_id = self.get_primative_type_id(left_type)
+
+        right_type = self._extract_type(right_ctx)
+        right_type_id = self.get_primative_type_id(right_type)
+
+
+        assert left_type is right_type, f"type mismatch, left is {left_type}, right is {right_type}"
+
+        # if left_type is not right_type:
+            # logging.exception(f"mismatched types l: {left_type} r: {right_type}", exc_info=False)
+            # raise Exception(f"mismatched types l: {left_type}  r: {right_type}")
+
+        if left_type is None:
+            return_ctx = right_ctx
+            chosen_type = right_type
+        elif right_type is None:
+            return_ctx = left_ctx
+            chosen_type = left_type
+        elif left_type is right_type:
+            return_ctx = left_ctx
+            chosen_type = left_type
+        else:
+            logging.exception(f"unable to determine return type (L: {left_type} , R: {right_type})", exc_info=False)
+            raise Exception(f"unable to determine return type (L: {left_type} , R: {right_type})")
+
+        # the result isn't a constant just because one of the operands is
+        if isinstance(return_ctx, self.ConstContext):
+            return_ctx = self._extract_type(return_ctx)
+
+        # set the appropriate opcode
+        opcode = None
+        opcode = self.__return_correct_opcode(chosen_type, operation)
+        
+        assert not opcode is None, f"opcode is still none after attempting to determine it, why?"
+
+        # cheaper operations can be used when one of the operands is a constant
+        if self._optimise and DataType(chosen_type) is DataType.INTEGER:
+            reduced = self._reduce_strength(operation, left_id, left_ctx, right_id, right_ctx)
+
+            if reduced is not None:
+                reduced_id, reduced_ctx = reduced
+                return reduced_id, return_ctx if reduced_ctx is None else reduced_ctx
+
+        # TODO: check which type is not None, and propagate that back up
+        # TODO: should we change the type for a symbol?
+        return self._add_operation(opcode, chosen_type, left_id, left_type_id, right_id, right_type_id), return_ctx
+
+    def _eval_line(self, node):
+        """ Recursively evaluates a line
+
+            Returns:
+                Final line id
+                Line context
+        """
+        logging.debug(f"evaluating node: {node.__class__}, {node}")
+
+        if isinstance(node, ast.BinOp):
+
+            # no need to generate anything if the result is known already
+            if self._optimise:
+                folded_ctx = self._fold_constant(node)
+
+                if folded_ctx is not None:
+                    return self._get_const_operand(folded_ctx), folded_ctx
+
+            if self._optimise and isinstance(node.op, ASSOCIATIVE_OPERATORS):
+                operands = self._get_chain_operands(node)
 
-            # TODO: check which type is not None, and propagate that back up
-            # TODO: should we change the type for a symbol?
-            return spirv_line_str, return_ctx
+                # rebalance chains of the same operation, i.e. a + b + c + d, to shorten the pipeline
+                if len(operands) > 2:
+                    return self._eval_chain(node, operands)
+
+            left_id, left_ctx = self._eval_operand(node.left)
+            right_id, right_ctx = self._eval_operand(node.right)
+
+            return self._eval_binop(node.op, left_id, left_ctx, right_id, right_ctx)
         
         elif isinstance(node, ast.UnaryOp):
 
@@ -1677,14 +2476,7 @@ class SPIRVAssembler(ast.NodeVisitor):
                 assert type(value) in [int, float, bool], f"got unexpected constant value type: {type(value)}"
 
                 c_ctx = self.ConstContext(type(value), value * -1)
-
-                if not self.const_exists(c_ctx):
-                    # id = f"%const_{self._return_string_from_type(type(value))}_n{str(value).replace('.', '_')}"
-                    id = f"%const_{DataType(type(value)).name.lower()}_n{str(value).replace('.', '_')}"
-                    self.add_const_if_nonexistant(c_ctx, True)
-                    return id, c_ctx
-                else:
-                    return self.get_const_id(value*-1, type(value)), c_ctx
+                return f"%{self.add_const_if_nonexistant(c_ctx, True)}", c_ctx
                 
             else:
                 logging.exception(f"unhandled additional operator in unaryop class {node.op}", exc_info=False)
@@ -1702,23 +2494,10 @@ class SPIRVAssembler(ast.NodeVisitor):
 
         elif isinstance(node, ast.Constant):
 
-            # TODO: maybe use titan_types instead of python types?
-            # BUG: if using DataType, _eval_line will fail with type mismatch error
-            #      but if left alone, it sometimes creates duplicate constant lines?
-            #      reproduce with simple_neuron -> duplicate "%const_integer_0"
-            #      may be worth switching over to using bidicts?
+            # constants are interned using DataType, so they're only declared once regardless of
+            # whether they were created with a python type (i.e. UnaryOp) or a DataType
             c_ctx = self.ConstContext(DataType(type(node.value)), node.value)
-            # c_ctx = self.ConstContext(type(node.value), node.value)
-
-            if not self.const_exists(c_ctx):
-                # TODO: check if type also exists?
-                # id = f"%const_{self._return_string_from_type(type(node.value))}_{node.value}"
-                id = f"%const_{DataType(type(node.value)).name.lower()}_{str(node.value).replace('.', '_')}"
-                # self.spirv_helper.add_const(c_ctx, id)
-                self.add_const_if_nonexistant(c_ctx)
-                return id, c_ctx
-            else:
-                return self.get_const_id(node.value, DataType(type(node.value))), c_ctx
+            return f"%{self.add_const_if_nonexistant(c_ctx)}", c_ctx
         
         elif isinstance(node, ast.IfExp):
             self.visit_IfExp(node)
@@ -1736,19 +2515,15 @@ class SPIRVAssembler(ast.NodeVisitor):
         
         elif isinstance(node, ast.Call):
 
+            # sum(x), np.sum(x) and np.dot(x, y) are expanded into operations on each element
+            if self._is_reduction_call(node):
+                return self._eval_reduction(node)
+
             module_name = node.func.value.id
             function_name = node.func.attr
 
-            exists_in_normal_mapping = module_name in self._import_mapping
-            exists_in_inverse_mapping = module_name in self._import_mapping.inverse
-
             # check if explicitly using numpy for arrays etc
-            module_is_numpy = False
-            if exists_in_normal_mapping:
-                module_is_numpy = True if self._import_mapping[module_name] == "numpy" else False
-            elif exists_in_inverse_mapping:
-                module_is_numpy = True if self._import_mapping.inverse[module_name] == "numpy" else False
-
+            module_is_numpy = self._is_numpy_module(module_name)
 
             assert module_is_numpy, f"unhandled call object for {module_name}, probably incompatible"
             assert function_name in ["empty", "zeroes", "ones"], f"unhandled/unimplemented numpy function being accessed: {function_name}"
@@ -1836,7 +2611,7 @@ class SPIRVAssembler(ast.NodeVisitor):
 
             self.add_line(
                 self.Sections.FUNCTIONS,
-                f"%{temp_id} = OpAccessChain {element_type_id} %{node.value.id} %{index_id.strip('%')}"
+                "OpAccessChain", element_type_id, f"%{node.value.id}", f"%{index_id.strip('%')}", result_id=f"%{temp_id}"
             )
 
             # function does not account for pointer, potential fix needed?
@@ -1851,6 +2626,113 @@ class SPIRVAssembler(ast.NodeVisitor):
             logging.exception(f"unexpected {type(node)} to parse in eval_line, probably not implemented yet", exc_info=False)
             raise Exception(f"unexpected {type(node)} to parse in eval_line, probably not implemented yet")
 
+    def _is_numpy_module(self, module_name: str) -> bool:
+        """ Check if a module name refers to numpy, either directly or through an alias.
+
+            Args:
+                module_name: Name used to access the module, i.e. ``np`` in ``np.empty``.
+
+            Returns:
+                ``True`` if the name refers to numpy.
+        """
+        if module_name in self._import_mapping:
+            return self._import_mapping[module_name] == "numpy"
+
+        if module_name in self._import_mapping.inverse:
+            return self._import_mapping.inverse[module_name] == "numpy"
+
+        return False
+
+    def _is_reduction_call(self, node) -> bool:
+        """ Check if a call is a reduction over arrays, i.e. ``sum(x)``, ``np.sum(x)`` or ``np.dot(x, y)``.
+
+            Args:
+                node: Call node.
+
+            Returns:
+                ``True`` if the call is a reduction handled by ``_eval_reduction``.
+        """
+        if not isinstance(node, ast.Call):
+            return False
+
+        if isinstance(node.func, ast.Name):
+            return node.func.id == "sum"
+
+        if isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name):
+            return node.func.attr in ["sum", "dot"] and self._is_numpy_module(node.func.value.id)
+
+        return False
+
+    def _get_array_size(self, symbol: str) -> int:
+        """ Get the number of elements of an array.
+
+            Args:
+                symbol: Name of the array.
+
+            Returns:
+                Number of elements in the array.
+        """
+        assert self.symbol_exists(symbol), f"symbol '{symbol}' does not exist"
+
+        info = self.get_symbol_info(symbol)
+        assert info.is_array, f"expected '{symbol}' to be an array"
+
+        return self.declared_types.inverse[info.declared_type_id].array_size
+
+    def _get_reduction_terms(self, node) -> list:
+        """ Get the terms added together by a reduction over arrays, i.e. ``x[0] * y[0]`` and so on for ``np.dot(x, y)``.
+
+            Args:
+                node: Call node, see ``_is_reduction_call``.
+
+            Returns:
+                Nodes of the terms, reading every element with a constant index.
+        """
+        function_name = node.func.id if isinstance(node.func, ast.Name) else node.func.attr
+        expected_args = 2 if function_name == "dot" else 1
+
+        assert not node.keywords, f"keyword arguments are not supported for {function_name}()"
+        assert len(node.args) == expected_args, f"{function_name}() expects {expected_args} argument(s), got {len(node.args)}"
+
+        for arg in node.args:
+            assert isinstance(arg, ast.Name), f"{function_name}() only supports arrays, got {ast.dump(arg)}"
+
+        sizes = [self._get_array_size(arg.id) for arg in node.args]
+        assert len(set(sizes)) == 1, f"{function_name}() expects arrays of the same size, got {sizes}"
+
+        def _element(arg, index: int):
+            return ast.Subscript(ast.Name(arg.id, ast.Load()), ast.Constant(index), ast.Load())
+
+        terms = []
+        for index in range(sizes[0]):
+            term = _element(node.args[0], index)
+
+            if function_name == "dot":
+                term = ast.BinOp(term, ast.Mult(), _element(node.args[1], index))
+
+            terms.append(term)
+
+        logging.debug(f"expanding {function_name}() over {sizes[0]} elements")
+        return terms
+
+    def _eval_reduction(self, node):
+        """ Evaluate a reduction over arrays, i.e. ``sum(x)``, ``np.sum(x)`` or ``np.dot(x, y)``.
+
+            Every element is read with a constant index, and the elements (or the products of each pair of elements,
+            for a dot product) are added together as a balanced tree, see ``titan.compiler.optimiser.build_balanced_tree``.
+            The products of a dot product are all done at once, so the result takes one tick for the multipliers and the
+            log2 of the size of the arrays for the adders. A reduction added to other values joins their chain instead,
+            see ``_get_chain_operands``.
+
+            Args:
+                node: Call node, see ``_is_reduction_call``.
+
+            Returns:
+                Final line id
+                Line context
+        """
+        return self._eval_line(build_balanced_tree(ast.Add(), self._get_reduction_terms(node)))
+
     def _eval_line_wrap(self, node):
         """ Works on ast.Assign or ast.AnnAssign nodes
         """
@@ -1862,7 +2744,7 @@ class SPIRVAssembler(ast.NodeVisitor):
             assert len(node.targets) == 1, f"multiple assignments not supported"
             
             # if we're assinging via a call specifically
-            if isinstance(node.value, ast.Call):
+            if isinstance(node.value, ast.Call) and not self._is_reduction_call(node.value):
                 evaluated = self._eval_line(node)
                 # logging.debug(f" = {evaluated}")
                 return evaluated
@@ -1871,12 +2753,19 @@ class SPIRVAssembler(ast.NodeVisitor):
             target = node.targets[0]
             # logging.debug(f"{target.id}")
 
+            # copying a symbol holding a known constant copies the constant, i.e. "b = a" where a = 0
+            if isinstance(node.value, ast.Name):
+                return self._eval_operand(node.value)
+
             evaluated = self._eval_line(node.value)
             # logging.debug(f" = {evaluated}")
             return evaluated
 
         elif isinstance(node, ast.AnnAssign):
             # logging.debug(f"{node.target.id}")
+
+            if isinstance(node.value, ast.Name):
+                return self._eval_operand(node.value)
             
             evaluated = self._eval_line(node.value)
             # logging.debug(f" = {evaluated}")
@@ -1,9 +1,12 @@
-import logging, io, pathlib, shutil
-from typing import NamedTuple, List
+import logging, pathlib
+from typing import NamedTuple, List, Dict
 from enum import Enum, auto
 
-from compiler.node import NodeAssembler, Node, NodeContext, NodeModuleData, NodeTypeContext
-from common.grammar import TitanSPIRVGrammar
+from compiler.node import NodeAssembler, Node, NodeContext, NodeModuleData, NodeTypeContext, DeadNodeReport
+from compiler.profiler import StageProfiler
+from compiler.dots import DotGraphOutput
+from common.grammar import parse_spirv
+from common.instruction import SPIRVInstruction
 from common.symbols import Operation, Operation_Type, DataType, StorageType
 from common.errors import TitanErrors
 
@@ -33,34 +36,45 @@ class VerilogAssember():
         ALWAYS_BLOCK = auto()
         ASSIGNMENTS = auto()
 
-    spirv_assembly = None
-    parsed_spirv = None
-    node_assembler: NodeAssembler = None
+    node_assembler: NodeAssembler
 
-    generated_verilog_text = {
-        Sections.MODULE_AND_PORTS: [],
-        Sections.INTERNAL: [],
-        Sections.ALWAYS_BLOCK: [],
-        Sections.ASSIGNMENTS: []
-    }
 
-
-    def __init__(self, spirv_assembly: str):
+    def __init__(self, spirv_assembly: str = None, instructions: List[SPIRVInstruction] = None, use_pyparsing: bool = False):
         """ 
+            Either the SPIR-V assembly text or the instructions must be given. Passing the instructions
+            (i.e. from ``titan.compiler.spirv.SPIRVAssembler.get_instructions``) avoids parsing any text.
+
             Params:
                 spirv_assembly: SPIR-V assembly code as one large string.
+                instructions: SPIR-V instructions, used as-is instead of parsing ``spirv_assembly``.
+                use_pyparsing: Parse ``spirv_assembly`` with the pyparsing grammar instead of the hand-written tokenizer.
         """
-        self.spirv_assembly = spirv_assembly
-        self._parse_spirv_pyparsing()
+        assert (spirv_assembly is None) != (instructions is None), f"expected either SPIR-V assembly or instructions"
 
-    def _parse_spirv_pyparsing(self):
-        """ Parses SPIR-V using ``pyparsing``.
+        self.spirv_assembly = spirv_assembly
+        self.parsed_spirv = None
+        self.node_assembler = None
+        self.generated_verilog_text = {section: [] for section in self.Sections}
+        self.comms_files = None
+        self.dead_node_report = DeadNodeReport()
+        self.written_files = []
+        self.render_futures = []
+
+        if instructions is None:
+            self._parse_spirv(use_pyparsing)
+        else:
+            self.parsed_spirv = instructions
+
+    def _parse_spirv(self, use_pyparsing: bool = False):
+        """ Parses SPIR-V assembly text.
         
             Works on the internal ``spirv_assembly`` attribute of the class, assigning the 
             value to ``parsed_spirv``.
+
+            Args:
+                use_pyparsing: Use ``titan.common.grammar.TitanSPIRVGrammar`` instead of ``titan.common.grammar.TitanSPIRVTokenizer``.
         """
-        with io.StringIO(self.spirv_assembly) as fake_file:
-            self.parsed_spirv = TitanSPIRVGrammar.spirv_body.parse_file(fake_file)
+        self.parsed_spirv = parse_spirv(self.spirv_assembly, use_pyparsing)
 
     def _get_spirv_function_locations(self, parsed_spirv) -> List:
         """ Determine location of SPIR-V functions from parsed SPIR-V assembly. """
@@ -95,22 +109,29 @@ class VerilogAssember():
         """
         self.generated_verilog_text[section].append(code)
 
-    def write_to_file(self, filename: str):
+    def get_verilog_text(self) -> str:
+        """ Get the generated Verilog as a string.
+
+            Returns:
+                String containing every section of the generated Verilog.
+        """
+        return "".join(f"{line}\n" for list_of_lines in self.generated_verilog_text.values() for line in list_of_lines)
+
+    def write_to_file(self, filename: str, output_dir: str = "output"):
         """ Write verilog content out to a file.
         
             Args:
                 filename: Name of file to create/overwrite.
+                output_dir: Folder to write the file into.
         """
-        logging.info(f"Writing HDL to file: output/{filename}.sv")
-        with open(f"output/{filename}.sv", "w") as f:
-            for section, list_of_lines in self.generated_verilog_text.items():
-                logging.debug(f"Writing section {section.name}")
+        logging.info(f"Writing HDL to file: {output_dir}/{filename}.sv")
+        with open(f"{output_dir}/{filename}.sv", "w") as f:
+            f.write(self.get_verilog_text())
 
-                for line in list_of_lines:
-                    f.write(line)
-                    f.write(f"\n")
+        self.written_files.append(f"{output_dir}/{filename}.sv")
 
-    def compile(self, filename: str, gen_yosys_script: bool = False, dark_dots: bool = False, create_comms: bool = True):
+    def compile(self, filename: str, gen_yosys_script: bool = False, dark_dots: bool = False, create_comms: bool = True, output_dir: str = "output", profiler: StageProfiler = None,
+                dots: DotGraphOutput = DotGraphOutput.NONE, optimise: bool = True, max_units: Dict[str, int] = None):
         """ Function to begin compiling. Calls other relevant functions. 
         
             Args:
@@ -118,25 +139,73 @@ class VerilogAssember():
                 gen_yosys_script: Create a Yosys script to visualise the verilog.
                 dark_dots: Use dark theme when creating Graphviz graph.
                 create_comms: Create the relevant comms files and output to the output folder.
+                output_dir: Folder to write all generated files into. ``None`` keeps everything in memory,
+                    see ``get_verilog_text``, ``comms_files`` and ``titan.compiler.node.NodeAssembler.dot_sources``.
+                profiler: Profiler to measure each stage with.
+                dots: Which Graphviz dot graphs of the dataflow to create. Renders run in the background,
+                    see ``render_futures``.
+                optimise: Remove nodes that don't contribute to any output, see ``dead_node_report``.
+                max_units: Maximum number of units of each arithmetic operation, by the name of the operation (i.e. ``{"mult": 4}``),
+                    see ``titan.compiler.node.NodeAssembler.schedule``. ``None`` gives every node its own unit.
         """
-        node_assember = self.compile_nodes()
-        self.node_assembler = node_assember
+        if profiler is None:
+            profiler = StageProfiler()
+
+        with profiler.stage("compile_nodes"):
+            node_assember = self.compile_nodes()
+            self.node_assembler = node_assember
+
+        write_files = output_dir is not None
+        render_dots = dots is DotGraphOutput.RENDER and write_files
 
-        self.node_assembler.generate_dot_graph()
-        self.node_assembler.clean_graph()
-        self.node_assembler.generate_dot_graph("clean_nodes", dark_mode=dark_dots)
+        if dots is not DotGraphOutput.NONE:
+            with profiler.stage("dot graph"):
+                self.node_assembler.generate_dot_graph(output_dir=output_dir, render=render_dots)
 
+        with profiler.stage("clean_graph"):
+            self.node_assembler.clean_graph()
 
-        self.compile_text()
-        self.write_to_file(filename)
+        if optimise:
+            with profiler.stage("dead nodes"):
+                self.dead_node_report = self.node_assembler.remove_dead_nodes()
+
+        if max_units:
+            for operation_name in max_units:
+                assert operation_name.upper() in Operation.__members__, f"unknown operation: '{operation_name}'"
+
+            with profiler.stage("schedule"):
+                self.node_assembler.schedule({Operation[operation_name.upper()]: limit for operation_name, limit in max_units.items()})
+
+        for module in self.node_assembler.content:
+            logging.info(f"pipeline depth of {module}: {self.node_assembler.get_pipeline_depth(module)} tick(s)")
+
+        if dots is not DotGraphOutput.NONE:
+            with profiler.stage("dot graph"):
+                self.node_assembler.generate_dot_graph("clean_nodes", dark_mode=dark_dots, output_dir=output_dir, render=render_dots)
+
+        with profiler.stage("compile_text"):
+            self.compile_text()
+
+        if write_files:
+            with profiler.stage("write verilog"):
+                self.write_to_file(filename, output_dir)
 
         if create_comms:
-            self.create_comms_files()
+            with profiler.stage("comms"):
+                self.generate_comms_files()
+
+                if write_files:
+                    self.create_comms_files(output_dir)
 
-        if gen_yosys_script:
-            logging.info(f"Creating yosys script (output/yosys_script_{filename}.txt)")
-            with open(f"output/yosys_script_{filename}.txt", "w+") as f:
+        if gen_yosys_script and write_files:
+            logging.info(f"Creating yosys script ({output_dir}/yosys_script_{filename}.txt)")
+            with open(f"{output_dir}/yosys_script_{filename}.txt", "w+") as f:
                 f.write(f"read_verilog -sv {filename}.sv; proc; opt; memory; opt; show;")
+
+            self.written_files.append(f"{output_dir}/yosys_script_{filename}.txt")
+
+        self.written_files.extend(self.node_assembler.written_files)
+        self.render_futures = self.node_assembler.render_futures
    
 
     def _parse_replace_comment_markers(self, file_path: str)-> tuple[list, str]:
@@ -288,8 +357,12 @@ class VerilogAssember():
         return file_content, module_entry_point
 
 
-    def create_comms_files(self):
+    def generate_comms_files(self) -> Dict[str, str]:
+        """ Generate the comms files from the templates, without writing them anywhere.
 
+            Returns:
+                Content of each comms file, indexed by file name. Also stored in ``comms_files``.
+        """
         required_files = ["core_interface_template", "instruction_handler", "spi_interface", "top_template"]
         REQUIRED_FILES_COUNT = len(required_files)
 
@@ -301,10 +374,6 @@ class VerilogAssember():
         path_parts.pop() # remove compiler/
         template_path_parts = path_parts + ["templates", "verilog"]
 
-        # cwd = place where script was run
-        output_folder_path = pathlib.Path.cwd() / "output"
-        
-
         templates_path = pathlib.Path(*template_path_parts)
 
         logging.debug(f"looking for templates in {templates_path}")
@@ -320,23 +389,36 @@ class VerilogAssember():
         if not _file_counter == REQUIRED_FILES_COUNT:
             raise Exception(f"did not find all required files - expected {len(required_files)} but got {_file_counter}. looking for {required_files}")
 
-        
-        # copy paste spi interface and instruction handler to output folder
+        self.comms_files = {}
+
+        # spi interface and instruction handler are used as they are
         for file in ["instruction_handler.sv", "spi_interface.sv"]:
-            template_file_path = templates_path / file
-            
-            logging.debug(f"copied {template_file_path} to {output_folder_path}")
-            shutil.copy2(template_file_path, output_folder_path)
-            
+            self.comms_files[file] = (templates_path / file).read_text()
 
         for file in ["core_interface_template.sv", "top_template.sv"]:
-            # content, entry_point = self._parse_replace_comment_markers(pathlib.Path(*(template_path_parts + [file])))
             content, entry_point = self._parse_replace_comment_markers(templates_path / file)
-            
-            with open(output_folder_path / f"{file.replace('_template.sv', '')}_{entry_point}.sv", "w") as f:
-                logging.info(f"Writing comms file: {file[:-3]} to {output_folder_path}")
-                for line in content:
-                    f.write(line)
+            self.comms_files[f"{file.replace('_template.sv', '')}_{entry_point}.sv"] = "".join(content)
+
+        return self.comms_files
+
+    def create_comms_files(self, output_dir: str = "output"):
+        """ Write the comms files to the output folder, generating them first if needed.
+
+            Args:
+                output_dir: Folder to write the files into.
+        """
+        if self.comms_files is None:
+            self.generate_comms_files()
+
+        # relative output folders are placed where the script was run
+        output_folder_path = pathlib.Path.cwd() / output_dir
+
+        for file, content in self.comms_files.items():
+            logging.info(f"Writing comms file: {file[:-3]} to {output_folder_path}")
+            with open(output_folder_path / file, "w") as f:
+                f.write(content)
+
+            self.written_files.append(str(output_folder_path / file))
 
     def compile_nodes(self):
         """ Generate Nodes from parsed SPIR-V assembly. 
@@ -350,6 +432,9 @@ class VerilogAssember():
 
         node_assembler = NodeAssembler()
 
+        # SPIR-V IDs are only looked up here, the graph uses the integer IDs
+        get_id = node_assembler.get_id
+
         # deal with headers
         logging.debug(f"processing SPIR-V headers...")
         for line_no in range(0, spirv_fn_locations[0].start_position):
@@ -362,12 +447,11 @@ class VerilogAssember():
                     node_assembler.create_module(spirv_fn_name)
 
                 case "Constant":
-                    if line.id not in node_assembler.declared_symbols:
-                        node_assembler.declared_symbols.append(line.id)
+                    node_assembler.declared_symbols.add(get_id(line.id))
 
-                    if node_assembler.type_exists_in_module(spirv_fn_name, line.opcode_args[0]):
+                    if node_assembler.type_exists_in_module(spirv_fn_name, get_id(line.opcode_args[0])):
 
-                        node_type_context = node_assembler.get_type_context_from_module(spirv_fn_name, line.opcode_args[0])
+                        node_type_context = node_assembler.get_type_context_from_module(spirv_fn_name, get_id(line.opcode_args[0]))
 
                         assert node_type_context.type != (DataType.VOID or DataType.NONE), f"got invalid type for constant"
 
@@ -375,7 +459,7 @@ class VerilogAssember():
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=line_no, id=line.id, type_id=line.opcode_args[0],
+                                    line_no=line_no, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
                                     operation=Operation.GLOBAL_CONST_DECLARATION,
 
                                     # this calls the correct conversion function to have literal value stored in data, instead of string
@@ -389,18 +473,17 @@ class VerilogAssember():
                         raise Exception(f"{TitanErrors.NON_EXISTENT_SYMBOL.value} ({line.opcode_args[0]} on line {line_no})", TitanErrors.NON_EXISTENT_SYMBOL.name)
         
                 case "Variable":
-                    if line.id not in node_assembler.declared_symbols:
-                        node_assembler.declared_symbols.append(line.id)
+                    node_assembler.declared_symbols.add(get_id(line.id))
 
                     match line.opcode_args[1]:
                         case "Output":
-                            node_assembler.add_output_to_module(spirv_fn_name, line.id[1:])
+                            node_assembler.add_output_to_module(spirv_fn_name, get_id(line.id))
                             node_assembler.add_body_node_to_module(
                                 spirv_fn_name,
                                 Node(
                                     NodeContext(
-                                        line_no=line_no, id=line.id,
-                                        type_id=node_assembler.get_primative_type_id_from_id(spirv_fn_name, line.opcode_args[0]),
+                                        line_no=line_no, id=get_id(line.id),
+                                        type_id=node_assembler.get_primative_type_id_from_id(spirv_fn_name, get_id(line.opcode_args[0])),
                                         operation=Operation.GLOBAL_VAR_DECLARATION,
                                         data=[Operation.FUNCTION_OUT_VAR_PARAM]
                                     )
@@ -408,13 +491,13 @@ class VerilogAssember():
                             )
 
                         case "Input":
-                            node_assembler.add_input_to_module(spirv_fn_name, line.id[1:])
+                            node_assembler.add_input_to_module(spirv_fn_name, get_id(line.id))
                             node_assembler.add_body_node_to_module(
                                 spirv_fn_name,
                                 Node(
                                     NodeContext(
-                                        line_no=line_no, id=line.id,
-                                        type_id=node_assembler.get_primative_type_id_from_id(spirv_fn_name, line.opcode_args[0]),
+                                        line_no=line_no, id=get_id(line.id),
+                                        type_id=node_assembler.get_primative_type_id_from_id(spirv_fn_name, get_id(line.opcode_args[0])),
                                         operation=Operation.GLOBAL_VAR_DECLARATION,
                                         data=[Operation.FUNCTION_IN_VAR_PARAM]
                                     )
@@ -424,18 +507,18 @@ class VerilogAssember():
                 case "TypePointer":
                     node_assembler.add_type_context_to_module(
                         spirv_fn_name,
-                        line.id,
+                        get_id(line.id),
                         NodeTypeContext(
-                            type=node_assembler.get_datatype_from_id(spirv_fn_name, line.opcode_args[1]), # returns types.DataType
-                            is_pointer=True, alias=line.opcode_args[1]
+                            type=node_assembler.get_datatype_from_id(spirv_fn_name, get_id(line.opcode_args[1])), # returns types.DataType
+                            is_pointer=True, alias=get_id(line.opcode_args[1])
                         )
                     )
 
                 case "TypeInt":
                     node_assembler.add_type_context_to_module(
-                        spirv_fn_name, line.id,
+                        spirv_fn_name, get_id(line.id),
                         NodeTypeContext(
-                            type=DataType.INTEGER, data=line.opcode_args.as_list()
+                            type=DataType.INTEGER, data=list(line.opcode_args)
                         )
                     )
 
@@ -446,16 +529,16 @@ class VerilogAssember():
                 
                 case "TypeBool":
                     node_assembler.add_type_context_to_module(
-                        spirv_fn_name, line.id,
+                        spirv_fn_name, get_id(line.id),
                         NodeTypeContext(type=DataType.BOOLEAN)
                     )
 
                 case "TypeArray":
                     node_assembler.add_type_context_to_module(
-                        spirv_fn_name, line.id,
+                        spirv_fn_name, get_id(line.id),
                         NodeTypeContext(
-                            type=node_assembler.get_datatype_from_id(spirv_fn_name, line.opcode_args[0]),
-                            is_array=True, array_dimension_id=line.opcode_args[1]
+                            type=node_assembler.get_datatype_from_id(spirv_fn_name, get_id(line.opcode_args[0])),
+                            is_array=True, array_dimension_id=get_id(line.opcode_args[1])
                         )
                     )
 
@@ -484,15 +567,14 @@ class VerilogAssember():
 
                 match line.opcode:
                     case "Variable":
-                        if line.id not in node_assembler.declared_symbols:
-                            node_assembler.declared_symbols.append(line.id)
+                        node_assembler.declared_symbols.add(get_id(line.id))
 
                         node_assembler.add_body_node_to_module(
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=position, id=line.id,
-                                    type_id=node_assembler.get_primative_type_id_from_id(spirv_fn_name, line.opcode_args[0]),
+                                    line_no=position, id=get_id(line.id),
+                                    type_id=node_assembler.get_primative_type_id_from_id(spirv_fn_name, get_id(line.opcode_args[0])),
                                     operation=Operation.VARIABLE_DECLARATION
                                 )
                             )
@@ -500,16 +582,16 @@ class VerilogAssember():
 
                     case "Store":
 
-                        assert node_assembler.node_exists(spirv_fn_name, line.opcode_args[0]), f"node does not exist: {line.opcode_args[0]}"
-                        assert node_assembler.node_exists(spirv_fn_name, line.opcode_args[1]), f"node does not exist: {line.opcode_args[1]}"
-                        assert not node_assembler.is_symbol_an_input(spirv_fn_name, line.opcode_args[0]), f"cannot assign value to input variable"
+                        assert node_assembler.node_exists(spirv_fn_name, get_id(line.opcode_args[0])), f"node does not exist: {line.opcode_args[0]}"
+                        assert node_assembler.node_exists(spirv_fn_name, get_id(line.opcode_args[1])), f"node does not exist: {line.opcode_args[1]}"
+                        assert not node_assembler.is_symbol_an_input(spirv_fn_name, get_id(line.opcode_args[0])), f"cannot assign value to input variable"
                         logging.debug(f"'{line.opcode_args[1]}' is being stored in '{line.opcode_args[0]}'")
 
-                        target_node = node_assembler.get_node(spirv_fn_name, line.opcode_args[0])
-                        value_node = node_assembler.get_node(spirv_fn_name, line.opcode_args[1])
+                        target_node = node_assembler.get_node(spirv_fn_name, get_id(line.opcode_args[0]))
+                        value_node = node_assembler.get_node(spirv_fn_name, get_id(line.opcode_args[1]))
 
                         store_node_ctx = NodeContext(
-                            line_no=position, id=line.opcode_args[0], 
+                            line_no=position, id=get_id(line.opcode_args[0]), 
                             type_id=target_node.type_id, input_left=value_node, operation=Operation.STORE
                         )
 
@@ -518,7 +600,7 @@ class VerilogAssember():
 
                         
                     case "Load":
-                        value_node = node_assembler.get_node(spirv_fn_name, line.opcode_args[1])
+                        value_node = node_assembler.get_node(spirv_fn_name, get_id(line.opcode_args[1]))
 
                         operation = Operation.ARRAY_LOAD if value_node.operation is Operation.ARRAY_INDEX else Operation.LOAD
 
@@ -526,7 +608,7 @@ class VerilogAssember():
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=position, id=line.id, type_id=line.opcode_args[0], 
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]), 
                                     input_left=value_node, operation=operation
                                 )
                             )
@@ -539,7 +621,7 @@ class VerilogAssember():
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=position, id=line.id, type_id=line.opcode_args[0],
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
                                     input_left=left_node, input_right=right_node, operation=Operation.ADD
                                 )
                             )
@@ -552,7 +634,7 @@ class VerilogAssember():
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=position, id=line.id, type_id=line.opcode_args[0],
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
                                     input_left=left_node, input_right=right_node, operation=Operation.SUB
                                 )
                             )
@@ -565,7 +647,7 @@ class VerilogAssember():
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=position, id=line.id, type_id=line.opcode_args[0],
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
                                     input_left=left_node, input_right=right_node, operation=Operation.MULT
                                 )
                             )
@@ -578,7 +660,7 @@ class VerilogAssember():
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=position, id=line.id, type_id=line.opcode_args[0],
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
                                     input_left=left_node, input_right=right_node, operation=Operation.DIV
                                 )
                             )
@@ -589,13 +671,13 @@ class VerilogAssember():
                         # %result_id = OpSelect %type_id %comparison_id %true_value_id %false_value_id
                         left_node, right_node = node_assembler.get_left_and_right_nodes(spirv_fn_name, line, [2, 3])
 
-                        compare_node = node_assembler.get_node(spirv_fn_name, line.opcode_args[1])
+                        compare_node = node_assembler.get_node(spirv_fn_name, get_id(line.opcode_args[1]))
 
                         node_assembler.add_body_node_to_module(
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=position, id=line.id, type_id=line.opcode_args[0],
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
                                     input_left=left_node, input_right=right_node, 
                                     operation=Operation.DECISION, 
                                     data=[compare_node], 
@@ -611,7 +693,7 @@ class VerilogAssember():
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=position, id=line.id, type_id=line.opcode_args[0],
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
                                     input_left=left_node, input_right=right_node,
                                     operation=Operation.EQUAL_TO
                                 )
@@ -625,7 +707,7 @@ class VerilogAssember():
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=position, id=line.id, type_id=line.opcode_args[0],
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
                                     input_left=left_node, input_right=right_node,
                                     operation=Operation.NOT_EQUAL_TO
                                 )
@@ -639,7 +721,7 @@ class VerilogAssember():
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=position, id=line.id, type_id=line.opcode_args[0],
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
                                     input_left=left_node, input_right=right_node,
                                     operation=Operation.LESS_THAN
                                 )
@@ -653,7 +735,7 @@ class VerilogAssember():
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=position, id=line.id, type_id=line.opcode_args[0],
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
                                     input_left=left_node, input_right=right_node,
                                     operation=Operation.LESS_OR_EQ
                                 )
@@ -667,7 +749,7 @@ class VerilogAssember():
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=position, id=line.id, type_id=line.opcode_args[0],
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
                                     input_left=left_node, input_right=right_node,
                                     operation=Operation.GREATER_THAN
                                 )
@@ -681,7 +763,7 @@ class VerilogAssember():
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=position, id=line.id, type_id=line.opcode_args[0],
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
                                     input_left=left_node, input_right=right_node,
                                     operation=Operation.GREATER_OR_EQ
                                 )
@@ -697,14 +779,13 @@ class VerilogAssember():
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=position, id=line.id, type_id=line.opcode_args[0],
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
                                     input_left=left_node, input_right=right_node,
                                     operation=Operation.SHIFT_LEFT
                                 )
                             )
                         )
 
-                    # NOTE: this might need to handle "OpShiftRightArithmetic"
                     # NOTE? why does this case statement have the "Op" prefix but none of the others do?
                     case "ShiftRightLogical":
                         left_node, right_node = node_assembler.get_left_and_right_nodes(spirv_fn_name, line)
@@ -713,22 +794,56 @@ class VerilogAssember():
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=position, id=line.id, type_id=line.opcode_args[0],
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
                                     input_left=left_node, input_right=right_node,
                                     operation=Operation.SHIFT_RIGHT
                                 )
                             )
                         )
 
+                    case "ShiftRightArithmetic":
+                        left_node, right_node = node_assembler.get_left_and_right_nodes(spirv_fn_name, line)
+
+                        node_assembler.add_body_node_to_module(
+                            spirv_fn_name,
+                            Node(
+                                NodeContext(
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
+                                    input_left=left_node, input_right=right_node,
+                                    operation=Operation.SHIFT_RIGHT_ARITHMETIC
+                                )
+                            )
+                        )
+
+                    case "BitwiseAnd" | "BitwiseOr" | "BitwiseXor":
+                        left_node, right_node = node_assembler.get_left_and_right_nodes(spirv_fn_name, line)
+
+                        bitwise_operations = {
+                            "BitwiseAnd": Operation.BITWISE_AND,
+                            "BitwiseOr": Operation.BITWISE_OR,
+                            "BitwiseXor": Operation.BITWISE_XOR
+                        }
+
+                        node_assembler.add_body_node_to_module(
+                            spirv_fn_name,
+                            Node(
+                                NodeContext(
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
+                                    input_left=left_node, input_right=right_node,
+                                    operation=bitwise_operations[line.opcode]
+                                )
+                            )
+                        )
+
                     case "AccessChain":
-                        array_node = node_assembler.get_node(spirv_fn_name, line.opcode_args[1])
+                        array_node = node_assembler.get_node(spirv_fn_name, get_id(line.opcode_args[1]))
                         node_assembler.add_body_node_to_module(
                             spirv_fn_name,
                             Node(
                                 NodeContext(
-                                    line_no=position, id=line.id, type_id=line.opcode_args[0],
+                                    line_no=position, id=get_id(line.id), type_id=get_id(line.opcode_args[0]),
                                     operation=Operation.ARRAY_INDEX, input_left=array_node,
-                                    array_id=line.opcode_args[1], array_index_id=line.opcode_args[2]
+                                    array_id=get_id(line.opcode_args[1]), array_index_id=get_id(line.opcode_args[2])
                                 )
                             )
                         )
@@ -747,6 +862,9 @@ class VerilogAssember():
     def compile_text(self):
         """ Generate SystemVerilog source code based on Nodes. """
 
+        # nodes use integer IDs, their names are only needed for the text
+        name = self.node_assembler.get_id_name
+
         def _get_correct_id(node: Node):
             """ Determine the correct ID/value to return.
             
@@ -764,9 +882,17 @@ class VerilogAssember():
             
             # added for handling comparison node
             if node.operation is Operation.STORE:
-                return node.input_left.spirv_id[1:]
+                # a variable holding a constant, i.e. one that was folded
+                if node.input_left.operation in Operation_Type.GENERIC_CONSTANT_DECLARATION:
+                    return node.input_left.data[0]
+
+                # a variable holding a copy of another, i.e. "0 + a" once the optimiser removes the adder
+                if node.input_left.operation is Operation.LOAD and node.input_left.spirv_id not in self.node_assembler.declared_symbols:
+                    return _get_correct_id(node.input_left.input_left)
+
+                return name(node.input_left.spirv_id)
             else:
-                return node.spirv_id[1:]
+                return name(node.spirv_id)
         
 
         self.append_code(
@@ -781,9 +907,39 @@ class VerilogAssember():
             self.append_code(self.Sections.ALWAYS_BLOCK, f"\talways_ff @ (posedge clock_i) begin")
             
             module_data = self.node_assembler.content[module]
-            sorted_nodes = self.node_assembler._sort_body_nodes_by_tick(module)
+            sorted_nodes = self.node_assembler.get_nodes_by_tick(module)
 
-            for tick in range(len(sorted_nodes.keys())):
+            # nodes sharing a unit take turns using it, stepping through the ticks one clock cycle at a time
+            shared_unit_names = {}
+
+            if module_data.shared_units:
+                last_step = max(sorted_nodes.keys())
+
+                self.append_code(self.Sections.INTERNAL, f"\tlogic [{last_step.bit_length()-1}:0] titan_step = 0;")
+                self.append_code(self.Sections.ALWAYS_BLOCK, f"\t\ttitan_step <= titan_step == {last_step} ? 0 : titan_step + 1;")
+
+                for unit in module_data.shared_units:
+                    unit_name = f"titan_{unit.operation.name.lower()}_{unit.index}"
+                    width = int(self.node_assembler.get_type_context_from_module(module, unit.nodes[0].type_id).data[0])
+
+                    for side, operands in [("left", [node.input_left for node in unit.nodes]), ("right", [node.input_right for node in unit.nodes])]:
+                        self.append_code(self.Sections.INTERNAL, f"\tlogic [{width-1}:0] {unit_name}_{side};")
+
+                        # the operands of the last node are used for every other step
+                        default = _get_correct_id(operands[-1])
+                        selected = "".join(
+                            f"titan_step == {node.tick} ? {_get_correct_id(operand)} : " for node, operand in zip(unit.nodes[:-1], operands)
+                            if _get_correct_id(operand) != default
+                        )
+                        self.append_code(self.Sections.ASSIGNMENTS, f"\tassign {unit_name}_{side} = {selected}{default};")
+
+                    self.append_code(self.Sections.INTERNAL, f"\tlogic [{width-1}:0] {unit_name};")
+                    self.append_code(self.Sections.ASSIGNMENTS, f"\tassign {unit_name} = {unit_name}_left {unit.operation.value} {unit_name}_right;")
+
+                    for node in unit.nodes:
+                        shared_unit_names[node] = unit_name
+
+            for tick in sorted(sorted_nodes):
                 logging.debug(f"tick {tick} has {len(sorted_nodes[tick])} nodes")
 
                 io_length_tracker = 0
@@ -799,6 +955,14 @@ class VerilogAssember():
                             assert tick == 0, f"variable declaration outside of tick 0"
 
                             type_ctx = self.node_assembler.get_type_context_from_module(module, node.type_id)
+                            unpacked = ""
+
+                            # arrays are passed in as unpacked arrays of their elements
+                            if type_ctx.is_array:
+                                array_shape = self.node_assembler.get_node(module, type_ctx.array_dimension_id).data[0]
+                                unpacked = f" [0:{array_shape-1}]"
+                                type_ctx = self.node_assembler.get_primative_type_context_from_datatype(module, type_ctx.type)
+
                             width = int(type_ctx.data[0])
 
                             ender = "\n);" if io_length_tracker == (len(module_data.inputs) + len(module_data.outputs)) - 1 else ","
@@ -807,13 +971,13 @@ class VerilogAssember():
                                 case Operation.FUNCTION_IN_VAR_PARAM:
                                     self.append_code(
                                         self.Sections.MODULE_AND_PORTS,
-                                        f"\tinput logic [{width-1}:0] {node.spirv_id[1:]}{ender}"
+                                        f"\tinput logic [{width-1}:0] {name(node.spirv_id)}{unpacked}{ender}"
                                     )
                                 
                                 case Operation.FUNCTION_OUT_VAR_PARAM:
                                     self.append_code(
                                         self.Sections.MODULE_AND_PORTS,
-                                        f"\toutput logic [{width-1}:0] {node.spirv_id[1:]}{ender}"
+                                        f"\toutput logic [{width-1}:0] {name(node.spirv_id)}{unpacked}{ender}"
                                     )
                             
                             io_length_tracker += 1
@@ -832,17 +996,17 @@ class VerilogAssember():
                                 assert array_shape >= 1, f"array shape must define array of 2 or more elements"
                                 width = int(self.node_assembler.get_primative_type_context_from_datatype(module, type_context.type).data[0])
 
-                                self.append_code(self.Sections.INTERNAL, f"\tlogic [{width-1}:0] {node.spirv_id[1:]} [0:{array_shape-1}];")
+                                self.append_code(self.Sections.INTERNAL, f"\tlogic [{width-1}:0] {name(node.spirv_id)} [0:{array_shape-1}];")
 
                             else:
-                                logging.debug(f"not generating logic/reg for {node.spirv_id[1:]}: {node}")
+                                logging.debug(f"not generating logic/reg for {name(node.spirv_id)}: {node}")
 
 
                         case Operation.STORE:
-                            if self.node_assembler.is_symbol_an_output(module, node.spirv_id[1:]):
+                            if self.node_assembler.is_symbol_an_output(module, node.spirv_id):
                                 # if the node is a constant declaration, convert the value it stores into a string, otherwise just use the SPIR-V ID
-                                rhs_text = str(node.input_left.data[0]) if node.input_left.operation is Operation.GLOBAL_CONST_DECLARATION else node.input_left.spirv_id[1:]
-                                self.append_code(self.Sections.ASSIGNMENTS, f"\tassign {node.spirv_id[1:]} = {rhs_text};")
+                                rhs_text = str(node.input_left.data[0]) if node.input_left.operation is Operation.GLOBAL_CONST_DECLARATION else name(node.input_left.spirv_id)
+                                self.append_code(self.Sections.ASSIGNMENTS, f"\tassign {name(node.spirv_id)} = {rhs_text};")
                             else:
                                 logging.debug(f"not creating assign statement for {node.spirv_id}: {node}")
 
@@ -850,36 +1014,34 @@ class VerilogAssember():
                             if node.spirv_id not in self.node_assembler.declared_symbols:
                                 width = int(self.node_assembler.get_type_context_from_module(module, node.type_id).data[0])
 
-                                self.append_code(self.Sections.INTERNAL, f"\tlogic [{width-1}:0] {node.spirv_id[1:]};")
+                                self.append_code(self.Sections.INTERNAL, f"\tlogic [{width-1}:0] {name(node.spirv_id)};")
 
                             assert type(node.operation.value) is str, f"didn't get a string for operator, is it set correctly? {node.operation}"
-                            line = f"\t\t{node.spirv_id[1:]} <= {_get_correct_id(node.input_left)} {node.operation.value} {_get_correct_id(node.input_right)};"
+
+                            if node in shared_unit_names:
+                                # only take the result of the unit on this node's step
+                                line = f"\t\tif (titan_step == {tick}) {name(node.spirv_id)} <= {shared_unit_names[node]};"
+                            else:
+                                line = f"\t\t{name(node.spirv_id)} <= {_get_correct_id(node.input_left)} {node.operation.value} {_get_correct_id(node.input_right)};"
 
                             self.append_code(self.Sections.ALWAYS_BLOCK, line)
 
                         case _ if node.operation in Operation_Type.COMPARISON:
-                            defer_node_creation = False
-                            
-                            logging.debug(f"checking 1 tick ahead..({tick} + 1 = {tick+1})")
-                            for future_node in sorted_nodes[tick+1]:
-                                if defer_node_creation: break
-
-                                if future_node.operation == Operation.DECISION:
-                                    if future_node.data[0].spirv_id == node.spirv_id:
-                                        logging.debug(f"found a reference")
-                                        defer_node_creation = True
-                                    else:
-                                        logging.debug("no reference found")
+                            # a decision in a later tick merges the comparison into itself, it is only later than the next tick when scheduled
+                            defer_node_creation = any(
+                                consumer.operation == Operation.DECISION and consumer.tick > tick and consumer.data[0].spirv_id == node.spirv_id
+                                for consumer in self.node_assembler.get_consumers(module, node.spirv_id)
+                            )
 
-                            logging.debug("stopped checking 1 tick ahead")
+                            logging.debug(f"comparison {'is' if defer_node_creation else 'is not'} used by a decision after tick {tick}")
 
                             # TODO: better variable name
                             if not defer_node_creation:
-                                self.append_code(self.Sections.INTERNAL, f"\tlogic {node.spirv_id[1:]};")
+                                self.append_code(self.Sections.INTERNAL, f"\tlogic {name(node.spirv_id)};")
 
                                 assert type(node.operation.value) is str, f"didn't get a string for operator, is it set correctly? {node.operation}"
 
-                                line = f"\t\t{node.spirv_id[1:]} <= {_get_correct_id(node.input_left)} {node.operation.value} {_get_correct_id(node.input_right)};"
+                                line = f"\t\t{name(node.spirv_id)} <= {_get_correct_id(node.input_left)} {node.operation.value} {_get_correct_id(node.input_right)};"
                                 self.append_code(self.Sections.ALWAYS_BLOCK, line)
                             else:
                                 continue
@@ -899,51 +1061,47 @@ class VerilogAssember():
 
                             width = int(self.node_assembler.get_type_context_from_module(module, node.type_id).data[0])
 
-                            self.append_code(self.Sections.INTERNAL, f"\tlogic [{width-1}:0] {node.spirv_id[1:]};")
+                            self.append_code(self.Sections.INTERNAL, f"\tlogic [{width-1}:0] {name(node.spirv_id)};")
 
                             comparison_symbol = comparison_node.operation.value
                             assert type(comparison_node.operation.value) is str, f"didn't get a string for operator, is it set correctly? {comparison_node.operation} {comparison_node.operation.value}"
                             
                             # TODO: __get_correct_id(node) was returning the string representation of the node instead, why?
-                            line = f"\t\t{node.spirv_id[1:]} <= {_get_correct_id(comparison_node.input_left)} {comparison_symbol} {_get_correct_id(comparison_node.input_right)} ? {_get_correct_id(node.input_left)} : {_get_correct_id(node.input_right)};"
+                            line = f"\t\t{name(node.spirv_id)} <= {_get_correct_id(comparison_node.input_left)} {comparison_symbol} {_get_correct_id(comparison_node.input_right)} ? {_get_correct_id(node.input_left)} : {_get_correct_id(node.input_right)};"
                             self.append_code(self.Sections.ALWAYS_BLOCK, line)
 
                         case _ if node.operation in Operation_Type.BITWISE:
                             width = int(self.node_assembler.get_type_context_from_module(module, node.type_id).data[0])
                             
-                            self.append_code(self.Sections.INTERNAL, f"\tlogic [{width-1}:0] {node.spirv_id[1:]}")
+                            self.append_code(self.Sections.INTERNAL, f"\tlogic [{width-1}:0] {name(node.spirv_id)};")
 
-                            line = f"\t\t{_get_correct_id(node)} <= {_get_correct_id(node.input_left)} {Operation(node.operation).value} {_get_correct_id(node.input_right)};"
+                            # values are unsigned unless told otherwise, which would make >>> shift in zeros
+                            shifted = _get_correct_id(node.input_left)
+                            if node.operation is Operation.SHIFT_RIGHT_ARITHMETIC:
+                                shifted = f"$signed({shifted})"
+
+                            line = f"\t\t{_get_correct_id(node)} <= {shifted} {Operation(node.operation).value} {_get_correct_id(node.input_right)};"
                             self.append_code(self.Sections.ALWAYS_BLOCK, line)
 
                         case Operation.GLOBAL_CONST_DECLARATION: pass # dont need to generate any text
 
                         case Operation.ARRAY_INDEX:
                             
-                            load_store_node = None
-
-                            # look through all nodes trying to find an associated load/store node
-                            # cant only peek one tick ahead because it may not be there 
+                            # find the associated load/store node, which may be several ticks later
                             #   -> x[1] = 1 + 2 / b is two steps, so the load/store node is actually located at tick+2 not tick+1
-                            for i in range(tick, len(sorted_nodes)):
-                                for j in range(len(sorted_nodes[i])):
-                                    future_node = sorted_nodes[i][j]
-
-                                    logging.debug(f"checking: {future_node}")
-
-                                    if future_node.operation == Operation.ARRAY_LOAD:
-                                        if future_node.input_left.spirv_id == node.spirv_id:
-                                            logging.debug(f"array load, id of left input matches current node: {future_node.input_left.spirv_id} == {node.spirv_id}")
-                                            load_store_node = future_node
-                                            break
-
-                                    # NOTE: future_node.operation == (Operation.ARRAY_STORE or Operation.STORE) doesn't work?
-                                    elif future_node.operation in [Operation.ARRAY_STORE, Operation.STORE]:
-                                        if future_node.spirv_id == node.spirv_id:
-                                            logging.debug(f"array store, id of store node matches current node: {future_node.spirv_id} == {node.spirv_id}")
-                                            load_store_node = future_node
-                                            break
-                            
+                            # a load uses the index as its input, whereas a store is another version of the index's ID
+                            candidates = [
+                                consumer for consumer in self.node_assembler.get_consumers(module, node.spirv_id)
+                                if consumer.operation == Operation.ARRAY_LOAD and consumer.input_left.spirv_id == node.spirv_id
+                            ]
+                            candidates += [
+                                version for version in self.node_assembler.get_node_versions(module, node.spirv_id)
+                                if version.operation in [Operation.ARRAY_STORE, Operation.STORE]
+                            ]
+
+                            load_store_node = min((candidate for candidate in candidates if candidate.tick >= tick), key=lambda candidate: candidate.tick, default=None)
+                            logging.debug(f"array index {name(node.spirv_id)} is used by {load_store_node}")
+
 
                             assert load_store_node != None, f"failed to find a corresponding array load/store node"
 
@@ -954,7 +1112,7 @@ class VerilogAssember():
                                     assert not self.node_assembler.is_symbol_an_output(module, load_store_node.input_left.spirv_id), f"cannot load value from output port"
 
                                     # TODO: get width for int type, hardcoded for now
-                                    self.append_code(self.Sections.INTERNAL, f"\tlogic [31:0] {load_store_node.spirv_id[1:]};")
+                                    self.append_code(self.Sections.INTERNAL, f"\tlogic [31:0] {name(load_store_node.spirv_id)};")
 
                                     array_max_size = self.node_assembler.get_array_node_dimensions(module, node.array_id)
                                     array_index = self.node_assembler.get_node(module, node.array_index_id).data[0]
@@ -964,7 +1122,7 @@ class VerilogAssember():
                                     assert array_index < array_max_size, f"array_index was not less than array_max_size: {array_index} < {array_max_size}"
 
                                     # assign in body
-                                    self.append_code(self.Sections.ALWAYS_BLOCK, f"\t\t{load_store_node.spirv_id[1:]} <= {node.array_id[1:]}[{array_index}];")
+                                    self.append_code(self.Sections.ALWAYS_BLOCK, f"\t\t{name(load_store_node.spirv_id)} <= {name(node.array_id)}[{array_index}];")
 
                                 case _ if load_store_node.operation in [Operation.ARRAY_STORE, Operation.STORE]:
                                     array_index = self.node_assembler.get_node(module, node.array_index_id).data[0]
@@ -976,7 +1134,7 @@ class VerilogAssember():
                                     # will need to change comparison so that it works with tuples
                                     assert array_index < array_max_size, f"array_index was not less than array_max_size: {array_index} < {array_max_size}"
 
-                                    self.append_code(self.Sections.ALWAYS_BLOCK, f"\t\t{node.input_left.spirv_id[1:]}[{array_index}] <= {load_store_node.input_left.spirv_id[1:]};")
+                                    self.append_code(self.Sections.ALWAYS_BLOCK, f"\t\t{name(node.input_left.spirv_id)}[{array_index}] <= {name(load_store_node.input_left.spirv_id)};")
 
                                 case _:
                                     raise Exception(f"unexpected operation: {load_store_node.operation}")
@@ -1,8 +1,12 @@
-import io, logging, datetime, argparse, os, pathlib
+import io, logging, datetime, argparse, os, pathlib, sys, time
+from concurrent.futures import Executor
+from itertools import repeat
+from typing import List, NamedTuple, Tuple
 
-from rich.logging import RichHandler
-
-from compiler.helper import CompilerContext
+from compiler.cache import CompileCache
+from compiler.dots import DotGraphOutput, render_dot_file, wait_for_renders
+from compiler.helper import CompilerContext, get_output_dirs
+from compiler.profiler import StageProfiler, write_profile_report, compare_profile_reports
 from compiler.spirv import SPIRVAssembler
 from compiler.verilog import VerilogAssember
 
@@ -16,31 +20,69 @@ def run_argparse() -> argparse.Namespace:
         description = "Compile a subset of Python into SystemVerilog. Visit https://titan-compiler-project.github.io/titan for more info."
     )
 
-    parser.add_argument("source_file", help="python source file to compile")
+    parser.add_argument("source_file", nargs="+", help="python source file(s) to compile, directories and glob patterns are expanded")
     parser.add_argument("-t", "--top", help="specify the top function")
     parser.add_argument("-asm", help="output the SPIR-V assembly code", action="store_true")
     parser.add_argument("-s", help="only run the SPIR-V generation", action="store_true", dest="run_spirv_only")
     parser.add_argument("-v", "--verbose", help="output debug messages", action="store_true")
     parser.add_argument("-dd", "--dark-dots", help="use dark theme when creating Graphviz dot graphs", action="store_true")
+    parser.add_argument("--dots", help="create Graphviz dot graphs of the dataflow: not at all, only the .dot sources, or also render them in the background (default: none)", choices=[output.value for output in DotGraphOutput], default=DotGraphOutput.NONE.value)
+    parser.add_argument("--wait-for-dots", help="wait for the dot graphs to finish rendering before reporting a file as done", action="store_true")
     parser.add_argument("-y", "--gen-yosys", help="generate simple yosys script to visualise module", action="store_true")
     parser.add_argument("-nc", "--no-comms", help="skip generating relevant comms interface files (output module only)", action="store_true")
+    parser.add_argument("--no-opt", help="disable optimisations, such as constant folding", action="store_true")
+    parser.add_argument("--max-units", nargs="+", metavar="OPERATION=COUNT", help="limit the number of hardware units of an arithmetic operation (add, sub, mult or div), sharing them between pipeline stages, i.e. mult=4 div=1")
+    parser.add_argument("-j", "--jobs", help="number of files to compile in parallel, 0 uses every CPU (default: 1)", type=int, default=1)
+    parser.add_argument("--no-cache", help="always compile, without reading or writing the compile cache", action="store_true")
+    parser.add_argument("--clear-cache", help="remove everything from the compile cache before compiling", action="store_true")
+    parser.add_argument("--cache-stats", help="report the compile cache hit rate and size at the end of the run", action="store_true")
+    parser.add_argument("--cache-dir", help="folder to keep the compile cache in (default: .titan_cache)", default=".titan_cache")
+    parser.add_argument("--cache-size", help="maximum size of the compile cache in MB (default: 512)", type=int, default=512)
+    parser.add_argument("-w", "--watch", help="keep running and rebuild source files when their code changes", action="store_true")
+    parser.add_argument("--poll-interval", help="seconds between checking for changes in watch mode (default: 0.5)", type=float, default=0.5)
+    parser.add_argument("--socket", help="keep running and accept build requests on this Unix socket")
+    parser.add_argument("--profile", help="measure wall time, CPU time and peak memory of each stage, writing a report to output/profile.json (disables the compile cache)", action="store_true")
+    parser.add_argument("--profile-cprofile", help="also dump cProfile stats of each stage into a profile folder next to the outputs", action="store_true")
+    parser.add_argument("--profile-baseline", help="compare the profile report against a previously written report")
 
     return parser.parse_args()
 
 
-def main():
-    """ Entry point for the program.
-    
-        Calls to handle CLI options, parsing, generating and writing.
+class FileResult(NamedTuple):
+    """ Outcome of compiling a single source file.
 
+        Attributes:
+            source_file: File that was compiled.
+            output_dir: Folder the generated files were written to.
+            seconds: Wall time spent compiling the file.
+            error: Error message if the compile failed, otherwise ``None``.
+            cache_hit: True if the generated files were restored from the compile cache.
+            stage_seconds: Wall time spent in each stage of the compile, in the order they ran.
+            profile: Wall time, CPU time and peak memory of each stage, only measured with ``--profile``.
     """
-    
-    args = run_argparse()
-    compiler_ctx = CompilerContext(args)
+    source_file: str
+    output_dir: str
+    seconds: float
+    error: str = None
+    cache_hit: bool = False
+    stage_seconds: dict = None
+    profile: dict = None
+
+
+def setup_logging(verbose: bool):
+    """ Configure logging to the log file and the console.
 
+        Also used to initialise worker processes, which don't inherit the configuration
+        on platforms that spawn rather than fork.
+
+        Args:
+            verbose: Output debug messages.
+    """
+    # rich is slow to import, so it's left until it's needed
+    from rich.logging import RichHandler
 
     logging.basicConfig(
-        level=logging.DEBUG if compiler_ctx.user_wants_verbose_info else logging.INFO,
+        level=logging.DEBUG if verbose else logging.INFO,
         handlers=[
             logging.FileHandler("compiler_log.txt"),
             # logging.StreamHandler()
@@ -50,31 +92,302 @@ def main():
         format=f"%(message)s"
     )
 
+
+def compile_file(compiler_ctx: CompilerContext, source_file: str, output_dir: str, cache: CompileCache = None) -> FileResult:
+    """ Compile a single source file, writing everything it generates into ``output_dir``.
+
+        Any exception is logged and returned in the result instead of being raised, so that
+        one broken file doesn't stop the rest of a batch.
+
+        If a cache is given and it has an entry for the source, the generated files are restored
+        from it and neither the SPIR-V nor the Verilog stage runs.
+
+        Args:
+            compiler_ctx: Options given by the user.
+            source_file: Python file to compile.
+            output_dir: Folder to write the generated files into.
+            cache: Compile cache to use, ``None`` to always compile.
+
+        Returns:
+            Result containing the time taken and the error, if any.
+    """
+    start_time = time.perf_counter()
+    file_name = os.path.basename(source_file)[:-3]
+    profiler = StageProfiler(detailed=compiler_ctx.user_wants_profile, use_cprofile=compiler_ctx.user_wants_cprofile)
+    error, cache_hit, render_futures = None, False, []
+
+    try:
+        logging.debug(f"output folder exists? {os.path.exists(output_dir)}")
+        os.makedirs(output_dir, exist_ok=True)
+
+        with profiler.stage("parse"):
+            spirv_assembler = SPIRVAssembler(source_file, disable_debug=False, top=compiler_ctx.name_of_top_module, optimise=compiler_ctx.optimise)
+
+        if cache is not None:
+            with profiler.stage("cache lookup"):
+                cache_key = cache.make_key(spirv_assembler.get_tree_dump(), file_name, compiler_ctx.get_output_affecting_options())
+                restored_files = cache.restore(cache_key, output_dir)
+                cache_hit = restored_files is not None
+
+        if cache_hit:
+            logging.info(f"Restored {source_file} from the compile cache")
+
+            if compiler_ctx.dots is DotGraphOutput.RENDER:
+                render_futures = [render_dot_file(file) for file in restored_files if file.endswith(".dot")]
+        else:
+            written_files, render_futures = _run_compile_stages(compiler_ctx, spirv_assembler, source_file, output_dir, profiler)
+
+            if cache is not None:
+                with profiler.stage("cache store"):
+                    cache.store(cache_key, output_dir, written_files)
+
+        if compiler_ctx.wait_for_dots and len(render_futures) > 0:
+            with profiler.stage("dot render"):
+                wait_for_renders(render_futures)
+        elif len(render_futures) > 0:
+            logging.info(f"Rendering {len(render_futures)} dot graphs in the background")
+
+    except Exception as e:
+        logging.exception(f"Failed to compile {source_file}")
+        error = str(e) or e.__class__.__name__
+
+    finally:
+        profiler.stop()
+
+    if compiler_ctx.user_wants_cprofile:
+        profiler.dump_cprofile_stats(os.path.join(output_dir, "profile"))
+
+    return FileResult(source_file, output_dir, time.perf_counter() - start_time, error, cache_hit,
+                      stage_seconds=profiler.get_stage_seconds(),
+                      profile=profiler.get_report() if compiler_ctx.user_wants_profile else None)
+
+
+def _run_compile_stages(compiler_ctx: CompilerContext, spirv_assembler: SPIRVAssembler, source_file: str, output_dir: str, profiler: StageProfiler) -> Tuple[List[str], list]:
+    """ Run the SPIR-V and Verilog stages of ``compile_file``, returning the paths of every file written and the dot graphs still being rendered. """
+    file_name = os.path.basename(source_file)[:-3]
+
+    logging.info(f"Generating SPIR-V from {source_file}")
+    with profiler.stage("spirv"):
+        spirv_assembler.compile()
+
+    spirv_assembler.write_lagging_info()
+
+    if compiler_ctx.user_wants_spirv_asm:
+        with profiler.stage("write spirv"):
+            spirv_assembler.output_to_file(file_name, output_dir)
+
+    written_files, render_futures = spirv_assembler.written_files, []
+
+    # no need for RTL
+    if not compiler_ctx.user_only_wants_spirv:
+        logging.info(f"Generating HDL for {source_file}")
+        with profiler.stage("instructions"):
+            verilog_assembler = VerilogAssember(instructions=spirv_assembler.get_instructions())
+
+        verilog_assembler.compile(file_name, 
+                                  gen_yosys_script=compiler_ctx.gen_yosys_script,
+                                  dark_dots=compiler_ctx.use_dark_theme_for_dots,
+                                  create_comms=compiler_ctx.gen_comms,
+                                  output_dir=output_dir,
+                                  profiler=profiler,
+                                  dots=compiler_ctx.dots,
+                                  optimise=compiler_ctx.optimise,
+                                  max_units=compiler_ctx.max_units
+                                  )
+
+        written_files = written_files + verilog_assembler.written_files
+        render_futures = verilog_assembler.render_futures
+
+    return written_files, render_futures
+
+
+def compile_files(compiler_ctx: CompilerContext, files: List[str], output_dirs: List[str], cache: CompileCache = None, executor: Executor = None) -> List[FileResult]:
+    """ Compile several source files, see ``compile_file``.
+
+        Args:
+            compiler_ctx: Options given by the user.
+            files: Python files to compile.
+            output_dirs: Folder to write the generated files of each file into.
+            cache: Compile cache to use, ``None`` to always compile.
+            executor: Executor to spread the files across, ``None`` to compile them one after another in this process.
+
+        Returns:
+            Result for each file, in the same order as ``files``.
+    """
+    if executor is None or len(files) == 1:
+        return [compile_file(compiler_ctx, file, output_dir, cache) for file, output_dir in zip(files, output_dirs)]
+
+    return list(executor.map(compile_file, repeat(compiler_ctx), files, output_dirs, repeat(cache)))
+
+
+def log_results(compiler_ctx: CompilerContext, results: List[FileResult], seconds: float, cache: CompileCache = None, show_stages: bool = False):
+    """ Log a summary of compiled files and update the compile cache statistics.
+
+        Args:
+            compiler_ctx: Options given by the user.
+            results: Results of the compiled files.
+            seconds: Wall time taken to compile all of the files.
+            cache: Compile cache that was used, ``None`` if it wasn't.
+            show_stages: Include the time taken by each stage of every file.
+    """
+    from rich.markup import escape
+
+    failures = [result for result in results if result.error is not None]
+
+    if len(results) > 1 or show_stages:
+        logging.info(f"Summary:")
+        for result in results:
+            status = "ok" if result.error is None else f"[red]failed[/red] ({escape(result.error)})"
+            status += " (cached)" if result.cache_hit else ""
+            logging.info(f"  {escape(result.source_file)} -> {escape(result.output_dir)}: {result.seconds:.3f}s, {status}")
+
+            if show_stages and result.stage_seconds:
+                logging.info(f"    " + ", ".join(f"{stage}: {stage_time:.3f}s" for stage, stage_time in result.stage_seconds.items()))
+
+    logging.info(f"Compiled {len(results) - len(failures)}/{len(results)} files in {seconds:.3f}s")
+
+    if cache is not None:
+        hits = sum(result.cache_hit for result in results)
+        misses = len(results) - len(failures) - hits
+
+        cache.record(hits, misses)
+        cache.evict()
+
+        if compiler_ctx.compiler_args.cache_stats:
+            logging.info(f"Compile cache this run: {hits} hits, {misses} misses")
+
+    if compiler_ctx.compiler_args.cache_stats:
+        stats = CompileCache(compiler_ctx.cache_dir).get_stats()
+        logging.info(f"Compile cache overall: {stats.hits} hits, {stats.misses} misses ({stats.hit_rate:.1%} hit rate), {stats.entries} entries, {stats.size_bytes / (1024 * 1024):.2f}/{compiler_ctx.cache_size_mb} MB")
+
+
+def write_profile(compiler_ctx: CompilerContext, results: List[FileResult]):
+    """ Write the profile report of the compiled files, and compare it against the baseline if one was given.
+
+        Args:
+            compiler_ctx: Options given by the user.
+            results: Results of the compiled files.
+    """
+    report_path = os.path.join("output", "profile.json")
+
+    os.makedirs("output", exist_ok=True)
+    write_profile_report(report_path, {result.source_file: result.profile for result in results if result.profile is not None})
+
+    if compiler_ctx.compiler_args.profile_baseline is not None:
+        logging.info(f"Compared with {compiler_ctx.compiler_args.profile_baseline}:")
+        compare_profile_reports(compiler_ctx.compiler_args.profile_baseline, report_path)
+
+
+def run_daemon(compiler_ctx: CompilerContext, cache: CompileCache = None, executor: Executor = None):
+    """ Keep the compiler loaded, rebuilding files when they change (``--watch``) and/or when asked to through a
+        Unix socket (``--socket``). Runs until interrupted.
+
+        Args:
+            compiler_ctx: Options given by the user.
+            cache: Compile cache to use, ``None`` to always compile.
+            executor: Executor to spread the files across, ``None`` to compile them in this process.
+    """
+    from compiler.daemon import WatchDaemon
+
+    def build(files_and_dirs: List[Tuple[str, str]]) -> List[FileResult]:
+        if len(files_and_dirs) == 0:
+            return []
+
+        files, output_dirs = zip(*files_and_dirs)
+
+        build_start_time = time.perf_counter()
+        results = compile_files(compiler_ctx, list(files), list(output_dirs), cache, executor)
+        log_results(compiler_ctx, results, time.perf_counter() - build_start_time, cache, show_stages=True)
+
+        if compiler_ctx.user_wants_profile:
+            write_profile(compiler_ctx, results)
+
+        return results
+
+    daemon = WatchDaemon(compiler_ctx.compiler_args.source_file, build, compiler_ctx.compiler_args.poll_interval)
+    server = None
+
+    try:
+        if compiler_ctx.compiler_args.socket is not None:
+            server = daemon.serve(compiler_ctx.compiler_args.socket)
+
+        if compiler_ctx.compiler_args.watch:
+            daemon.watch()
+        else:
+            while True:
+                time.sleep(1)
+
+    except KeyboardInterrupt:
+        logging.info(f"Stopping")
+
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            os.remove(compiler_ctx.compiler_args.socket)
+
+
+def main():
+    """ Entry point for the program.
+    
+        Calls to handle CLI options, parsing, generating and writing.
+        When given several files, they're compiled in separate processes if ``-j`` allows it,
+        and a summary is printed at the end. With ``--watch`` or ``--socket``, keeps running
+        and rebuilds files as they change instead.
+
+    """
+    
+    args = run_argparse()
+    compiler_ctx = CompilerContext(args)
+
+    setup_logging(compiler_ctx.user_wants_verbose_info)
+
     logging.info(f"--- New run, time is: {datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S')} ---")
     logging.debug(f"arguments: {args}")
 
-    logging.debug(f"output folder exists? {os.path.exists('output')}")
-    os.makedirs("output", exist_ok=True)
+    if len(compiler_ctx.files) == 0:
+        logging.error(f"No source files found in {args.source_file}")
+        sys.exit(1)
 
-    logging.info(f"Generating SPIR-V from {compiler_ctx.files[0]}")
-    spirv_assembler = SPIRVAssembler(compiler_ctx.files[0], disable_debug=False)
-    spirv_assembler.compile()
+    cache = CompileCache(compiler_ctx.cache_dir, compiler_ctx.cache_size_mb * 1024 * 1024)
 
-    if compiler_ctx.user_wants_spirv_asm:
-        spirv_assembler.output_to_file(os.path.basename(compiler_ctx.files[0])[:-3])
+    if compiler_ctx.compiler_args.clear_cache:
+        logging.info(f"Clearing the compile cache in {compiler_ctx.cache_dir}")
+        cache.clear()
+
+    active_cache = cache if compiler_ctx.use_cache else None
+    jobs = compiler_ctx.jobs if compiler_ctx.jobs > 0 else os.cpu_count()
+    executor = None
+
+    if not compiler_ctx.is_daemon:
+        jobs = min(jobs, len(compiler_ctx.files))
+
+    if jobs > 1:
+        logging.info(f"Compiling using up to {jobs} processes")
+        from concurrent.futures import ProcessPoolExecutor
+
+        # workers are kept for the whole run, so a daemon doesn't start new processes for every rebuild
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=setup_logging, initargs=(compiler_ctx.user_wants_verbose_info,))
+
+    try:
+        if compiler_ctx.is_daemon:
+            run_daemon(compiler_ctx, active_cache, executor)
+            return
+
+        run_start_time = time.perf_counter()
+        results = compile_files(compiler_ctx, compiler_ctx.files, get_output_dirs(compiler_ctx.files), active_cache, executor)
+        log_results(compiler_ctx, results, time.perf_counter() - run_start_time, active_cache, show_stages=compiler_ctx.user_wants_profile)
+
+        if compiler_ctx.user_wants_profile:
+            write_profile(compiler_ctx, results)
 
-    # early exit, no need for RTL
-    if compiler_ctx.user_only_wants_spirv:
-        return
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
-    logging.info(f"Generating HDL")
-    verilog_assembler = VerilogAssember(spirv_assembler.create_file_as_string())
-    verilog_assembler.compile(os.path.basename(compiler_ctx.files[0])[:-3], 
-                              gen_yosys_script=compiler_ctx.gen_yosys_script,
-                              dark_dots=compiler_ctx.use_dark_theme_for_dots,
-                              create_comms=compiler_ctx.gen_comms
-                              )
+    if any(result.error is not None for result in results):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
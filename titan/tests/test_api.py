@@ -0,0 +1,239 @@
+import pytest, sys, os, json, re
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import titan
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_code")
+
+ADD_AND_SUB = """
+def add(a: int, b: int) -> int:
+    c = a + b
+    return c
+
+def sub(a: int, b: int) -> int:
+    c = a - b
+    return c
+"""
+
+
+def _read_sample(name: str) -> str:
+    with open(os.path.join(SAMPLE_DIR, name)) as f:
+        return f.read()
+
+
+def test_compile_in_memory(tmp_path, monkeypatch):
+    """ Tests `titan.compile`
+
+        Expecting the SPIR-V, Verilog, comms files, dot graphs and node graph to be returned,
+        without writing any files.
+    """
+    monkeypatch.chdir(tmp_path)
+
+    result = titan.compile(_read_sample("add_2_integers.py"), options=titan.CompileOptions(dots=True))
+
+    assert result.entry_point == "add_2"
+    assert "OpEntryPoint" in result.spirv
+    assert len(result.instructions) > 0
+    assert "module add_2" in result.verilog
+    assert sorted(result.comms_files.keys()) == ["core_interface_add_2.sv", "instruction_handler.sv", "spi_interface.sv", "top_add_2.sv"]
+    assert "module core_interface_add_2" in result.comms_files["core_interface_add_2.sv"]
+    assert sorted(result.dot_sources.keys()) == ["digraph_add_2.dot", "digraph_add_2clean_nodes.dot"]
+    assert result.node_assembler.get_number_of_inputs("add_2") == 2
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_compile_options(tmp_path, monkeypatch):
+    """ Tests `titan.compile` with options
+
+        Expecting lagging information to be returned instead of written, and a SPIR-V only compile
+        to skip the Verilog stage.
+    """
+    monkeypatch.chdir(tmp_path)
+
+    result = titan.compile(_read_sample("logical_shift.py"), options=titan.CompileOptions(spirv_only=True))
+
+    assert result.verilog is None and result.node_assembler is None
+    assert result.comms_files == {} and result.dot_sources == {}
+    assert json.loads(result.lagging_info["shift_test_lagging_info.json"]) == {"shift_test": {"a": 2, "b": 5}}
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_compile_top():
+    """ Tests the `top` argument of `titan.compile`
+
+        Expecting the given function to be used as the entry point when there are several.
+    """
+    with pytest.raises(AssertionError):
+        titan.compile(ADD_AND_SUB)
+
+    with pytest.raises(AssertionError):
+        titan.compile(ADD_AND_SUB, top="mul")
+
+    result = titan.compile(ADD_AND_SUB, top="add", options=titan.CompileOptions(spirv_only=True))
+    assert result.entry_point == "add"
+    assert "OpEntryPoint Fragment %add" in result.spirv
+
+
+def test_compile_division_by_power_of_two():
+    """ Tests the Verilog generated by `titan.compile` for a division by a power of two
+
+        Expecting arithmetic shifts to treat the value as signed, and the result to be passed through the pipeline.
+    """
+    result = titan.compile("def div(a: int) -> int:\n    b = a / 8\n    return b\n", options=titan.CompileOptions(gen_comms=False))
+
+    assert "\t\ttitan_id_0 <= $signed(a) >>> 31;" in result.verilog
+    assert "\t\ttitan_id_1 <= titan_id_0 >> 29;" in result.verilog
+    assert "\t\ttitan_id_2 <= a + titan_id_1;" in result.verilog
+    assert "\t\ttitan_id_3 <= $signed(titan_id_2) >>> 3;" in result.verilog
+    assert "\tlogic [31:0] titan_id_3;" in result.verilog
+    assert "assign b = titan_id_3;" in result.verilog
+
+
+def test_compile_array_inputs():
+    """ Tests the Verilog generated by `titan.compile` for arrays passed in as inputs
+
+        Expecting the arrays to be unpacked array ports, with a dot product reading each element once.
+    """
+    source = """import numpy as np
+
+@titan.arraydefs({"x": [4, int], "w": [4, int]})
+def dot(x: int, w: int) -> int:
+    y = np.dot(x, w)
+    return y
+"""
+    result = titan.compile(source, options=titan.CompileOptions(gen_comms=False))
+
+    assert "\tinput logic [31:0] x [0:3]," in result.verilog
+    assert "\tinput logic [31:0] w [0:3]\n);" in result.verilog
+
+    for index in range(4):
+        assert result.verilog.count(f" <= x[{index}];") == 1
+        assert result.verilog.count(f" <= w[{index}];") == 1
+
+    assert result.verilog.count(" * ") == 4
+    assert result.verilog.count(" + ") == 3
+
+    # indexing and loading each element, then one tick for the multipliers and two for the adders
+    assert result.node_assembler.get_pipeline_depth("dot") == 5
+
+
+def test_compile_max_units():
+    """ Tests the Verilog generated by `titan.compile` with a limited number of multipliers
+
+        Expecting the multiplications to take turns on the shared multipliers, each result only being taken on its own step.
+    """
+    source = "def mac(a: int, b: int, c: int, d: int) -> int:\n    y = a * b + c * d + a * c + b * d\n    return y\n"
+    result = titan.compile(source, options=titan.CompileOptions(gen_comms=False, max_units={"mult": 1}))
+
+    assert result.verilog.count(" * ") == 1
+    assert "\tassign titan_mult_0 = titan_mult_0_left * titan_mult_0_right;" in result.verilog
+    assert "\tassign titan_mult_0_left = titan_step == 1 ? a : titan_step == 2 ? a : titan_step == 3 ? c : b;" in result.verilog
+    assert "\tassign titan_mult_0_right = titan_step == 1 ? b : titan_step == 2 ? c : d;" in result.verilog
+    assert result.verilog.count("<= titan_mult_0;") == 4
+    assert "\t\ttitan_step <= titan_step == 7 ? 0 : titan_step + 1;" in result.verilog
+
+    # the last multiplication is on tick 4, followed by two ticks of additions
+    assert result.node_assembler.get_pipeline_depth("mac") == 6
+
+    unlimited = titan.compile(source, options=titan.CompileOptions(gen_comms=False))
+    assert unlimited.verilog.count(" * ") == 4 and "titan_step" not in unlimited.verilog
+
+
+def test_compile_constant_copy():
+    """ Tests the Verilog generated by `titan.compile` when a variable holding a constant is copied
+
+        Expecting the copy to hold the same constant, so no undeclared constant is used.
+    """
+    result = titan.compile("def f(a: int) -> int:\n    v0 = 2 + 3\n    v1 = v0\n    r = v1 * a\n    return r\n", options=titan.CompileOptions(gen_comms=False))
+
+    assert "const_integer" not in result.verilog
+    assert "\t\ttitan_id_0 <= a << 2;" in result.verilog
+    assert "\t\ttitan_id_1 <= a + titan_id_0;" in result.verilog
+
+    result = titan.compile("def f(a: int) -> int:\n    v0 = 2 - 2\n    v1 = v0\n    r = v1 + a\n    return r\n", options=titan.CompileOptions(gen_comms=False))
+
+    assert "const_integer" not in result.verilog
+    assert "assign r = a;" in result.verilog
+
+
+def test_compile_constant_select():
+    """ Tests the Verilog generated by `titan.compile` when a variable holding a folded constant or a copy is selected
+
+        Expecting the value of the constant or the copied variable in the select, rather than an undeclared name.
+    """
+    result = titan.compile("def f(a: int, b: int) -> int:\n    v4 = ((8 >> 2) >> 13)\n    v6 = v4 if v4 > b else b\n    return v6\n", options=titan.CompileOptions(gen_comms=False))
+
+    assert "const_integer" not in result.verilog
+    assert "\t\ttitan_id_1 <= 0 > b ? 0 : b;" in result.verilog
+
+    result = titan.compile("def f(a: int, b: int) -> int:\n    v4 = 2 + 3\n    v6 = b if a > 5 else v4\n    return v6\n", options=titan.CompileOptions(gen_comms=False))
+
+    assert "const_integer" not in result.verilog
+    assert "\t\ttitan_id_1 <= a > 5 ? b : 5;" in result.verilog
+
+    result = titan.compile("def f(a: int, b: int) -> int:\n    v0 = 0 + b\n    v1 = a if a > 5 else v0\n    return v1\n", options=titan.CompileOptions(gen_comms=False))
+
+    assert "temp_" not in result.verilog
+    assert "\t\ttitan_id_1 <= a > 5 ? a : b;" in result.verilog
+
+
+@pytest.mark.parametrize("body", ["    acc = acc + p * q\n", "    acc += p * q\n"], ids=["assign", "augmented_assign"])
+def test_compile_inlined_local(body: str):
+    """ Tests the Verilog generated by `titan.compile` when an inlined function returns a parameter it reassigns
+
+        Expecting the value assigned to the parameter to be used by the caller, rather than the renamed local itself.
+    """
+    source = f"def mac(acc: int, p: int, q: int) -> int:\n{body}    return acc\n\ndef top(a: int, b: int, c: int) -> int:\n    t = mac(a, b, c)\n    return t\n"
+    result = titan.compile(source, options=titan.CompileOptions(gen_comms=False))
+
+    assert "mac_0_acc" not in result.verilog
+    assert "\t\ttitan_id_0 <= b * c;" in result.verilog
+    assert "\t\ttitan_id_1 <= a + titan_id_0;" in result.verilog
+    assert "\tassign t = titan_id_1;" in result.verilog
+
+
+def test_compile_reduced_constant():
+    """ Tests the Verilog generated by `titan.compile` when a multiplication by zero is added to a constant
+
+        Expecting the reduced multiplication to be folded into the constant, without declaring the constants it no longer uses.
+    """
+    result = titan.compile("def f(a: int) -> int:\n    acc = 1\n    acc += 0 * a\n    r = acc + a\n    return r\n", options=titan.CompileOptions(gen_comms=False))
+
+    assert "\t\ttitan_id_0 <= 1 + a;" in result.verilog
+    assert "1 + 0" not in result.verilog
+    assert "%const_integer_1 = OpConstant" in result.spirv
+    assert "%const_integer_0" not in result.spirv
+
+
+@pytest.mark.parametrize("identity", ["v + 0", "0 + v", "v - 0", "v * 1", "1 * v", "v / 1"])
+def test_compile_identity_copy(identity: str):
+    """ Tests the Verilog generated by `titan.compile` when an operation that doesn't change a variable is removed
+
+        Expecting the copy to keep the value the variable had, even after the variable is reassigned.
+    """
+    source = f"def f(a: int, b: int) -> int:\n    v = a + b\n    w = {identity}\n    v = a - b\n    r = w ^ a\n    return r\n"
+    result = titan.compile(source, options=titan.CompileOptions(gen_comms=False))
+
+    assert "\t\ttitan_id_0 <= a + b;" in result.verilog
+    assert re.search(r"\t\ttitan_id_\d+ <= titan_id_0 \^ a;", result.verilog)
+    assert not re.search(r"\b[vw]\b", result.verilog)
+
+    source = f"def f(a: int, b: int) -> int:\n    v = a + b\n    v = {identity}\n    r = v ^ a\n    return r\n"
+    result = titan.compile(source, options=titan.CompileOptions(gen_comms=False))
+
+    assert "\t\ttitan_id_1 <= titan_id_0 ^ a;" in result.verilog
+    assert not re.search(r"\b[vw]\b", result.verilog)
+
+
+def test_compile_augmented_identity():
+    """ Tests the Verilog generated by `titan.compile` when adding zero to a variable in place
+
+        Expecting the variable to keep its value rather than referring to itself.
+    """
+    result = titan.compile("def f(a: int, b: int) -> int:\n    v = a + b\n    v += 0\n    r = v ^ a\n    return r\n", options=titan.CompileOptions(gen_comms=False))
+
+    assert "\t\ttitan_id_1 <= titan_id_0 ^ a;" in result.verilog
+    assert not re.search(r"\bv\b", result.verilog)
@@ -0,0 +1,78 @@
+import pytest, sys, os, ast
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.cache import CompileCache
+
+
+def test_cache_key_ignores_formatting():
+    """ Tests `compiler.cache.CompileCache.make_key`
+
+        Expecting comments and formatting not to change the key, but code and options to.
+    """
+    source = "def add_2(a: int, b: int) -> int:\n    c = a + b\n    return c\n"
+    reformatted = "# adds two numbers\ndef add_2(a: int,\n          b: int) -> int:\n\n    c = a+b # sum\n    return c\n"
+    changed = "def add_2(a: int, b: int) -> int:\n    c = a - b\n    return c\n"
+
+    key = CompileCache.make_key(ast.dump(ast.parse(source)), "add", {"asm": True})
+
+    assert key == CompileCache.make_key(ast.dump(ast.parse(reformatted)), "add", {"asm": True})
+    assert key != CompileCache.make_key(ast.dump(ast.parse(changed)), "add", {"asm": True})
+    assert key != CompileCache.make_key(ast.dump(ast.parse(source)), "add", {"asm": False})
+    assert key != CompileCache.make_key(ast.dump(ast.parse(source)), "sub", {"asm": True})
+
+
+def test_cache_store_and_restore(tmp_path, monkeypatch):
+    """ Tests `compiler.cache.CompileCache.store` and `compiler.cache.CompileCache.restore`
+
+        Expecting files in the output folder and the working directory to be restored to where they were.
+    """
+    monkeypatch.chdir(tmp_path)
+    cache = CompileCache("cache")
+
+    os.makedirs("output/dots")
+    files = {"output/add.sv": "module", "output/dots/digraph_add.dot": "digraph", "add_lagging_info.json": "{}"}
+    for path, content in files.items():
+        with open(path, "w") as f:
+            f.write(content)
+
+    assert cache.restore("key", "elsewhere") is None
+
+    cache.store("key", "output", list(files.keys()))
+
+    assert sorted(cache.restore("key", "elsewhere")) == sorted([os.path.join("elsewhere", "add.sv"), os.path.join("elsewhere", "dots", "digraph_add.dot"), "add_lagging_info.json"])
+    assert open("elsewhere/add.sv").read() == "module"
+    assert open("elsewhere/dots/digraph_add.dot").read() == "digraph"
+    assert open("add_lagging_info.json").read() == "{}"
+
+    cache.record(1, 2)
+    stats = cache.get_stats()
+    assert (stats.hits, stats.misses, stats.entries) == (1, 2, 1)
+
+    cache.clear()
+    assert cache.restore("key", "output") is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    """ Tests `compiler.cache.CompileCache.evict`
+
+        Expecting the least recently used entries to be removed first, until the cache fits.
+    """
+    monkeypatch.chdir(tmp_path)
+
+    with open("file.sv", "w") as f:
+        f.write("x" * 100)
+
+    cache = CompileCache("cache")
+    for key in ["a", "b", "c"]:
+        cache.store(key, ".", ["file.sv"])
+        # make the order of use unambiguous
+        os.utime(os.path.join("cache", "entries", key, "manifest.json"), (0, {"a": 1, "b": 3, "c": 2}[key]))
+
+    entry_size = cache.get_stats().size_bytes // 3
+    cache.max_size_bytes = entry_size * 2
+    cache.evict()
+
+    assert cache.restore("a", ".") is None
+    assert cache.restore("b", ".") is not None
+    assert cache.restore("c", ".") is not None
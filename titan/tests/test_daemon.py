@@ -0,0 +1,58 @@
+import pytest, sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.daemon import WatchDaemon, get_function_dumps
+
+
+def test_function_dumps():
+    """ Tests `compiler.daemon.get_function_dumps`
+
+        Expecting one dump per function, unaffected by comments and formatting.
+    """
+    source = "import numpy as np\n\ndef f(a: int) -> int:\n    return a\n\ndef g(b: int) -> int:\n    return b + 1\n"
+    reformatted = "import numpy as np\n# comment\ndef f(a: int) -> int:\n    return a # comment\ndef g(b: int) -> int:\n\n    return b+1\n"
+
+    dumps = get_function_dumps(source)
+
+    assert set(dumps.keys()) == {"<module>", "f", "g"}
+    assert dumps == get_function_dumps(reformatted)
+    assert dumps["g"] != get_function_dumps(source.replace("b + 1", "b + 2"))["g"]
+
+
+def _write(path, content: str, mtime_ns: int):
+    path.write_text(content)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_watch_daemon_rebuilds_changed_files(tmp_path):
+    """ Tests `compiler.daemon.WatchDaemon`
+
+        Expecting every file to be built at first, and afterwards only the ones with changed code.
+    """
+    a, b = tmp_path / "a.py", tmp_path / "b.py"
+    _write(a, "def f(x: int) -> int:\n    return x\n", 1)
+    _write(b, "def g(x: int) -> int:\n    return x\n", 1)
+
+    builds = []
+    daemon = WatchDaemon([str(tmp_path)], lambda files_and_dirs: builds.append(files_and_dirs) or files_and_dirs)
+
+    daemon.rebuild_pending()
+    assert builds[-1] == [(str(a), os.path.join("output", "a")), (str(b), os.path.join("output", "b"))]
+
+    # nothing changed
+    assert daemon.rebuild_pending() == []
+
+    # only a comment changed
+    _write(a, "def f(x: int) -> int:\n    return x # same\n", 2)
+    assert daemon.rebuild_pending() == []
+
+    _write(b, "def g(x: int) -> int:\n    return x + 1\n", 2)
+    assert daemon.rebuild_pending() == [(str(b), os.path.join("output", "b"))]
+
+    # requests only build files that changed, unless forced
+    assert daemon.handle_request({"files": [str(a)]}) == []
+    assert daemon.handle_request({"files": [str(a)], "force": True}) == [(str(a), os.path.join("output", "a"))]
+
+    with pytest.raises(Exception):
+        daemon.handle_request({"files": [str(tmp_path / "missing.py")]})
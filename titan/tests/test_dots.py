@@ -0,0 +1,43 @@
+import pytest, sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.dots import DotGraphOutput, wait_for_renders
+from compiler.spirv import SPIRVAssembler
+from compiler.verilog import VerilogAssember
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_code")
+
+
+def _compile_sample(output_dir: str, dots: DotGraphOutput) -> VerilogAssember:
+    spirv_assembler = SPIRVAssembler(os.path.join(SAMPLE_DIR, "add_2_integers.py"))
+    spirv_assembler.compile()
+
+    verilog_assembler = VerilogAssember(instructions=spirv_assembler.get_instructions())
+    verilog_assembler.compile("add_2_integers", create_comms=False, output_dir=output_dir, dots=dots)
+
+    return verilog_assembler
+
+
+@pytest.mark.parametrize("dots", [DotGraphOutput.NONE, DotGraphOutput.SOURCE, DotGraphOutput.RENDER])
+def test_dot_graph_output(tmp_path, dots):
+    """ Tests the `dots` option of `compiler.verilog.VerilogAssember.compile`
+
+        Expecting no dot graphs by default, sources for the raw and clean graphs otherwise,
+        and renders to be left running in the background.
+    """
+    verilog_assembler = _compile_sample(str(tmp_path), dots)
+    dot_sources = sorted(file for file in verilog_assembler.written_files if file.endswith(".dot"))
+
+    if dots is DotGraphOutput.NONE:
+        assert dot_sources == []
+        assert not os.path.exists(tmp_path / "dots")
+    else:
+        assert [os.path.basename(file) for file in dot_sources] == ["digraph_add_2.dot", "digraph_add_2clean_nodes.dot"]
+        assert all(os.path.exists(file) for file in dot_sources)
+
+    assert len(verilog_assembler.render_futures) == (2 if dots is DotGraphOutput.RENDER else 0)
+
+    # renders fail without the dot binary installed, which is only logged
+    rendered_files = wait_for_renders(verilog_assembler.render_futures)
+    assert all(os.path.exists(file) for file in rendered_files)
@@ -33,3 +33,48 @@ def test_arithmetic(expression, expected_class):
     x = g.TitanPythonGrammar.arithmetic_expression.parse_string(expression, parse_all=True)
 
     assert expected_class == type(x[0])
+
+
+@pytest.mark.parametrize("line, expected_id, expected_opcode, expected_args", [
+    ("OpCapability Shader", "", "Capability", ["Shader"]),
+    ("%type_integer = OpTypeInt 32 1", "%type_integer", "TypeInt", ["32", "1"]),
+    ("%const_integer_n1 = OpConstant %type_integer -1", "%const_integer_n1", "Constant", ["%type_integer", "-1"]),
+    ("OpEntryPoint Fragment %step \"step\" %x0 %r ", "", "EntryPoint", ["Fragment", "%step", "\"step\"", "%x0", "%r"]),
+    ("OpName %a \"a b\" ; trailing comment", "", "Name", ["%a", "\"a b\""]),
+    ("%label_step = OpLabel", "%label_step", "Label", []),
+])
+def test_spirv_tokenizer_line(line, expected_id, expected_opcode, expected_args):
+    parsed = g.TitanSPIRVTokenizer.parse_string(line)
+
+    assert len(parsed) == 1
+    assert parsed[0].id == expected_id
+    assert parsed[0].opcode == expected_opcode
+    assert list(parsed[0].opcode_args) == expected_args
+
+
+def test_spirv_tokenizer_matches_grammar():
+    spirv = "\n".join([
+        "OpCapability Shader",
+        "OpEntryPoint Fragment %add_2 \"add_2\" %a %b %c",
+        "%type_integer = OpTypeInt 32 1",
+        "%pointer_input_integer = OpTypePointer Input %type_integer",
+        "%a = OpVariable %pointer_input_integer Input",
+        "%temp_a = OpLoad %type_integer %a",
+        "%titan_id_0 = OpIAdd %type_integer %temp_a %temp_b",
+        "OpReturn",
+    ])
+
+    tokenized = g.parse_spirv(spirv)
+    grammar = g.parse_spirv(spirv, use_pyparsing=True)
+
+    assert len(tokenized) == len(grammar)
+
+    for t_line, g_line in zip(tokenized, grammar):
+        assert t_line.id == g_line.id
+        assert t_line.opcode == g_line.opcode
+        assert list(t_line.opcode_args) == ([] if g_line.opcode_args == "" else [str(arg) for arg in g_line.opcode_args])
+
+
+def test_spirv_tokenizer_bad_line():
+    with pytest.raises(Exception):
+        g.TitanSPIRVTokenizer.parse_string("%a = Variable %pointer_input_integer Input")
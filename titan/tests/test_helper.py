@@ -64,7 +64,7 @@ def test_argparse():
     with patch.object(sys, "argv", args):
         parsed_args = run_argparse()
 
-    assert parsed_args.source_file == options.source_file, f"{parsed_args.source_file} != {options.source_file}"
+    assert parsed_args.source_file == [options.source_file], f"{parsed_args.source_file} != {[options.source_file]}"
     assert parsed_args.top == None, f"{parsed_args.top} != {options.top}"       # not set
     assert parsed_args.asm == options.asm, f"{parsed_args.asm} != {options.asm}"
     assert parsed_args.s == options.spirv_only, f"{parsed_args.s} != {options.spirv_only}"
@@ -90,6 +90,48 @@ def test_compiler_context():
     assert compiler_context.user_only_wants_spirv() == options.spirv_only, f"{compiler_context.user_only_wants_spirv()} != {options.spirv_only}"
     assert compiler_context.user_wants_verbose_info() == options.verbose, f"{compiler_context.user_wants_verbose_info()} != {options.verbose}"
 
+
+def test_expand_source_files(tmp_path):
+    """ Tests `compiler.helper.expand_source_files`
+
+        Expecting directories and glob patterns to be expanded into Python files, without duplicates.
+    """
+    for name in ["b.py", "a.py", "notes.txt"]:
+        (tmp_path / name).write_text("")
+
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "nested" / "c.py").write_text("")
+
+    a, b, c = str(tmp_path / "a.py"), str(tmp_path / "b.py"), str(tmp_path / "nested" / "c.py")
+
+    assert expand_source_files([str(tmp_path)]) == [a, b]
+    assert expand_source_files([str(tmp_path / "**" / "*.py")]) == [a, b, c]
+    assert expand_source_files([b, str(tmp_path)]) == [b, a]
+    assert expand_source_files(["missing.py"]) == ["missing.py"]
+
+
+def test_get_output_dirs():
+    """ Tests `compiler.helper.get_output_dirs`
+
+        Expecting a single file to use the output folder directly, and several files to get their own unique subfolders.
+    """
+    assert get_output_dirs(["kernels/a.py"]) == ["output"]
+    assert get_output_dirs(["kernels/a.py", "kernels/b.py", "other/a.py"], "out") == [
+        os.path.join("out", "a"), os.path.join("out", "b"), os.path.join("out", "a_2")
+    ]
+
+def test_parse_max_units():
+    """ Tests `compiler.helper.parse_max_units`
+
+        Expecting each limit to be split into the operation and its count, and anything else to be rejected.
+    """
+    assert parse_max_units([]) == {}
+    assert parse_max_units(["mult=4", "DIV=1"]) == {"mult": 4, "div": 1}
+
+    for limit in ["mult", "mult=", "mult=four", "mult=-1"]:
+        with pytest.raises(Exception):
+            parse_max_units([limit])
+
 if __name__ == "__main__":
     test_argparse()
     test_compiler_context()
\ No newline at end of file
@@ -0,0 +1,68 @@
+import pytest, sys, os, re, subprocess
+
+TITAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DIR = os.path.join(TITAN_DIR, "sample_code")
+
+# modules that should only be imported when they're actually used
+LAZY_MODULES = ["pyparsing", "graphviz", "rich", "common.pyparsing_grammar", "compiler.daemon"]
+
+# the compiler's backends, only needed by the package once something is compiled
+BACKEND_MODULES = ["compiler.api", "compiler.spirv", "compiler.verilog", "compiler.node", "compiler.optimiser"]
+
+
+def _get_import_times(code: str, cwd: str = TITAN_DIR) -> dict:
+    """ Run code in a new interpreter with ``-X importtime``, returning the cumulative import time of each module in microseconds. """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys; sys.path.insert(0, {TITAN_DIR!r}); {code}"],
+        cwd=cwd, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+    import_times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", line)
+        if match:
+            import_times[match.group(2)] = int(match.group(1))
+
+    return import_times
+
+
+def test_import_time():
+    """ Tests importing `main`
+
+        Expecting the heavy modules not to be imported.
+    """
+    import_times = _get_import_times("import main")
+
+    for module in LAZY_MODULES:
+        assert module not in import_times, f"{module} imported by main"
+
+
+def test_import_package():
+    """ Tests importing `titan`
+
+        Expecting neither the heavy modules nor the compiler's backends to be imported until the API is used.
+    """
+    import_times = _get_import_times("import titan", os.path.dirname(TITAN_DIR))
+
+    assert "titan" in import_times
+
+    for module in LAZY_MODULES + BACKEND_MODULES:
+        assert module not in import_times, f"{module} imported by titan"
+
+    import_times = _get_import_times("import titan; titan.CompileOptions", os.path.dirname(TITAN_DIR))
+
+    assert "compiler.api" in import_times
+
+
+@pytest.mark.parametrize("extra_args", [["-s"], []])
+def test_run_imports(tmp_path, extra_args):
+    """ Tests running `main.main`
+
+        Expecting neither a SPIR-V only run, nor a full run without dot graphs, to import graphviz or pyparsing.
+    """
+    source_file = os.path.join(SAMPLE_DIR, "add_2_integers.py")
+    import_times = _get_import_times(f"sys.argv = ['main.py', {source_file!r}, '--no-cache'] + {extra_args!r}; import main; main.main()", str(tmp_path))
+
+    for module in ["pyparsing", "graphviz", "common.pyparsing_grammar"]:
+        assert module not in import_times, f"{module} imported by a run with {extra_args}"
@@ -0,0 +1,46 @@
+import pytest, sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.instruction import SPIRVInstruction
+from compiler.spirv import SPIRVAssembler
+from compiler.verilog import VerilogAssember
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_code")
+
+
+@pytest.mark.parametrize("instruction, expected_text, expected_type_id", [
+    (SPIRVInstruction("Capability", "", ("Shader",)), "OpCapability Shader", ""),
+    (SPIRVInstruction("TypeInt", "%type_integer", ("32", "1")), "%type_integer = OpTypeInt 32 1", ""),
+    (SPIRVInstruction("Label", "%label_add_2"), "%label_add_2 = OpLabel", ""),
+    (SPIRVInstruction("IAdd", "%titan_id_0", ("%type_integer", "%temp_a", "%temp_b")), "%titan_id_0 = OpIAdd %type_integer %temp_a %temp_b", "%type_integer"),
+    (SPIRVInstruction("Return"), "OpReturn", ""),
+])
+def test_instruction_text(instruction, expected_text, expected_type_id):
+    """ Tests `common.instruction.SPIRVInstruction`
+
+        Expecting the text form to match SPIR-V assembly, and the type ID to only be set for typed results.
+    """
+    assert str(instruction) == expected_text
+    assert instruction.type_id == expected_type_id
+
+
+def test_instructions_match_parsed_text():
+    """ Tests `compiler.spirv.SPIRVAssembler.get_instructions`
+
+        Expecting the in-memory instructions to match what the pyparsing grammar produces from the text.
+    """
+    spirv_assembler = SPIRVAssembler(os.path.join(SAMPLE_DIR, "simple_neuron.py"))
+    spirv_assembler.compile()
+
+    instructions = spirv_assembler.get_instructions()
+    parsed = VerilogAssember(spirv_assembler.create_file_as_string(), use_pyparsing=True).parsed_spirv
+
+    assert len(instructions) == len(parsed)
+
+    for instruction, line in zip(instructions, parsed):
+        parsed_args = [] if line.opcode_args == "" else [str(arg) for arg in line.opcode_args]
+
+        assert instruction.id == line.id
+        assert instruction.opcode == line.opcode
+        assert list(instruction.opcode_args) == parsed_args
@@ -0,0 +1,372 @@
+import pytest, sys, os, re
+from random import Random
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.spirv import SPIRVAssembler
+from compiler.verilog import VerilogAssember
+from compiler.node import IdTable, Node, NodeAssembler, NodeContext
+from common.symbols import Operation
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_code")
+
+
+def test_id_table():
+    """ Tests `compiler.node.IdTable`
+
+        Expecting each SPIR-V ID to get its own small integer, with the name kept without '%'.
+    """
+    ids = IdTable()
+
+    assert ids.get_id("%a") == 0
+    assert ids.get_id("%titan_id_0") == 1
+    assert ids.get_id("%a") == 0
+
+    assert ids.get_name(1) == "titan_id_0"
+    assert ids.names == ["a", "titan_id_0"]
+
+
+def test_node_replace():
+    """ Tests `compiler.node.Node.replace`
+
+        Expecting a copy with only the given attributes changed and the tick recalculated, and nodes to have no ``__dict__``.
+    """
+    a = Node(NodeContext(id=0, operation=Operation.GLOBAL_VAR_DECLARATION))
+    b = Node(NodeContext(id=1, operation=Operation.GLOBAL_VAR_DECLARATION))
+    add = Node(NodeContext(id=2, type_id=5, input_left=a, input_right=b, operation=Operation.ADD))
+    later = Node(NodeContext(id=3, input_left=add, operation=Operation.LOAD))
+
+    copy = add.replace(input_right=later)
+
+    assert copy is not add
+    assert (copy.spirv_id, copy.type_id, copy.operation) == (2, 5, Operation.ADD)
+    assert copy.input_left is a and copy.input_right is later
+    assert (add.tick, copy.tick) == (1, 3)
+
+    assert not hasattr(copy, "__dict__")
+    with pytest.raises(AttributeError):
+        copy.unknown = 1
+
+    with pytest.raises(AssertionError):
+        add.replace(tick=4)
+
+    with pytest.raises(AssertionError):
+        add.replace(id=4)
+
+
+def test_graph_uses_integer_ids():
+    """ Tests `compiler.verilog.VerilogAssember.compile_nodes`
+
+        Expecting the graph to be keyed by integer IDs, with the names only used for the ports.
+    """
+    spirv_assembler = SPIRVAssembler(os.path.join(SAMPLE_DIR, "add_2_integers.py"))
+    spirv_assembler.compile()
+
+    node_assembler = VerilogAssember(instructions=spirv_assembler.get_instructions()).compile_nodes()
+    module = node_assembler.content["add_2"]
+
+    assert all(type(id) is int for id in module.body_nodes.keys())
+    assert all(type(id) is int for id in module.types.keys())
+    assert all(type(id) is int for id in node_assembler.declared_symbols)
+
+    assert node_assembler.get_list_of_inputs("add_2") == ["a", "b"]
+    assert node_assembler.get_list_of_outputs("add_2") == ["c"]
+    assert node_assembler.is_symbol_an_output("add_2", node_assembler.get_id("%c"))
+
+DEAD_CODE = """
+def dead(a: int, b: int) -> int:
+    unused = a * b
+    also = unused - a
+    k = a + b
+    c = k if a > b else 2
+    z = a - b
+    return z
+"""
+
+
+@pytest.mark.parametrize("optimise", [True, False])
+def test_remove_dead_nodes(optimise):
+    """ Tests `compiler.node.NodeAssembler.remove_dead_nodes`
+
+        Expecting every node that doesn't reach the output to be removed and reported, including the
+        comparison of an unused decision, unless optimisations are disabled.
+    """
+    spirv_assembler = SPIRVAssembler(source=DEAD_CODE)
+    spirv_assembler.compile()
+
+    verilog_assembler = VerilogAssember(instructions=spirv_assembler.get_instructions())
+    verilog_assembler.compile("dead", create_comms=False, output_dir=None, optimise=optimise)
+    verilog = verilog_assembler.get_verilog_text()
+
+    if optimise:
+        # the declarations and stores of unused, also, k and c, and the 5 operations
+        assert verilog_assembler.dead_node_report == (13, 4)
+        assert verilog.count("<=") == 1
+        assert verilog.count("logic [31:0] titan_id") == 1
+    else:
+        assert verilog_assembler.dead_node_report == (0, 0)
+        assert verilog.count("<=") == 5
+
+    assert "assign z = titan_id_5;" in verilog
+
+
+SELECT_COMPUTED = """
+def select(a: int, b: int, c: int) -> int:
+    p = a * b
+    q = a * c
+    s = b * c
+    t = p if a > b else q
+    u = s if c > 3 else t
+    return u
+"""
+
+
+def test_remove_dead_nodes_keeps_selected_values():
+    """ Tests `compiler.node.NodeAssembler.remove_dead_nodes` with decisions selecting computed variables
+
+        Expecting every register a decision selects to be kept and declared, the same as without optimisations.
+    """
+    spirv_assembler = SPIRVAssembler(source=SELECT_COMPUTED)
+    spirv_assembler.compile()
+
+    verilog_assembler = VerilogAssember(instructions=spirv_assembler.get_instructions())
+    verilog_assembler.compile("select", create_comms=False, output_dir=None)
+    verilog = verilog_assembler.get_verilog_text()
+
+    assert verilog_assembler.dead_node_report.registers == 0
+
+    for line in ["titan_id_0 <= a * b;", "titan_id_1 <= a * c;", "titan_id_2 <= b * c;",
+                 "titan_id_4 <= a > b ? titan_id_0 : titan_id_1;", "titan_id_6 <= c > 3 ? titan_id_2 : titan_id_4;"]:
+        assert f"\t\t{line}\n" in verilog
+
+    for register in ["titan_id_0", "titan_id_1", "titan_id_2", "titan_id_4", "titan_id_6"]:
+        assert f"\tlogic [31:0] {register};\n" in verilog
+
+
+@pytest.mark.parametrize("optimise, depth", [(True, 3), (False, 7)])
+def test_pipeline_depth(optimise, depth):
+    """ Tests `compiler.node.NodeAssembler.get_pipeline_depth`
+
+        Expecting a chain of 8 additions to be rebalanced into a tree 3 ticks deep, unless optimisations are disabled.
+    """
+    spirv_assembler = SPIRVAssembler(source="def add_8(a: int, b: int, c: int, d: int, e: int, f: int, g: int, h: int) -> int:\n"
+                                            "    x = a + b + c + d + e + f + g + h\n"
+                                            "    return x\n", optimise=optimise)
+    spirv_assembler.compile()
+
+    verilog_assembler = VerilogAssember(instructions=spirv_assembler.get_instructions())
+    verilog_assembler.compile("add_8", create_comms=False, output_dir=None, optimise=optimise)
+
+    assert verilog_assembler.node_assembler.get_pipeline_depth("add_8") == depth
+    assert verilog_assembler.get_verilog_text().count(" + ") == 7
+
+
+@pytest.mark.parametrize("sample", ["simple_neuron.py", "conditional_assign.py", "add_2_triple.py"])
+def test_consumer_index(sample):
+    """ Tests `compiler.node.NodeAssembler.get_consumers`
+
+        Expecting the consumers of each ID to match a search of the whole graph, after building, cleaning
+        and removing dead nodes, and after modifying a node.
+    """
+    spirv_assembler = SPIRVAssembler(os.path.join(SAMPLE_DIR, sample))
+    spirv_assembler.compile()
+
+    verilog_assembler = VerilogAssember(instructions=spirv_assembler.get_instructions())
+    verilog_assembler.compile(spirv_assembler.entry_point, create_comms=False, output_dir=None)
+
+    node_assembler = verilog_assembler.node_assembler
+    module_name = spirv_assembler.entry_point
+
+    def _search(node_id):
+        return [
+            node for nodes in node_assembler.content[module_name].body_nodes.values() for node in nodes
+            if any(isinstance(parent, Node) and parent.spirv_id == node_id for parent in [node.input_left, node.input_right, *node.data])
+        ]
+
+    body_nodes = node_assembler.content[module_name].body_nodes
+    assert any(node_assembler.get_consumers(module_name, node_id) for node_id in body_nodes)
+
+    for node_id in body_nodes:
+        assert sorted(map(id, node_assembler.get_consumers(module_name, node_id))) == sorted(map(id, _search(node_id)))
+
+    # modifying a node adds a new version of it, using the new parent
+    target_id, target_nodes = next((node_id, nodes) for node_id, nodes in body_nodes.items() if nodes[-1].input_left is not None)
+    parent = node_assembler.get_node(module_name, node_assembler.content[module_name].inputs[0])
+    node_assembler.modify_node(module_name, target_id, 0, parent, target_nodes[-1].operation)
+
+    assert node_assembler.get_node(module_name, target_id).input_left is parent
+    assert node_assembler.get_node_versions(module_name, target_id)[-1] is node_assembler.get_node(module_name, target_id)
+    assert node_assembler.get_node(module_name, target_id) in node_assembler.get_consumers(module_name, parent.spirv_id)
+
+
+def test_clean_graph_chain():
+    """ Tests `compiler.node.NodeAssembler.clean_graph`
+
+        Expecting the temporary loads of a chain of stores to be removed, with each addition using the one
+        before it, and the best parents of each node to only be resolved once.
+    """
+    lines = "".join("    x = x + a\n" for _ in range(50))
+    spirv_assembler = SPIRVAssembler(source=f"def chain(a: int) -> int:\n    x = a + a\n{lines}    return x\n", optimise=False)
+    spirv_assembler.compile()
+
+    node_assembler = VerilogAssember(instructions=spirv_assembler.get_instructions()).compile_nodes()
+    node_assembler.clean_graph()
+
+    module = node_assembler.content["chain"]
+    nodes = [node for versions in module.body_nodes.values() for node in versions]
+    additions = sorted((node for node in nodes if node.operation is Operation.ADD), key=lambda node: node.tick)
+
+    assert not any(node.operation is Operation.LOAD for node in nodes)
+    assert len(additions) == 51
+    assert [node.tick for node in additions] == list(range(1, 52))
+
+    a = node_assembler.get_node("chain", node_assembler.get_id("%a"))
+    for previous, node in zip(additions, additions[1:]):
+        assert node.input_left is previous
+        assert node.input_right is a
+
+    x = node_assembler.get_node("chain", node_assembler.get_id("%x"))
+    assert x.operation is Operation.STORE and x.input_left is additions[-1]
+
+    # the best parents are kept, so resolving a node again gives the same result
+    resolved = {}
+    best_nodes = node_assembler._find_best_parents(additions[-1], resolved)
+    assert resolved[additions[-1]] is best_nodes
+    assert node_assembler._find_best_parents(additions[-1], resolved) is best_nodes
+
+
+def test_get_nodes_by_tick():
+    """ Tests `compiler.node.NodeAssembler.get_nodes_by_tick`
+
+        Expecting the tick groups to be kept up to date as nodes are added, each group in the same order as the
+        body nodes even when a newer version of an earlier ID is added later.
+    """
+    node_assembler = NodeAssembler()
+    node_assembler.create_module("m")
+
+    def _add(id, left=None, right=None):
+        operation = Operation.ADD if left is not None else Operation.GLOBAL_VAR_DECLARATION
+        node = Node(NodeContext(id=id, input_left=left, input_right=right, operation=operation))
+        node_assembler.add_body_node_to_module("m", node)
+        return node
+
+    a, b = _add(0), _add(1)
+    x1 = _add(2, a, b)
+    x2 = _add(3, x1, x1)
+    z1 = _add(4, a, b)
+    z2 = _add(5, z1, a)
+
+    assert node_assembler.get_nodes_by_tick("m") == {0: [a, b], 1: [x1, z1], 2: [x2, z2]}
+
+    # another version of x1, which comes before z2
+    x1_new = _add(2, z1, b)
+
+    assert node_assembler.get_nodes_by_tick("m") == {0: [a, b], 1: [x1, z1], 2: [x1_new, x2, z2]}
+
+MULTIPLY_ADD = """
+def mac(a: int, b: int, c: int, d: int, e: int, f: int) -> int:
+    y = a * b + c * d + e * f + a * c + b * d + e * a
+    return y
+"""
+
+
+@pytest.mark.parametrize("max_units, depth", [({Operation.MULT: 6}, 4), ({Operation.MULT: 2}, 5), ({Operation.MULT: 1}, 8), ({Operation.MULT: 1, Operation.ADD: 1}, 8)])
+def test_schedule(max_units, depth):
+    """ Tests `compiler.node.NodeAssembler.schedule`
+
+        Expecting no more nodes of a limited operation on each tick than its limit, with every node after its parents,
+        and each node bound to one shared unit. Limits that are never reached shouldn't change anything.
+    """
+    spirv_assembler = SPIRVAssembler(source=MULTIPLY_ADD)
+    spirv_assembler.compile()
+
+    node_assembler = VerilogAssember(instructions=spirv_assembler.get_instructions()).compile_nodes()
+    node_assembler.clean_graph()
+    node_assembler.remove_dead_nodes()
+    node_assembler.schedule(max_units)
+
+    module = node_assembler.content["mac"]
+    nodes = [node for versions in module.body_nodes.values() for node in versions]
+
+    assert node_assembler.get_pipeline_depth("mac") == depth
+    assert {tick: [id(node) for node in tick_nodes] for tick, tick_nodes in node_assembler.get_nodes_by_tick("mac").items()} == {
+        tick: [id(node) for node in nodes if node.tick == tick] for tick in {node.tick for node in nodes}
+    }
+
+    for node in nodes:
+        assert all(node.tick > parent.tick for parent in [node.input_left, node.input_right] if parent is not None)
+
+    limited = [operation for operation, limit in max_units.items() if sum(1 for node in nodes if node.operation is operation) > limit]
+
+    for operation in limited:
+        operation_nodes = [node for node in nodes if node.operation is operation]
+        units = [unit for unit in module.shared_units if unit.operation is operation]
+
+        assert len(units) == max_units[operation]
+        assert sorted(id(node) for unit in units for node in unit.nodes) == sorted(id(node) for node in operation_nodes)
+        assert max(sum(1 for node in operation_nodes if node.tick == tick) for tick in {node.tick for node in nodes}) == max_units[operation]
+
+        for unit in units:
+            assert [node.tick for node in unit.nodes] == sorted({node.tick for node in unit.nodes})
+
+    if not limited:
+        assert module.shared_units == []
+
+
+def _simulate_rounds(verilog: str, rounds: list, output: str) -> list:
+    """ Simulate a module with shared units one clock cycle at a time, only supports the Verilog used by ``SELECT_COMPUTED``.
+
+        The inputs change at the start of every round, and the output is read once the step counter wraps around.
+    """
+    def to_python(expression: str) -> str:
+        if "?" not in expression:
+            return expression
+
+        condition, rest = expression.split("?", 1)
+        selected, other = rest.split(":", 1)
+        return f"({selected}) if ({condition}) else ({to_python(other)})"
+
+    assigns = [(name, to_python(value)) for name, value in re.findall(r"\tassign (\w+) = (.*);", verilog)]
+    registers = [(condition or "True", name, to_python(value)) for condition, name, value in re.findall(r"\t\t(?:if \((.*)\) )?(\w+) <= (.*);", verilog)]
+    steps = int(re.search(r"titan_step == (\d+) \? 0", verilog)[1]) + 1
+
+    state = {name: 0 for _, name, _ in registers}
+    results = []
+
+    def settle():
+        for name, value in assigns:
+            state[name] = eval(value, {}, state)
+
+    for inputs in rounds:
+        state.update(inputs)
+
+        for _ in range(steps):
+            settle()
+            state.update({name: eval(value, {}, state) for condition, name, value in registers if eval(condition, {}, state)})
+
+        settle()
+        results.append(state[output])
+
+    return results
+
+
+@pytest.mark.parametrize("max_units", [{"mult": 1}, {"mult": 2}])
+def test_schedule_decision_selects_products(max_units):
+    """ Tests `compiler.node.NodeAssembler.schedule` with decisions selecting the results of shared multipliers
+
+        Expecting each decision to be scheduled after the products it selects, so the output is right at the end of
+        every round even though the inputs change between rounds.
+    """
+    spirv_assembler = SPIRVAssembler(source=SELECT_COMPUTED)
+    spirv_assembler.compile()
+
+    verilog_assembler = VerilogAssember(instructions=spirv_assembler.get_instructions())
+    verilog_assembler.compile("select", create_comms=False, output_dir=None, max_units=max_units)
+
+    random = Random(0)
+    rounds = [{"a": random.randint(0, 100), "b": random.randint(0, 100), "c": random.randint(0, 6)} for _ in range(20)]
+
+    def select(a, b, c):
+        return b * c if c > 3 else a * b if a > b else a * c
+
+    assert _simulate_rounds(verilog_assembler.get_verilog_text(), rounds, "u") == [select(**inputs) for inputs in rounds]
@@ -0,0 +1,98 @@
+import pytest, sys, os, ast
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.optimiser import wrap_int32, fold_integer_binop, get_shift_add_terms, get_power_of_two, build_balanced_tree
+
+
+def test_wrap_int32():
+    """ Tests `compiler.optimiser.wrap_int32`
+
+        Expecting values outside of a signed 32-bit integer to wrap around.
+    """
+    assert wrap_int32(5) == 5
+    assert wrap_int32(-5) == -5
+    assert wrap_int32(2**31 - 1) == 2**31 - 1
+    assert wrap_int32(2**31) == -2**31
+    assert wrap_int32(2**32) == 0
+    assert wrap_int32(-2**31 - 1) == 2**31 - 1
+
+
+@pytest.mark.parametrize("operation, left, right, expected", [
+    (ast.Add(), 2, 3, 5),
+    (ast.Sub(), 2, 3, -1),
+    (ast.Mult(), -4, 3, -12),
+    (ast.Add(), 2**31 - 1, 1, -2**31),
+    (ast.Div(), 7, 2, 3),
+    (ast.Div(), -7, 2, -3),
+    (ast.Div(), 7, -2, -3),
+    (ast.Div(), 7, 0, None),
+    (ast.LShift(), 1, 31, -2**31),
+    (ast.LShift(), 1, 32, None),
+    (ast.RShift(), -8, 1, 2**31 - 4),
+    (ast.RShift(), 8, -1, None),
+    (ast.Mod(), 7, 2, None),
+])
+def test_fold_integer_binop(operation, left, right, expected):
+    """ Tests `compiler.optimiser.fold_integer_binop`
+
+        Expecting the result of the matching SPIR-V opcode, or None if it can't be folded.
+    """
+    assert fold_integer_binop(operation, left, right) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    (1, [(0, 1)]),
+    (8, [(3, 1)]),
+    (7, [(0, -1), (3, 1)]),
+    (10, [(1, 1), (3, 1)]),
+    (-1, [(0, -1)]),
+    (-7, [(0, 1), (3, -1)]),
+])
+def test_get_shift_add_terms(value, expected):
+    """ Tests `compiler.optimiser.get_shift_add_terms`
+
+        Expecting the fewest signed powers of two that add up to the value.
+    """
+    assert get_shift_add_terms(value) == expected
+
+
+def test_get_shift_add_terms_sum():
+    """ Tests `compiler.optimiser.get_shift_add_terms`
+
+        Expecting the terms to always add up to the value, with no two adjacent non-zero digits.
+    """
+    for value in list(range(-1000, 1000)) + [2**31 - 1, -2**31]:
+        terms = get_shift_add_terms(value)
+
+        assert sum(sign << shift for shift, sign in terms) == value
+        assert all(b[0] - a[0] >= 2 for a, b in zip(terms, terms[1:]))
+
+
+def test_get_power_of_two():
+    """ Tests `compiler.optimiser.get_power_of_two`
+
+        Expecting the exponent of powers of two only.
+    """
+    assert get_power_of_two(1) == 0
+    assert get_power_of_two(8) == 3
+    assert get_power_of_two(2**31) == 31
+    assert get_power_of_two(6) is None
+    assert get_power_of_two(0) is None
+    assert get_power_of_two(-8) is None
+
+
+@pytest.mark.parametrize("size, expected", [
+    (1, "x0"),
+    (2, "x0 + x1"),
+    (4, "x0 + x1 + (x2 + x3)"),
+    (5, "x0 + x1 + (x2 + (x3 + x4))"),
+])
+def test_build_balanced_tree(size: int, expected: str):
+    """ Tests `compiler.optimiser.build_balanced_tree`
+
+        Expecting the operands to be split in half at each level, keeping their order.
+    """
+    operands = [ast.Name(f"x{index}", ast.Load()) for index in range(size)]
+
+    assert ast.unparse(build_balanced_tree(ast.Add(), operands)) == expected
@@ -0,0 +1,57 @@
+import pytest, sys, os, json, tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.profiler import StageProfiler, write_profile_report, compare_profile_reports
+
+
+def test_stage_profiler():
+    """ Tests `compiler.profiler.StageProfiler`
+
+        Expecting each stage to be measured, with repeated stages added together and memory
+        only measured when asked for.
+    """
+    profiler = StageProfiler(detailed=True, use_cprofile=True)
+
+    with profiler.stage("allocate"):
+        data = [bytearray(1024) for _ in range(100)]
+
+    with profiler.stage("sum"):
+        sum(range(1000))
+
+    with profiler.stage("sum"):
+        sum(range(1000))
+
+    profiler.stop()
+
+    assert not tracemalloc.is_tracing()
+    assert list(profiler.stages.keys()) == ["allocate", "sum"]
+    assert profiler.stages["allocate"].peak_memory_bytes >= 100 * 1024
+    assert set(profiler.cprofile_stats.keys()) == {"allocate", "sum"}
+
+    report = profiler.get_report()
+    assert set(report["sum"].keys()) == {"wall_seconds", "cpu_seconds", "peak_memory_bytes"}
+
+    simple_profiler = StageProfiler()
+    with simple_profiler.stage("allocate"):
+        data = [bytearray(1024) for _ in range(100)]
+
+    assert simple_profiler.stages["allocate"].peak_memory_bytes == 0
+    assert simple_profiler.get_stage_seconds()["allocate"] > 0
+
+
+def test_profile_reports(tmp_path):
+    """ Tests `compiler.profiler.write_profile_report` and `compiler.profiler.compare_profile_reports`
+
+        Expecting the stage totals to add up across files, and the comparison to give the relative change.
+    """
+    stage = lambda seconds: {"wall_seconds": seconds, "cpu_seconds": seconds, "peak_memory_bytes": 10}
+
+    write_profile_report(tmp_path / "baseline.json", {"a.py": {"spirv": stage(1.0)}, "b.py": {"spirv": stage(1.0)}})
+    write_profile_report(tmp_path / "report.json", {"a.py": {"spirv": stage(3.0), "comms": stage(1.0)}})
+
+    with open(tmp_path / "baseline.json") as f:
+        assert json.load(f)["totals"]["spirv"]["wall_seconds"] == 2.0
+
+    changes = compare_profile_reports(tmp_path / "baseline.json", tmp_path / "report.json")
+    assert changes == {"spirv": pytest.approx(0.5)}
@@ -0,0 +1,40 @@
+import pytest, sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.spirv import SPIRVAssembler
+from compiler.verilog import VerilogAssember
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_code")
+
+
+def _compile_sample(name: str):
+    """ Compile a sample to SPIR-V and Verilog text, without writing anything to disk. """
+    spirv_assembler = SPIRVAssembler(os.path.join(SAMPLE_DIR, name))
+    spirv_assembler.compile()
+
+    verilog_assembler = VerilogAssember(instructions=spirv_assembler.get_instructions())
+    verilog_assembler.node_assembler = verilog_assembler.compile_nodes()
+    verilog_assembler.node_assembler.clean_graph()
+    verilog_assembler.compile_text()
+
+    verilog_text = "\n".join(line for lines in verilog_assembler.generated_verilog_text.values() for line in lines)
+    return spirv_assembler.create_file_as_string(), verilog_text
+
+
+def test_sequential_compiles_are_independent():
+    """ Tests `compiler.spirv.SPIRVAssembler` and `compiler.verilog.VerilogAssember`
+
+        Expecting compiling several kernels in one process to give the same output as compiling each one
+        on its own, i.e. no state leaks between compiler instances.
+    """
+    first_spirv, first_verilog = _compile_sample("add_2_integers.py")
+    second_spirv, second_verilog = _compile_sample("simple_neuron.py")
+    repeat_spirv, repeat_verilog = _compile_sample("add_2_integers.py")
+
+    assert first_spirv == repeat_spirv
+    assert first_verilog == repeat_verilog
+
+    assert "module add_2 " in first_verilog
+    assert "module add_2 " not in second_verilog
+    assert "%add_2 " not in second_spirv
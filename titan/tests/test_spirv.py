@@ -0,0 +1,379 @@
+import pytest, sys, os, re
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.spirv import SPIRVAssembler
+from common.type import DataType
+
+CONSTANTS = """
+def constants(a: int, b: float) -> int:
+    c = a + 0
+    d = c * -0
+    e = b * 1.5
+    f = e + 1.5
+    return d
+"""
+
+
+def test_constant_interning():
+    """ Tests `compiler.spirv.SPIRVAssembler.add_const_if_nonexistant`
+
+        Expecting each constant to be declared once, whether it was created with a python type or a DataType,
+        and every constant used to be declared with the same ID.
+    """
+    spirv_assembler = SPIRVAssembler(source=CONSTANTS)
+    spirv_assembler.compile()
+    spirv = spirv_assembler.create_file_as_string()
+
+    declared = re.findall(r"^(%const_\w+) = OpConstant", spirv, re.MULTILINE)
+    used = set(re.findall(r"%const_\w+", spirv))
+
+    assert sorted(declared) == ["%const_float_1_5", "%const_integer_0"]
+    assert used == set(declared)
+
+    assert spirv_assembler.const_exists(SPIRVAssembler.ConstContext(int, 0))
+    assert spirv_assembler.const_exists(SPIRVAssembler.ConstContext(DataType.INTEGER, 0))
+    assert spirv_assembler.const_exists("const_float_1_5")
+    assert not spirv_assembler.const_exists(SPIRVAssembler.ConstContext(DataType.INTEGER, 1))
+
+    assert spirv_assembler.declared_constants.inverse["const_integer_0"] == SPIRVAssembler.ConstContext(DataType.INTEGER, 0)
+    assert spirv_assembler.declared_types.inverse["%type_float"] == SPIRVAssembler.TypeContext(DataType.FLOAT)
+
+FOLDING = """
+def fold(x: int, y: int) -> int:
+    k = 2 * 8
+    m = k - 20
+    n = m * 3 + k
+    d = -7 / 2
+    e = 3 * x
+    f = e + 1
+    z = x * n + d
+    z2 = z + y
+    return z2
+"""
+
+
+def test_constant_folding():
+    """ Tests the constant folding and propagation of `compiler.spirv.SPIRVAssembler`
+
+        Expecting operations on constants, and on variables only ever assigned constants, to be
+        evaluated at compile time, unless optimisations are disabled.
+    """
+    spirv_assembler = SPIRVAssembler(source=FOLDING)
+    spirv_assembler.compile()
+    spirv = spirv_assembler.create_file_as_string()
+
+    assert "OpStore %k %const_integer_16" in spirv
+    assert "OpStore %m %const_integer_n4" in spirv
+    assert "OpStore %n %const_integer_4" in spirv
+    assert "OpStore %d %const_integer_n3" in spirv
+    assert "OpSDiv" not in spirv
+    assert re.search(r"OpShiftLeftLogical %type_integer %temp_x %const_integer_2$", spirv, re.MULTILINE)
+
+    # operations with a constant operand aren't constant
+    assert re.search(r"OpIAdd %type_integer %temp_e %const_integer_1$", spirv, re.MULTILINE)
+
+    spirv_assembler = SPIRVAssembler(source=FOLDING, optimise=False)
+    spirv_assembler.compile()
+    spirv = spirv_assembler.create_file_as_string()
+
+    assert "OpIMul %type_integer %const_integer_2 %const_integer_8" in spirv
+    assert "OpSDiv %type_integer %const_integer_n7 %const_integer_2" in spirv
+    assert "const_integer_16" not in spirv
+
+COMMON_SUBEXPRESSIONS = """
+def cse(a: int, b: int, c: int) -> int:
+    x = a * b + c
+    y = b * a + c
+    w = a * b
+    b = c - a
+    v = a * b
+    z = x + y + w + v
+    return z
+"""
+
+
+def test_common_subexpression_elimination():
+    """ Tests the value numbering of `compiler.spirv.SPIRVAssembler`
+
+        Expecting identical operations on the same values to be generated once, including commutative
+        operations with swapped operands, but not once one of the symbols they read has been assigned to.
+    """
+    spirv_assembler = SPIRVAssembler(source=COMMON_SUBEXPRESSIONS)
+    spirv_assembler.compile()
+    spirv = spirv_assembler.create_file_as_string()
+
+    assert spirv.count("OpIMul") == 2
+    assert spirv.count("OpIAdd") == 4
+    assert "OpStore %y %titan_id_1" in spirv
+    assert "OpStore %w %titan_id_0" in spirv
+
+    spirv_assembler = SPIRVAssembler(source=COMMON_SUBEXPRESSIONS, optimise=False)
+    spirv_assembler.compile()
+    spirv = spirv_assembler.create_file_as_string()
+
+    assert spirv.count("OpIMul") == 4
+
+
+STRENGTH_REDUCTION = """
+def reduce(a: int, b: int) -> int:
+    c = a * 8
+    d = b * 7
+    e = a / 4
+    f = b / 3
+    g = a * 170
+    h = c + d + e + f + g
+    return h
+"""
+
+
+def test_strength_reduction():
+    """ Tests the strength reduction of `compiler.spirv.SPIRVAssembler`
+
+        Expecting multiplications by constants with few non-zero digits to become shifts and additions,
+        and divisions by powers of two to become shifts, unless optimisations are disabled.
+    """
+    spirv_assembler = SPIRVAssembler(source=STRENGTH_REDUCTION)
+    spirv_assembler.compile()
+    spirv = spirv_assembler.create_file_as_string()
+
+    # c = a << 3, d = (b << 3) - b
+    assert "OpShiftLeftLogical %type_integer %temp_a %const_integer_3" in spirv
+    assert "OpShiftLeftLogical %type_integer %temp_b %const_integer_3" in spirv
+    assert re.search(r"OpISub %type_integer %titan_id_\d+ %temp_b$", spirv, re.MULTILINE)
+
+    # e rounds towards zero by adding 3 to negative values before shifting
+    assert "OpShiftRightArithmetic %type_integer %temp_a %const_integer_31" in spirv
+    assert re.search(r"OpShiftRightLogical %type_integer %titan_id_\d+ %const_integer_30$", spirv, re.MULTILINE)
+    assert re.search(r"OpShiftRightArithmetic %type_integer %titan_id_\d+ %const_integer_2$", spirv, re.MULTILINE)
+
+    # 170 (0b10101010) needs 4 shifts and 3 is not a power of two
+    assert spirv.count("OpIMul") == 1
+    assert spirv.count("OpSDiv") == 1
+
+    spirv_assembler = SPIRVAssembler(source=STRENGTH_REDUCTION, optimise=False)
+    spirv_assembler.compile()
+    spirv = spirv_assembler.create_file_as_string()
+
+    assert "OpShift" not in spirv
+    assert spirv.count("OpIMul") == 3
+    assert spirv.count("OpSDiv") == 2
+
+CHAINS = """
+def chains(a: int, b: int, c: int, d: int) -> int:
+    x = a * b
+    y = x + a + 1 + b + c + 2
+    z = a ^ b ^ c ^ d
+    w = y | z
+    return w
+"""
+
+
+def test_rebalance_chains():
+    """ Tests the chain rebalancing of `compiler.spirv.SPIRVAssembler`
+
+        Expecting constants in a chain to be folded together, operands that are ready later to be used last,
+        and chains of bitwise operations to be balanced too.
+    """
+    spirv_assembler = SPIRVAssembler(source=CHAINS)
+    spirv_assembler.compile()
+    spirv = spirv_assembler.create_file_as_string()
+
+    # x is only ready after the multiplication, so it isn't paired with an input
+    assert "OpIAdd %type_integer %temp_a %temp_b" in spirv
+    assert "OpIAdd %type_integer %temp_c %const_integer_3" in spirv
+    assert re.search(r"OpIAdd %type_integer %temp_x %titan_id_\d+$", spirv, re.MULTILINE)
+    assert spirv.count("OpIAdd") == 4
+    assert spirv.count("OpBitwiseXor") == 3
+    assert "%const_integer_1 " not in spirv and "%const_integer_2 " not in spirv
+    assert spirv_assembler._depths["y"] == 3
+    assert spirv_assembler._depths["z"] == 2
+
+LOOPS = """
+@titan.arraydefs({"x": [4, int], "w": [4, int]})
+def dot(x: int, w: int, b: int) -> int:
+    acc = 0
+    n = 4
+    for i in range(n):
+        acc += x[i] * w[i]
+    y = acc + b
+    for j in range(3, 0, -2):
+        y = y * b + j
+    return y
+"""
+
+
+def test_loop_unrolling():
+    """ Tests the loop unrolling of `compiler.spirv.SPIRVAssembler`
+
+        Expecting loops over a constant range to be unrolled, with array indices using the value of the loop
+        variable in each iteration, and accumulations to be combined into one rebalanced chain if optimising.
+    """
+    spirv_assembler = SPIRVAssembler(source=LOOPS)
+    spirv_assembler.compile()
+    spirv = spirv_assembler.create_file_as_string()
+
+    for index in range(4):
+        assert f"OpAccessChain %pointer_input_integer %x %const_integer_{index}" in spirv
+        assert f"OpAccessChain %pointer_input_integer %w %const_integer_{index}" in spirv
+
+    # three adders in a tree for the sum, one for the bias and one for each iteration of the second loop
+    assert spirv.count("OpIMul") == 6
+    assert spirv.count("OpIAdd") == 6
+    assert spirv.count("OpStore %acc") == 2
+    assert spirv_assembler._depths["acc"] == 3
+    assert re.search(r"OpIAdd %type_integer %titan_id_\d+ %const_integer_3$", spirv, re.MULTILINE)
+    assert re.search(r"OpIAdd %type_integer %titan_id_\d+ %const_integer_1$", spirv, re.MULTILINE)
+
+    # without optimisations, every iteration adds to the result of the previous one
+    spirv_assembler = SPIRVAssembler(source=LOOPS, optimise=False)
+    spirv_assembler.compile()
+    spirv = spirv_assembler.create_file_as_string()
+
+    assert spirv.count("OpAccessChain") == 8
+    assert spirv.count("OpStore %acc") == 5
+    assert spirv.count("OpIAdd") == 7
+
+
+@pytest.mark.parametrize("loop", [
+    "for i in range(a):",
+    "for i in [0, 1]:",
+    "for i in range(0, 4, 0):",
+    "for i in range(2000):",
+    "for i in range(2):\n        i = a",
+])
+def test_loop_unrolling_rejected(loop: str):
+    """ Tests the loop unrolling of `compiler.spirv.SPIRVAssembler` with loops that can't be unrolled
+
+        Expecting an exception for anything other than a bounded range known at compile time.
+    """
+    source = f"def loop(a: int) -> int:\n    c = a\n    {loop}\n        c += a\n    return c\n"
+
+    with pytest.raises(Exception):
+        SPIRVAssembler(source=source).compile()
+
+REDUCTIONS = """
+import numpy as np
+
+@titan.arraydefs({"x": [8, int], "w": [8, int], "v": [4, int], "y": [3, int]})
+def reduce(x: int, w: int, v: int, y: int, b: int) -> int:
+    s = sum(x)
+    d = np.dot(x, w)
+    t = np.sum(v) + b
+    u = np.dot(y, y) + b
+    return u
+"""
+
+
+@pytest.mark.parametrize("optimise", [True, False])
+def test_reductions(optimise: bool):
+    """ Tests the reductions of `compiler.spirv.SPIRVAssembler`
+
+        Expecting sum and dot products over arrays to read each element with a constant index, and to be
+        added together as a balanced tree whether optimising or not. Values added to a reduction are only
+        part of its tree when optimising.
+    """
+    spirv_assembler = SPIRVAssembler(source=REDUCTIONS, optimise=optimise)
+    spirv_assembler.compile()
+    spirv = spirv_assembler.create_file_as_string()
+
+    for index in range(8):
+        assert spirv.count(f"OpAccessChain %pointer_input_integer %x %const_integer_{index}") == 2
+        assert f"OpAccessChain %pointer_input_integer %w %const_integer_{index}" in spirv
+
+    assert spirv.count("OpIMul") == 8 + 3
+    assert spirv.count("OpIAdd") == 7 + 7 + 3 + 1 + 2 + 1
+    assert spirv_assembler._depths["s"] == 3
+    assert spirv_assembler._depths["d"] == 4
+    assert spirv_assembler._depths["t"] == 3
+    assert spirv_assembler._depths["u"] == (3 if optimise else 4)
+
+
+@pytest.mark.parametrize("call", ["sum(a)", "np.dot(x, v)", "np.dot(x)", "sum(x, 1)"])
+def test_reductions_rejected(call: str):
+    """ Tests the reductions of `compiler.spirv.SPIRVAssembler` with invalid arguments
+
+        Expecting an exception for anything other than arrays of the same size.
+    """
+    source = f"""import numpy as np
+
+@titan.arraydefs({{"x": [8, int], "v": [4, int]}})
+def reduce(x: int, v: int, a: int) -> int:
+    c = {call}
+    return c
+"""
+
+    with pytest.raises(Exception):
+        SPIRVAssembler(source=source).compile()
+
+INLINING = """
+def mac(a: int, b: int, c: int) -> int:
+    d = a * b
+    e = d + c
+    return e
+
+def scale(v: int) -> int:
+    return v * 3
+
+def neuron(x: int, w: int, b: int) -> int:
+    y = mac(x, w, b)
+    z = scale(mac(x, w, b) + 1)
+    r = y + z
+    return r
+"""
+
+
+def test_function_inlining():
+    """ Tests the function inlining of `compiler.spirv.SPIRVAssembler`
+
+        Expecting the function that isn't called by any other to be the entry point, with the calls it makes inlined
+        into it using uniquely named symbols, so optimisations apply across calls.
+    """
+    spirv_assembler = SPIRVAssembler(source=INLINING)
+    spirv_assembler.compile()
+    spirv = spirv_assembler.create_file_as_string()
+
+    assert spirv_assembler.entry_point == "neuron"
+    assert spirv.count("OpFunction ") == 1
+    assert "OpEntryPoint Fragment %neuron \"neuron\" %x %w %b %r" in spirv
+
+    # parameters given a symbol are replaced by it, anything else is assigned to the renamed parameter
+    assert "%mac_0_d = OpVariable" in spirv and "%mac_1_d = OpVariable" in spirv
+    assert "%mac_0_a" not in spirv
+    assert "%scale_2_v = OpVariable" in spirv
+
+    # both calls to mac multiply the same values
+    assert spirv.count("OpIMul") == 1
+
+    spirv_assembler = SPIRVAssembler(source=INLINING, optimise=False)
+    spirv_assembler.compile()
+    spirv = spirv_assembler.create_file_as_string()
+
+    assert spirv.count("OpIMul") == 3
+
+
+@pytest.mark.parametrize("source", [
+    "def f(a: int) -> int:\n    b = f(a)\n    return b\n\ndef g(a: int) -> int:\n    b = f(a)\n    return b\n",
+    "def f(a: int) -> int:\n    b = a + 1\n    return b\n\ndef g(a: int) -> int:\n    b = f(a, a)\n    return b\n",
+    "def f(a: int) -> int:\n    b = a + 1\n\ndef g(a: int) -> int:\n    b = f(a)\n    return b\n",
+])
+def test_function_inlining_rejected(source: str):
+    """ Tests the function inlining of `compiler.spirv.SPIRVAssembler` with calls that can't be inlined
+
+        Expecting an exception for recursion, the wrong number of arguments and functions that don't return a value.
+    """
+    with pytest.raises(Exception):
+        SPIRVAssembler(source=source).compile()
+
+
+def test_step_entry_point():
+    """ Tests the entry point detection of `compiler.spirv.SPIRVAssembler`
+
+        Expecting a function named step to be the entry point when there are several top level functions.
+    """
+    source = "def other(a: int) -> int:\n    b = a + 1\n    return b\n\ndef step(a: int) -> int:\n    b = a + 2\n    return b\n"
+
+    spirv_assembler = SPIRVAssembler(source=source)
+    spirv_assembler.compile()
+
+    assert spirv_assembler.entry_point == "step"